@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 import dj_database_url
 
@@ -31,6 +32,9 @@ SECRET_KEY = os.getenv('SECRET_KEY', 'django-insecure-_(o#jtyfp#pg3m3q+^s+(8-#nf
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
 
+# Running under `manage.py test`
+TESTING = sys.argv[1:2] == ['test']
+
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '').split(',') if os.getenv('ALLOWED_HOSTS') else []
 
 
@@ -43,6 +47,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # Third-party
     'rest_framework',
@@ -58,6 +63,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.performance.PerformanceMiddleware',  # First, so its timings cover the whole stack
+    'core.routing.ReplicaRoutingMiddleware',  # Before anything that reads the database
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # New: CORS headers middleware
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -75,11 +82,15 @@ CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', '').split(',') if os.ge
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.performance.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_PAGINATION_CLASS': 'core.pagination.CustomPageNumberPagination', # Use custom pagination
     'PAGE_SIZE': 10, # This will be overridden by CustomPageNumberPagination.page_size
@@ -87,6 +98,79 @@ REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'core.exceptions.custom_exception_handler', # Custom exception handler
 }
 
+# Content search: also match titles by trigram similarity (typo tolerance) when pg_trgm is installed
+CONTENT_SEARCH_TRIGRAM = os.getenv('CONTENT_SEARCH_TRIGRAM', 'True').lower() == 'true'
+
+# Leaderboards (see content/leaderboards.py)
+LEADERBOARD_PRIOR_WEIGHT = float(os.getenv('LEADERBOARD_PRIOR_WEIGHT', '10'))  # virtual ratings at the category mean
+LEADERBOARD_DEFAULT_PRIOR = 3.0  # prior for categories without ratings
+TRENDING_HALF_LIFE_HOURS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', '72'))
+# Forward-decay landmark. Scores are stored as log2, so it never has to move; the content.E002 check
+# only keeps it within a million half-lives of now. Run rebuild_rating_aggregates after changing either setting.
+TRENDING_LANDMARK = os.getenv('TRENDING_LANDMARK', '2025-01-01T00:00:00+00:00')
+
+# Item-based recommendations (see ratings/recommendations.py)
+RECOMMENDATION_NEIGHBORS = int(os.getenv('RECOMMENDATION_NEIGHBORS', '20'))  # similar contents kept per content
+RECOMMENDATION_SHRINKAGE = float(os.getenv('RECOMMENDATION_SHRINKAGE', '10'))  # damps similarities backed by few co-raters
+RECOMMENDATION_HISTORY = int(os.getenv('RECOMMENDATION_HISTORY', '100'))  # recent ratings a user's recommendations start from
+
+# Cache backend: 'locmem' (per process), 'file' (CACHE_LOCATION is a directory) or 'redis' (CACHE_LOCATION is a redis:// URL)
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[os.getenv('CACHE_BACKEND', 'locmem')],
+        'LOCATION': os.getenv('CACHE_LOCATION', 'pixelcore'),
+    }
+}
+
+# Shared response cache for content and rating reads (see core/cache.py)
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'False').lower() == 'true'
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', '60'))  # seconds an entry is fresh
+RESPONSE_CACHE_STALE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_STALE_TIMEOUT', '300'))  # seconds it may then be served stale
+RESPONSE_CACHE_LOCK_TIMEOUT = 10  # seconds one request may hold the refresh lock
+
+# Serve content and rating list/detail GETs from async views (see core/asyncviews.py). Enable when running under ASGI.
+ASYNC_READS = os.getenv('ASYNC_READS', 'False').lower() == 'true'
+
+# One rating per (user, content): POST rejects a second rating and PUT /api/ratings/by-content/<id>/
+# upserts it (see ratings/services.py). Run collapse_duplicate_ratings when enabling it.
+RATINGS_SINGLE_VOTE = os.getenv('RATINGS_SINGLE_VOTE', 'False').lower() == 'true'
+
+# Queue User.rating_count deltas, last_login writes and post-commit cache invalidation in the core_job table
+# instead of running them in the request (see core/jobs.py). Requires `manage.py run_workers`.
+BACKGROUND_JOBS = os.getenv('BACKGROUND_JOBS', 'False').lower() == 'true'
+JOB_BATCH_SIZE = int(os.getenv('JOB_BATCH_SIZE', '100'))  # jobs a worker claims at a time
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1'))  # seconds an idle worker waits before polling again
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '5'))  # then the job is kept as failed
+JOB_RETRY_DELAY = float(os.getenv('JOB_RETRY_DELAY', '10'))  # seconds before the first retry, doubled after each attempt
+JOB_CLAIM_TIMEOUT = float(os.getenv('JOB_CLAIM_TIMEOUT', '300'))  # seconds before a claimed job whose worker died is requeued
+
+# Serialize content and rating list pages from values() rows instead of model instances (see core/rows.py)
+FAST_LIST_SERIALIZATION = os.getenv('FAST_LIST_SERIALIZATION', 'True').lower() == 'true'
+
+# How authenticated requests resolve request.user: 'cache' (per-process LRU of User rows),
+# 'claims' (stateless principal from signed token claims) or 'database' (SELECT per request)
+JWT_PRINCIPAL = os.getenv('JWT_PRINCIPAL', 'cache')
+JWT_USER_CACHE_TIMEOUT = int(os.getenv('JWT_USER_CACHE_TIMEOUT', '30'))  # seconds
+JWT_USER_CACHE_SIZE = int(os.getenv('JWT_USER_CACHE_SIZE', '10000'))  # users per process
+
+# Per-request instrumentation (see core/performance.py)
+PERFORMANCE_ENABLED = os.getenv('PERFORMANCE_ENABLED', 'True').lower() == 'true'
+PERFORMANCE_SAMPLE_RATE = float(os.getenv('PERFORMANCE_SAMPLE_RATE', '0.01'))  # share of requests logged; over-budget ones always are
+PERFORMANCE_QUERY_BUDGET = int(os.getenv('PERFORMANCE_QUERY_BUDGET', '20'))  # SQL queries per request
+PERFORMANCE_TIME_BUDGET_MS = float(os.getenv('PERFORMANCE_TIME_BUDGET_MS', '500'))  # excluding password hashing
+PERFORMANCE_SERVER_TIMING = os.getenv('PERFORMANCE_SERVER_TIMING', str(DEBUG)).lower() == 'true'
+PERFORMANCE_WINDOW_SECONDS = 60  # per-view latency histograms cover the last
+PERFORMANCE_WINDOWS = 5  # PERFORMANCE_WINDOWS x PERFORMANCE_WINDOW_SECONDS seconds
+
+# Prometheus metrics at /metrics (see core/metrics.py). Set PROMETHEUS_MULTIPROC_DIR to aggregate worker processes.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')  # scrapers send 'Authorization: Bearer <token>'; unset, /metrics is DEBUG-only
+
 # Simple JWT settings
 from datetime import timedelta
 
@@ -95,6 +179,7 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': False,
     'BLACKLIST_AFTER_ROTATION': True,
+    'UPDATE_LAST_LOGIN': False, # users.serializers.LoginSerializer records last_login itself
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'VERIFYING_KEY': None,
@@ -140,10 +225,52 @@ DATABASES = {
     )
 }
 
+# Read replicas (see core/routing.py): comma-separated URLs, configured as replica_0, replica_1, ...
+# Reads of GET/HEAD/OPTIONS requests go to a healthy replica, round-robin; everything else to default.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+for index, url in enumerate(DATABASE_REPLICA_URLS):
+    DATABASES[f'replica_{index}'] = dj_database_url.parse(url, conn_max_age=600)
+REPLICA_DATABASES = [f'replica_{index}' for index in range(len(DATABASE_REPLICA_URLS))]
+DATABASE_ROUTERS = ['core.routing.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '5'))  # a user reads from default this long after a write
+REPLICA_PIN_CACHE_ALIAS = 'default'  # must be shared by all processes (e.g. redis) for stickiness across them
+REPLICA_HEALTH_CHECK_INTERVAL = float(os.getenv('REPLICA_HEALTH_CHECK_INTERVAL', '10'))  # seconds between checks of a replica
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', '0'))  # PostgreSQL replay lag that fails a check; 0 disables
+
+# Shared connection pool per process and PostgreSQL database (psycopg 3 with psycopg_pool), instead of one
+# persistent connection per thread. Connections go back to the pool at the end of each request.
+DATABASE_POOL = os.getenv('DATABASE_POOL', 'False').lower() == 'true'
+DATABASE_POOL_MIN_SIZE = int(os.getenv('DATABASE_POOL_MIN_SIZE', '2'))
+DATABASE_POOL_MAX_SIZE = int(os.getenv('DATABASE_POOL_MAX_SIZE', '20'))
+DATABASE_POOL_TIMEOUT = float(os.getenv('DATABASE_POOL_TIMEOUT', '10'))  # seconds a request waits for a connection before failing
+# Server-side parameter binding, so psycopg prepares each statement a connection has run DATABASE_PREPARE_THRESHOLD
+# times. Not compatible with PgBouncer in transaction pooling mode.
+DATABASE_PREPARED_STATEMENTS = os.getenv('DATABASE_PREPARED_STATEMENTS', 'False').lower() == 'true'
+DATABASE_PREPARE_THRESHOLD = int(os.getenv('DATABASE_PREPARE_THRESHOLD', '5'))
+for database in DATABASES.values():
+    if database.get('ENGINE') != 'django.db.backends.postgresql':
+        continue
+    options = database.setdefault('OPTIONS', {})
+    if DATABASE_POOL:
+        database['CONN_MAX_AGE'] = 0  # Django's pool requires it
+        options['pool'] = {'min_size': DATABASE_POOL_MIN_SIZE, 'max_size': DATABASE_POOL_MAX_SIZE, 'timeout': DATABASE_POOL_TIMEOUT}
+    if DATABASE_PREPARED_STATEMENTS:
+        options['server_side_binding'] = True
+        options['prepare_threshold'] = DATABASE_PREPARE_THRESHOLD
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
+# Django's defaults, with PBKDF2 timed as the `password` phase of a request (same hash format)
+PASSWORD_HASHERS = [
+    'core.performance.TimedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -213,6 +340,10 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {  # for loggers whose messages are JSON objects already
+            'format': '{message}',
+            'style': '{',
+        },
     },
     'handlers': {
         'console': {
@@ -220,6 +351,14 @@ LOGGING = {
             'class': 'logging.StreamHandler',
             'formatter': 'simple' if DEBUG else 'verbose',
         },
+        'json': {
+            'level': 'INFO',
+            'class': 'logging.StreamHandler',
+            'formatter': 'json',
+        },
+        'null': {
+            'class': 'logging.NullHandler',
+        },
         # Add a file handler for production if needed
         # 'file': {
         #     'level': 'INFO',
@@ -244,6 +383,11 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'core.performance': { # One JSON object per sampled or over-budget request; silent under `manage.py test`
+            'handlers': ['null' if TESTING else 'json'],
+            'level': 'INFO',
+            'propagate': False,
+        },
         # Add loggers for other apps as needed
     },
     'root': {
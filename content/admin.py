@@ -1,12 +1,20 @@
 from django.contrib import admin
+from django.db import connections
 from .models import MediaContent
+from .search import full_text_search
 
 @admin.register(MediaContent)
 class MediaContentAdmin(admin.ModelAdmin):
     """
     Admin configuration for the MediaContent model.
     """
-    list_display = ('title', 'category', 'content_url', 'created_at')
+    list_display = ('title', 'category', 'avg_rating', 'rating_count', 'content_url', 'created_at')
     list_filter = ('category', 'created_at')
     search_fields = ('title', 'description')
-    ordering = ('-created_at',)
\ No newline at end of file
+    ordering = ('-created_at',)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Use the indexed full-text search on PostgreSQL instead of LIKE scans.
+        if search_term and connections[queryset.db].vendor == 'postgresql':
+            return full_text_search(queryset, search_term), False
+        return super().get_search_results(request, queryset, search_term)
\ No newline at end of file
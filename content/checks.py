@@ -0,0 +1,26 @@
+from datetime import datetime
+from django.conf import settings
+from django.core.checks import Error, register
+from django.utils import timezone
+from .leaderboards import MAX_LANDMARK_HALF_LIVES
+
+
+@register()
+def check_trending_settings(app_configs, **kwargs):
+    if settings.TRENDING_HALF_LIFE_HOURS <= 0:
+        return [Error('TRENDING_HALF_LIFE_HOURS must be positive.', id='content.E001')]
+    try:
+        landmark = datetime.fromisoformat(settings.TRENDING_LANDMARK)
+    except ValueError:
+        landmark = None
+    if landmark is None or timezone.is_naive(landmark):
+        return [Error('TRENDING_LANDMARK must be an ISO 8601 datetime with a UTC offset.', id='content.E001')]
+    half_lives = abs((timezone.now() - landmark).total_seconds()) / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+    if half_lives > MAX_LANDMARK_HALF_LIVES:
+        return [Error(
+            f'TRENDING_LANDMARK is {half_lives:.3g} half-lives from now; trending scores lose precision beyond '
+            f'{MAX_LANDMARK_HALF_LIVES:.0e}.',
+            hint='Move TRENDING_LANDMARK closer to now or raise TRENDING_HALF_LIFE_HOURS, then run rebuild_rating_aggregates.',
+            id='content.E002',
+        )]
+    return []
@@ -0,0 +1,15 @@
+from django_filters import rest_framework as filters
+from .models import MediaContent
+
+class MediaContentFilter(filters.FilterSet):
+    """
+    Filters for the MediaContent list endpoint.
+    Supports the category filter plus bounds on the maintained rating aggregates.
+    """
+    min_avg_rating = filters.NumberFilter(field_name='avg_rating', lookup_expr='gte')
+    max_avg_rating = filters.NumberFilter(field_name='avg_rating', lookup_expr='lte')
+    min_rating_count = filters.NumberFilter(field_name='rating_count', lookup_expr='gte')
+
+    class Meta:
+        model = MediaContent
+        fields = ['category']
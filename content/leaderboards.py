@@ -0,0 +1,164 @@
+import math
+from collections import defaultdict
+from datetime import datetime
+from django.conf import settings
+from django.db.models import Case, F, FloatField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Abs, Cast, Coalesce, Greatest, Ln, Now, Power
+from django.db.models.lookups import GreaterThan
+from .models import CategoryRatingPrior, MediaContent
+
+# Terms more than this many half-lives below a sum no longer change it, and
+# clamping to it keeps POWER() from underflowing (an error on PostgreSQL).
+NEGLIGIBLE_HALF_LIVES = 1000.0
+# A removal that leaves less than this (in half-lives) of the sum empties it.
+REMOVAL_TOLERANCE = 1e-9
+# Scores this many half-lives from the landmark still resolve REMOVAL_TOLERANCE
+# (a double has about 16 significant digits), and stay far above NO_TRENDING_SCORE.
+MAX_LANDMARK_HALF_LIVES = 1e6
+
+
+def trending_weight(created_at):
+    """
+    log2 of a rating's forward-decay weight 2^((t − landmark) / half-life),
+    where t is the rating's creation time and the half-life is
+    TRENDING_HALF_LIFE_HOURS, i.e. the half-lives from TRENDING_LANDMARK to t.
+
+    Summing the weights ranks content exactly like exponentially decayed
+    rating counts measured at any later time, because the shared factor
+    2^(−(now − landmark) / half-life) cancels out. Scores therefore only
+    change when a rating is added or removed, and never need to be decayed in
+    bulk. The sums grow without bound, so trending_score stores their log2
+    (see trending_sum), which stays proportional to elapsed time instead.
+    """
+    landmark = datetime.fromisoformat(settings.TRENDING_LANDMARK)
+    return (created_at - landmark).total_seconds() / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+
+
+def trending_sum(*weights):
+    """
+    log2 of the sum of weights given as log2 (log-sum-exp). Returns
+    MediaContent.NO_TRENDING_SCORE for an empty sum.
+    """
+    weights = [weight for weight in weights if weight > MediaContent.NO_TRENDING_SCORE]
+    if not weights:
+        return MediaContent.NO_TRENDING_SCORE
+    top = max(weights)
+    return top + math.log2(math.fsum(2.0 ** max(weight - top, -NEGLIGIBLE_HALF_LIVES) for weight in weights))
+
+
+def trending_difference(total, weight):
+    """
+    log2 of 2^total − 2^weight, or NO_TRENDING_SCORE when weight is (within
+    REMOVAL_TOLERANCE) the whole sum or more.
+    """
+    if total - weight <= REMOVAL_TOLERANCE:
+        return MediaContent.NO_TRENDING_SCORE
+    return total + math.log2(1 - 2.0 ** max(weight - total, -NEGLIGIBLE_HALF_LIVES))
+
+
+def shift_trending_score(weight, remove=False):
+    """
+    Expression adding (or with remove, subtracting) a log2 weight to the log2
+    sum in trending_score, evaluated by the database so concurrent writers
+    never lose an update. Removing the whole sum or more empties it, like a
+    counter clamped at zero.
+    """
+    score = F('trending_score')
+    two, one, ln2 = Value(2.0), Value(1.0), Value(math.log(2))
+    if not remove:
+        gap = Greatest(-Abs(score - Value(weight)), Value(-NEGLIGIBLE_HALF_LIVES))
+        return Greatest(score, Value(weight)) + Ln(one + Power(two, gap)) / ln2
+    gap = Greatest(Value(weight) - score, Value(-NEGLIGIBLE_HALF_LIVES))
+    return Case(
+        When(GreaterThan(score, Value(weight + REMOVAL_TOLERANCE)), then=score + Ln(one - Power(two, gap)) / ln2),
+        default=Value(MediaContent.NO_TRENDING_SCORE),
+        output_field=FloatField(),
+    )
+
+
+def bayesian_rating(rating_count, rating_sum, prior=None):
+    """
+    Expression for (C·m + rating_sum) / (C + rating_count): the average
+    shrunk towards the category mean m by C = LEADERBOARD_PRIOR_WEIGHT
+    virtual ratings, so a few 5-star ratings do not outrank hundreds of
+    4-star ones. By default m is read from CategoryRatingPrior for the row's
+    category inside the same statement.
+    """
+    if prior is None:
+        prior = Coalesce(
+            Subquery(CategoryRatingPrior.objects.filter(category=OuterRef('category')).values('mean_rating')[:1]),
+            Value(settings.LEADERBOARD_DEFAULT_PRIOR),
+            output_field=FloatField(),
+        )
+    weight = Value(float(settings.LEADERBOARD_PRIOR_WEIGHT))
+    return (weight * prior + Cast(rating_sum, FloatField())) / (weight + Cast(rating_count, FloatField()))
+
+
+def refresh_leaderboards(media_model=None, prior_model=None):
+    """
+    Recompute each category's prior from the content aggregates and re-score
+    bayesian_rating in categories whose prior moved.
+
+    Reads and writes only the content table (one grouped query plus at most
+    one UPDATE per category), so its cost does not grow with the number of
+    ratings; per-rating changes are applied incrementally by ratings.services.
+    Models can be passed in for use from data migrations. Returns
+    {category: mean}.
+    """
+    if media_model is None:
+        media_model = MediaContent
+    if prior_model is None:
+        prior_model = CategoryRatingPrior
+
+    totals = {
+        row['category']: row
+        for row in media_model.objects.order_by().values('category').annotate(count=Sum('rating_count'), total=Sum('rating_sum'))
+    }
+    previous = dict(prior_model.objects.values_list('category', 'mean_rating'))
+    means = {}
+    for category, _ in MediaContent.CATEGORY_CHOICES:
+        row = totals.get(category)
+        count = (row['count'] or 0) if row else 0
+        mean = row['total'] / count if count else settings.LEADERBOARD_DEFAULT_PRIOR
+        means[category] = mean
+        prior_model.objects.update_or_create(category=category, defaults={'mean_rating': mean, 'rating_count': count})
+        if previous.get(category) is not None and math.isclose(previous[category], mean, abs_tol=1e-9):
+            continue
+        media_model.objects.filter(category=category).update(
+            bayesian_rating=bayesian_rating('rating_count', 'rating_sum', prior=Value(mean)),
+            updated_at=Now(),
+        )
+    return means
+
+
+def rebuild_trending_scores(media_model=None, rating_model=None, batch_size=1000):
+    """
+    Recompute every trending_score from the Rating table, e.g. after bulk
+    imports or after moving TRENDING_LANDMARK. Returns the number of content
+    rows written.
+    """
+    if media_model is None:
+        media_model = MediaContent
+    if rating_model is None:
+        # Imported lazily: the content app does not depend on ratings at import time.
+        from ratings.models import Rating
+        rating_model = Rating
+
+    scores = defaultdict(lambda: MediaContent.NO_TRENDING_SCORE)
+    ratings = rating_model.objects.order_by().values_list('media_content', 'created_at')
+    for media_content_id, created_at in ratings.iterator(chunk_size=batch_size):
+        scores[media_content_id] = trending_sum(scores[media_content_id], trending_weight(created_at))
+
+    written = 0
+    batch = []
+    for content in media_model.objects.order_by().only('pk').iterator(chunk_size=batch_size):
+        content.trending_score = scores.get(content.pk, MediaContent.NO_TRENDING_SCORE)
+        batch.append(content)
+        if len(batch) >= batch_size:
+            media_model.objects.bulk_update(batch, ['trending_score'])
+            written += len(batch)
+            batch = []
+    if batch:
+        media_model.objects.bulk_update(batch, ['trending_score'])
+        written += len(batch)
+    return written
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-17 14:27
+
+from django.db import migrations, models
+from core.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently on PostgreSQL, which cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ('content', '0002_mediacontent_rating_aggregates'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='mediacontent',
+            index=models.Index(fields=['-created_at', '-media_id'], name='content_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='mediacontent',
+            index=models.Index(fields=['category', '-created_at', '-media_id'], name='content_cat_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='mediacontent',
+            index=models.Index(fields=['title', 'media_id'], name='content_title_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='mediacontent',
+            index=models.Index(fields=['category', 'title', 'media_id'], name='content_cat_title_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='mediacontent',
+            index=models.Index(fields=['avg_rating', 'media_id'], name='content_avg_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.2.8 on 2026-10-17 14:31
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# The document is weighted so title matches rank above description matches.
+# Keep the expression in sync with content.search.SEARCH_CONFIG.
+CREATE_TRIGGER = """
+CREATE OR REPLACE FUNCTION content_mediacontent_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS content_mediacontent_search_vector_trigger ON content_mediacontent;
+CREATE TRIGGER content_mediacontent_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description ON content_mediacontent
+    FOR EACH ROW EXECUTE FUNCTION content_mediacontent_search_vector_update();
+"""
+
+BACKFILL = """
+UPDATE content_mediacontent SET search_vector =
+    setweight(to_tsvector('pg_catalog.english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('pg_catalog.english', coalesce(description, '')), 'B');
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS content_mediacontent_search_vector_trigger ON content_mediacontent;
+DROP FUNCTION IF EXISTS content_mediacontent_search_vector_update();
+"""
+
+
+def create_search_backend(apps, schema_editor):
+    """
+    Install the tsvector trigger, backfill existing rows and build the GIN
+    index. When the pg_trgm extension is available, also build a trigram
+    index on title for typo-tolerant search. Other backends keep the column
+    unused and fall back to LIKE search.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(CREATE_TRIGGER)
+        cursor.execute(BACKFILL)
+        cursor.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS content_search_vector_idx '
+            'ON content_mediacontent USING gin (search_vector)'
+        )
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone():
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            cursor.execute(
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS content_title_trgm_idx '
+                'ON content_mediacontent USING gin (title gin_trgm_ops)'
+            )
+
+
+def drop_search_backend(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('DROP INDEX CONCURRENTLY IF EXISTS content_title_trgm_idx')
+        cursor.execute('DROP INDEX CONCURRENTLY IF EXISTS content_search_vector_idx')
+        cursor.execute(DROP_TRIGGER)
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently on PostgreSQL, which cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ('content', '0003_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediacontent',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_backend, drop_search_backend),
+    ]
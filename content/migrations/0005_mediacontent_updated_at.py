@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 14:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0004_mediacontent_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediacontent',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
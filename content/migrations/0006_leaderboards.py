@@ -0,0 +1,64 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:04
+
+from django.db import migrations, models
+from core.operations import AddIndexConcurrently
+
+
+def backfill_leaderboards(apps, schema_editor):
+    from content.leaderboards import rebuild_trending_scores, refresh_leaderboards
+    media_model = apps.get_model('content', 'MediaContent')
+    rebuild_trending_scores(media_model=media_model, rating_model=apps.get_model('ratings', 'Rating'))
+    refresh_leaderboards(media_model=media_model, prior_model=apps.get_model('content', 'CategoryRatingPrior'))
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently on PostgreSQL, which cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ('content', '0005_mediacontent_updated_at'),
+        ('ratings', '0004_rating_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryRatingPrior',
+            fields=[
+                ('category', models.CharField(choices=[('game', 'Game'), ('video', 'Video'), ('artwork', 'Artwork'), ('music', 'Music')], max_length=50, primary_key=True, serialize=False)),
+                ('mean_rating', models.FloatField()),
+                ('rating_count', models.PositiveBigIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Category Rating Prior',
+                'verbose_name_plural': 'Category Rating Priors',
+            },
+        ),
+        migrations.AddField(
+            model_name='mediacontent',
+            name='bayesian_rating',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='mediacontent',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_leaderboards, migrations.RunPython.noop, atomic=True),
+        AddIndexConcurrently(
+            model_name='mediacontent',
+            index=models.Index(fields=['-bayesian_rating', '-media_id'], name='content_bayesian_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='mediacontent',
+            index=models.Index(fields=['category', '-bayesian_rating', '-media_id'], name='content_cat_bayesian_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='mediacontent',
+            index=models.Index(fields=['-trending_score', '-media_id'], name='content_trending_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='mediacontent',
+            index=models.Index(fields=['category', '-trending_score', '-media_id'], name='content_cat_trending_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-17 21:40
+
+from django.db import migrations, models
+
+
+def rescore_trending(apps, schema_editor):
+    from content.leaderboards import rebuild_trending_scores
+    rebuild_trending_scores(media_model=apps.get_model('content', 'MediaContent'), rating_model=apps.get_model('ratings', 'Rating'))
+
+
+class Migration(migrations.Migration):
+    # trending_score moves to log2 space, so every score is recomputed.
+
+    dependencies = [
+        ('content', '0006_leaderboards'),
+        ('ratings', '0006_rating_single_vote'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mediacontent',
+            name='trending_score',
+            field=models.FloatField(default=-1000000000.0, editable=False),
+        ),
+        migrations.RunPython(rescore_trending, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-17 22:05
+
+from django.db import migrations, models
+from core.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently on PostgreSQL, which cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ('content', '0007_trending_score_log2'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='mediacontent',
+            index=models.Index(fields=['rating_count', 'media_id'], name='content_rating_count_idx'),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 import uuid
 
@@ -13,6 +14,16 @@ class MediaContent(models.Model):
     - thumbnail_url: URL for a thumbnail image (optional). (TODO: Integrate with object storage bucket like S3)
     - content_url: URL for the actual media content. (TODO: Integrate with object storage bucket like S3)
     - created_at: Timestamp when the media content was added.
+    - updated_at: Timestamp of the last change, including rating aggregate updates.
+    - rating_count: Number of ratings received (maintained from the Rating table).
+    - rating_sum: Sum of all rating values received.
+    - avg_rating: Mean rating value, 0 while the content has no ratings.
+    - rating_1_count ... rating_5_count: Histogram of ratings per star value.
+    - bayesian_rating: Average shrunk towards the category mean (see content.leaderboards).
+    - trending_score: Forward-decayed rating activity, in log2 space; only meaningful relative
+      to other rows (see content.leaderboards).
+    - search_vector: Weighted full-text document (title A, description B), maintained by a
+      PostgreSQL trigger and used by content.search.FullTextSearchFilter.
     """
     CATEGORY_CHOICES = [
         ('game', 'Game'),
@@ -28,11 +39,89 @@ class MediaContent(models.Model):
     thumbnail_url = models.URLField(max_length=200, blank=True, null=True)
     content_url = models.URLField(max_length=200)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Rating aggregates, kept in sync by ratings.services on every rating write
+    # and rebuilt in bulk by the `rebuild_rating_aggregates` management command.
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveBigIntegerField(default=0, editable=False)
+    avg_rating = models.FloatField(default=0, editable=False)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Leaderboard scores, updated with the aggregates (see content.leaderboards).
+    # NO_TRENDING_SCORE stands for an empty sum: it ranks below any rating.
+    NO_TRENDING_SCORE = -1e9
+    bayesian_rating = models.FloatField(default=0, editable=False)
+    trending_score = models.FloatField(default=NO_TRENDING_SCORE, editable=False)
+
+    # Written by a database trigger on PostgreSQL; never set from Python.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    HISTOGRAM_FIELDS = {
+        1: 'rating_1_count',
+        2: 'rating_2_count',
+        3: 'rating_3_count',
+        4: 'rating_4_count',
+        5: 'rating_5_count',
+    }
 
     class Meta:
         verbose_name = "Media Content"
         verbose_name_plural = "Media Content"
         ordering = ["-created_at"]
+        # Composite indexes follow MediaContentViewSet's filter/ordering combinations.
+        # The primary key is the trailing column because keyset pagination seeks
+        # on (ordering field, pk).
+        indexes = [
+            models.Index(fields=['-created_at', '-media_id'], name='content_created_idx'),
+            models.Index(fields=['category', '-created_at', '-media_id'], name='content_cat_created_idx'),
+            models.Index(fields=['title', 'media_id'], name='content_title_idx'),
+            models.Index(fields=['category', 'title', 'media_id'], name='content_cat_title_idx'),
+            models.Index(fields=['avg_rating', 'media_id'], name='content_avg_rating_idx'),
+            models.Index(fields=['rating_count', 'media_id'], name='content_rating_count_idx'),
+            models.Index(fields=['-bayesian_rating', '-media_id'], name='content_bayesian_idx'),
+            models.Index(fields=['category', '-bayesian_rating', '-media_id'], name='content_cat_bayesian_idx'),
+            models.Index(fields=['-trending_score', '-media_id'], name='content_trending_idx'),
+            models.Index(fields=['category', '-trending_score', '-media_id'], name='content_cat_trending_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    @property
+    def rating_histogram(self):
+        """
+        Number of ratings per star value, keyed by the value as a string.
+        """
+        return {str(value): getattr(self, field) for value, field in self.HISTOGRAM_FIELDS.items()}
+
+
+class CategoryRatingPrior(models.Model):
+    """
+    Per-category rating mean used as the prior of MediaContent.bayesian_rating.
+
+    Fields:
+    - category: MediaContent category.
+    - mean_rating: Mean of all rating values in the category.
+    - rating_count: Number of ratings the mean was computed from.
+    - refreshed_at: When the prior was last recomputed.
+
+    Refreshed by the `refresh_leaderboards` management command from the content
+    aggregates, never on individual rating writes, so writes do not contend on
+    a per-category row.
+    """
+    category = models.CharField(max_length=50, choices=MediaContent.CATEGORY_CHOICES, primary_key=True)
+    mean_rating = models.FloatField()
+    rating_count = models.PositiveBigIntegerField(default=0)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Category Rating Prior"
+        verbose_name_plural = "Category Rating Priors"
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return f"{self.category}: {self.mean_rating:.2f}"
@@ -1,11 +1,28 @@
 from rest_framework import serializers
+from core.rows import RowSerializer
 from .models import MediaContent
 
 class MediaContentSerializer(serializers.ModelSerializer):
     """
     Serializer for the MediaContent model.
+    Rating aggregates are maintained server-side and exposed read-only.
+    trending_score is omitted: it only orders /contents/trending/ and its
+    magnitude depends on the decay landmark.
     """
+    rating_histogram = serializers.ReadOnlyField()
+
     class Meta:
         model = MediaContent
-        fields = '__all__'
-        read_only_fields = ('media_id', 'created_at')
+        exclude = ('search_vector', 'trending_score', *MediaContent.HISTOGRAM_FIELDS.values())
+        read_only_fields = ('media_id', 'created_at', 'updated_at', 'rating_count', 'rating_sum', 'avg_rating', 'bayesian_rating')
+
+
+class MediaContentRowSerializer(RowSerializer):
+    """
+    MediaContentSerializer for list pages, built from values() rows.
+    """
+    serializer_class = MediaContentSerializer
+    computed = {'rating_histogram': tuple(MediaContent.HISTOGRAM_FIELDS.values())}
+
+    def get_rating_histogram(self, row):
+        return {str(value): row[field] for value, field in MediaContent.HISTOGRAM_FIELDS.items()}
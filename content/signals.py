@@ -0,0 +1,9 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from core.cache import invalidate
+from .models import MediaContent
+
+
+@receiver([post_save, post_delete], sender=MediaContent)
+def invalidate_media_content_cache(sender, instance, **kwargs):
+    invalidate('content', instance.pk, created=kwargs.get('created', False))
@@ -1,9 +1,27 @@
-from django.test import TestCase
+import csv
+import math
+import os
+import time
+import unittest
+from django.db import connection
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework import filters
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from datetime import timedelta
+from django.core.management import call_command
+from django.utils import timezone
+from io import StringIO
 from users.models import User
-from content.models import MediaContent
+from content.checks import check_trending_settings
+from content.leaderboards import rebuild_trending_scores, refresh_leaderboards, trending_weight
+from content.models import CategoryRatingPrior, MediaContent
+from content.search import FullTextSearchFilter
+from content.views import MediaContentViewSet
+from ratings.models import Rating
+from ratings import services
 
 class MediaContentTests(TestCase):
     def setUp(self):
@@ -116,4 +134,371 @@ class MediaContentTests(TestCase):
 
         response = self.client.delete(detail_url, format='json')
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
-        self.assertEqual(MediaContent.objects.count(), 1)
\ No newline at end of file
+        self.assertEqual(MediaContent.objects.count(), 1)
+
+    def test_export_media_content(self):
+        """
+        Ensure anyone can export content as CSV, filtered like the list endpoint.
+        """
+        game = MediaContent.objects.create(title='Exported Game', description='Desc', category='game', content_url='http://example.com/g.zip')
+        MediaContent.objects.create(title='Other Video', description='Desc', category='video', content_url='http://example.com/v.mp4')
+        self.client.credentials()
+        response = self.client.get(reverse('mediacontent-export'), {'format': 'csv', 'category': 'game'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([row['media_id'] for row in rows], [str(game.pk)])
+        self.assertEqual(rows[0]['title'], 'Exported Game')
+        self.assertNotIn('search_vector', rows[0])
+
+class MediaContentRatingAggregateTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.content_list_url = reverse('mediacontent-list')
+        self.user = User.objects.create_user(email='rater@example.com', username='rater', password='password123')
+        self.game = MediaContent.objects.create(title='Game', description='Desc', category='game', content_url='http://example.com/game.zip')
+        self.video = MediaContent.objects.create(title='Video', description='Desc', category='video', content_url='http://example.com/video.mp4')
+        self.song = MediaContent.objects.create(title='Song', description='Desc', category='music', content_url='http://example.com/song.mp3')
+        for content, values in ((self.game, [5, 4]), (self.video, [2, 3, 1])):
+            for value in values:
+                Rating.objects.create(user=self.user, media_content=content, value=value)
+        call_command('rebuild_rating_aggregates', stdout=StringIO())
+
+    def test_rebuild_rating_aggregates_command(self):
+        """
+        Ensure the rebuild command recomputes aggregates from the Rating table.
+        """
+        self.game.refresh_from_db()
+        self.video.refresh_from_db()
+        self.song.refresh_from_db()
+        self.assertEqual((self.game.rating_count, self.game.rating_sum, self.game.avg_rating), (2, 9, 4.5))
+        self.assertEqual((self.video.rating_count, self.video.rating_sum, self.video.avg_rating), (3, 6, 2.0))
+        self.assertEqual(self.video.rating_histogram, {'1': 1, '2': 1, '3': 1, '4': 0, '5': 0})
+        self.assertEqual((self.song.rating_count, self.song.avg_rating), (0, 0))
+
+    def test_aggregates_are_read_only(self):
+        """
+        Ensure aggregates are exposed by the API but cannot be written by clients.
+        """
+        detail_url = reverse('mediacontent-detail', kwargs={'pk': self.game.media_id})
+        response = self.client.get(detail_url, format='json')
+        self.assertEqual(response.data['avg_rating'], 4.5)
+        self.assertEqual(response.data['rating_count'], 2)
+        self.assertEqual(response.data['rating_histogram'], {'1': 0, '2': 0, '3': 0, '4': 1, '5': 1})
+        self.assertNotIn('rating_5_count', response.data)
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.patch(detail_url, {'avg_rating': 1, 'rating_count': 100}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.game.refresh_from_db()
+        self.assertEqual((self.game.rating_count, self.game.avg_rating), (2, 4.5))
+
+    def test_filter_and_order_by_avg_rating(self):
+        """
+        Ensure content can be filtered by a minimum average and ordered by average rating.
+        """
+        response = self.client.get(self.content_list_url, {'min_avg_rating': 4}, format='json')
+        self.assertEqual([item['title'] for item in response.data['results']], ['Game'])
+
+        response = self.client.get(self.content_list_url, {'ordering': '-avg_rating'}, format='json')
+        self.assertEqual([item['title'] for item in response.data['results']], ['Game', 'Video', 'Song'])
+
+
+class MediaContentSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.content_list_url = reverse('mediacontent-list')
+        self.in_title = MediaContent.objects.create(title='Dragon Quest', description='An adventure.', category='game', content_url='http://example.com/dq.zip')
+        self.in_description = MediaContent.objects.create(title='Night Sky', description='A dragon crosses the sky.', category='artwork', content_url='http://example.com/sky.jpg')
+        MediaContent.objects.create(title='Calm Waters', description='Ambient tracks.', category='music', content_url='http://example.com/calm.mp3')
+
+    def search(self, text):
+        response = self.client.get(self.content_list_url, {'search': text}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['title'] for item in response.data['results']]
+
+    def test_search_matches_title_and_description(self):
+        """
+        Ensure search finds terms in either the title or the description.
+        """
+        self.assertEqual(sorted(self.search('dragon')), ['Dragon Quest', 'Night Sky'])
+        self.assertEqual(self.search('ambient'), ['Calm Waters'])
+        self.assertEqual(self.search('spaceship'), [])
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Full-text search requires PostgreSQL.')
+    def test_full_text_search_ranks_and_stems(self):
+        """
+        Ensure title matches rank above description matches and words are stemmed.
+        """
+        self.assertEqual(self.search('dragons'), ['Dragon Quest', 'Night Sky'])
+        self.assertEqual(self.search('adventures'), ['Dragon Quest'])
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Full-text search requires PostgreSQL.')
+    def test_search_vector_follows_edits(self):
+        """
+        Ensure the trigger-maintained search vector is refreshed when the title changes.
+        """
+        self.in_title.title = 'Wizard Tower'
+        self.in_title.save()
+        self.assertEqual(self.search('wizard'), ['Wizard Tower'])
+        self.assertEqual(self.search('dragon'), ['Night Sky'])
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.top_url = reverse('mediacontent-top')
+        self.trending_url = reverse('mediacontent-trending')
+        self.users = User.objects.bulk_create([User(email=f'fan{i}@example.com', username=f'fan{i}') for i in range(60)])
+
+    def make_content(self, title, category='game'):
+        return MediaContent.objects.create(title=title, description='Desc', category=category, content_url='http://example.com/item.zip')
+
+    def rate(self, content, values, age=timedelta(0)):
+        """
+        Create ratings through ratings.services, backdated by age.
+        """
+        ratings = Rating.objects.bulk_create([
+            Rating(user=user, media_content=content, value=value) for user, value in zip(self.users, values)
+        ])
+        if age:
+            Rating.objects.filter(pk__in=[rating.pk for rating in ratings]).update(created_at=timezone.now() - age)
+            ratings = list(Rating.objects.filter(pk__in=[rating.pk for rating in ratings]))
+        services.record_ratings_added(ratings)
+
+    def test_top_ranks_by_bayesian_average(self):
+        """
+        Ensure many good ratings outrank a few perfect ones, and categories filter the board.
+        """
+        few_perfect = self.make_content('Few Perfect')
+        many_good = self.make_content('Many Good')
+        mediocre = self.make_content('Mediocre')
+        self.make_content('Unrated')
+        song = self.make_content('Song', category='music')
+        self.rate(few_perfect, [5, 5])
+        self.rate(many_good, [4] * 20 + [5] * 40)
+        self.rate(mediocre, [2] * 50)
+        self.rate(song, [3])
+        refresh_leaderboards()
+
+        response = self.client.get(self.top_url, {'category': 'game'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['title'] for item in response.data['results']], ['Many Good', 'Few Perfect', 'Mediocre'])
+        prior = CategoryRatingPrior.objects.get(category='game').mean_rating
+        self.assertAlmostEqual(prior, 390 / 112)
+        self.assertAlmostEqual(response.data['results'][1]['bayesian_rating'], (10 * prior + 10) / 12)
+        titles = [item['title'] for item in self.client.get(self.top_url).data['results']]
+        self.assertEqual(titles, ['Many Good', 'Few Perfect', 'Song', 'Mediocre'])
+
+    def test_trending_prefers_recent_activity(self):
+        """
+        Ensure a few recent ratings outrank many old ones.
+        """
+        old_hit = self.make_content('Old Hit')
+        new_release = self.make_content('New Release')
+        self.rate(old_hit, [5] * 40, age=timedelta(days=60))
+        self.rate(new_release, [3] * 3)
+
+        response = self.client.get(self.trending_url)
+        self.assertEqual([item['title'] for item in response.data['results']][:2], ['New Release', 'Old Hit'])
+        self.assertNotIn('trending_score', response.data['results'][0])
+
+    def test_incremental_scores_match_rebuild(self):
+        """
+        Ensure scores maintained on rating writes match a full recomputation.
+        """
+        game = self.make_content('Game')
+        self.rate(game, [1, 2, 3, 4, 5], age=timedelta(days=3))
+        refresh_leaderboards()
+        self.client.force_authenticate(user=self.users[10])
+        response = self.client.post(reverse('rating-list'), {'media_content': str(game.pk), 'value': 4}, format='json')
+        self.client.patch(reverse('rating-detail', args=[response.data['rating_id']]), {'value': 5}, format='json')
+        self.client.force_authenticate(user=self.users[0])
+        self.client.delete(reverse('rating-detail', args=[Rating.objects.filter(value=1).get().pk]))
+        game.refresh_from_db()
+        # Writes score against the stored prior until the next refresh.
+        prior = CategoryRatingPrior.objects.get(category='game').mean_rating
+        self.assertEqual((game.rating_count, game.rating_sum), (5, 19))
+        self.assertAlmostEqual(game.bayesian_rating, (10 * prior + 19) / 15)
+
+        trending_score = game.trending_score
+        rebuild_trending_scores()
+        game.refresh_from_db()
+        self.assertAlmostEqual(trending_score, game.trending_score, delta=1e-9)
+
+    @override_settings(TRENDING_HALF_LIFE_HOURS=1)
+    def test_trending_scores_survive_a_short_half_life(self):
+        """
+        Ensure scores stay finite and exact far more than 1023 half-lives past
+        the landmark, where linear forward-decay weights overflow a double.
+        """
+        old_hit = self.make_content('Old Hit')
+        new_release = self.make_content('New Release')
+        self.make_content('Unrated')
+        self.rate(old_hit, [5] * 40, age=timedelta(days=2))
+        self.rate(new_release, [3] * 3)
+        self.assertGreater(trending_weight(timezone.now()), 1023)
+
+        titles = [item['title'] for item in self.client.get(self.trending_url).data['results']]
+        self.assertEqual(titles, ['New Release', 'Old Hit', 'Unrated'])
+        scores = dict(MediaContent.objects.values_list('title', 'trending_score'))
+        rebuild_trending_scores()
+        for title, score in MediaContent.objects.values_list('title', 'trending_score'):
+            self.assertTrue(math.isfinite(score))
+            self.assertAlmostEqual(score, scores[title], delta=1e-9)
+
+        services.record_ratings_removed(list(Rating.objects.filter(media_content=new_release)))
+        new_release.refresh_from_db()
+        self.assertEqual(new_release.trending_score, MediaContent.NO_TRENDING_SCORE)
+
+    def test_trending_settings_check(self):
+        self.assertEqual(check_trending_settings(None), [])
+        with self.settings(TRENDING_HALF_LIFE_HOURS=0):
+            self.assertEqual([error.id for error in check_trending_settings(None)], ['content.E001'])
+        with self.settings(TRENDING_LANDMARK='2025-01-01'):
+            self.assertEqual([error.id for error in check_trending_settings(None)], ['content.E001'])
+        with self.settings(TRENDING_HALF_LIFE_HOURS=1e-6):
+            self.assertEqual([error.id for error in check_trending_settings(None)], ['content.E002'])
+
+    def test_leaderboard_pages_cost_one_query(self):
+        """
+        Ensure a leaderboard page is a single keyset query at any depth.
+        """
+        for i in range(12):
+            self.rate(self.make_content(f'Game {i:02d}'), [1 + i % 5])
+        first = self.client.get(self.top_url, {'page_size': 5})
+        with self.assertNumQueries(1):
+            second = self.client.get(first.data['next'])
+        self.assertEqual(len(second.data['results']), 5)
+        self.assertIsNone(second.data['count'])
+        ranked = [item['bayesian_rating'] for item in first.data['results'] + second.data['results']]
+        self.assertEqual(ranked, sorted(ranked, reverse=True))
+
+
+@unittest.skipUnless(
+    connection.vendor == 'postgresql' and os.getenv('PIXELCORE_BENCHMARKS'),
+    'Set PIXELCORE_BENCHMARKS=1 and use PostgreSQL to run benchmarks.',
+)
+class MediaContentSearchBenchmark(TestCase):
+    """
+    Compares the LIKE search path with full-text search.
+    Table size: PIXELCORE_SEARCH_BENCHMARK_ROWS (default 1,000,000).
+    """
+    @classmethod
+    def setUpTestData(cls):
+        rows = int(os.getenv('PIXELCORE_SEARCH_BENCHMARK_ROWS', '1000000'))
+        with connection.cursor() as cursor:
+            # Generated server-side; the trigger fills search_vector for every row.
+            cursor.execute("""
+                INSERT INTO content_mediacontent (
+                    media_id, title, description, category, content_url, created_at,
+                    rating_count, rating_sum, avg_rating,
+                    rating_1_count, rating_2_count, rating_3_count, rating_4_count, rating_5_count
+                )
+                SELECT gen_random_uuid(),
+                       'Title ' || md5(i::text),
+                       'Description ' || md5((i * 7)::text) || ' ' || md5((i * 13)::text),
+                       (ARRAY['game', 'video', 'artwork', 'music'])[1 + i %% 4],
+                       'http://example.com/' || i,
+                       now() - (i || ' seconds')::interval,
+                       0, 0, 0, 0, 0, 0, 0, 0
+                FROM generate_series(1, %s) AS i
+            """, [rows])
+            # A sparse set of matches spread across the table.
+            cursor.execute("UPDATE content_mediacontent SET title = 'Dragon Saga ' || media_id WHERE random() < 0.0005")
+            cursor.execute('ANALYZE content_mediacontent')
+        cls.rows = rows
+
+    def time_search(self, backend, repeat=5):
+        request = Request(APIRequestFactory().get(reverse('mediacontent-list'), {'search': 'dragon'}))
+        timings = []
+        for _ in range(repeat):
+            # Same work as a page-number list request: COUNT plus the first page.
+            start = time.perf_counter()
+            queryset = backend.filter_queryset(request, MediaContent.objects.all(), MediaContentViewSet())
+            count = queryset.count()
+            list(queryset[:10])
+            timings.append(time.perf_counter() - start)
+        return min(timings), count
+
+    def test_full_text_search_beats_like(self):
+        like_time, like_count = self.time_search(filters.SearchFilter())
+        fts_time, fts_count = self.time_search(FullTextSearchFilter())
+        print(f'\nsearch over {self.rows} rows: LIKE {like_time * 1000:.1f} ms, full-text {fts_time * 1000:.1f} ms')
+        self.assertEqual(like_count, fts_count)
+        self.assertLess(fts_time, like_time)
+
+
+@unittest.skipUnless(
+    connection.vendor == 'postgresql' and os.getenv('PIXELCORE_BENCHMARKS'),
+    'Set PIXELCORE_BENCHMARKS=1 and use PostgreSQL to run benchmarks.',
+)
+class LeaderboardRefreshBenchmark(TestCase):
+    """
+    Shows leaderboard maintenance cost staying flat as the ratings table grows.
+    Measures a full prior refresh (every category re-scored) and a batch of
+    incremental rating writes at PIXELCORE_LEADERBOARD_BENCHMARK_ROWS ratings
+    (default 250,000) and at four times that.
+    """
+    contents = 2000
+    writes = 200
+
+    @classmethod
+    def setUpTestData(cls):
+        categories = [choice[0] for choice in MediaContent.CATEGORY_CHOICES]
+        User.objects.bulk_create([User(email=f'board{i}@example.com', username=f'board{i}') for i in range(200)])
+        MediaContent.objects.bulk_create(
+            [
+                MediaContent(title=f'Item {i}', description='Desc', category=categories[i % 4], content_url='http://example.com/c')
+                for i in range(cls.contents)
+            ],
+            batch_size=1000,
+        )
+
+    def insert_ratings(self, rows):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                WITH u AS (SELECT array_agg(user_id) AS ids FROM users_user),
+                     c AS (SELECT array_agg(media_id) AS ids FROM content_mediacontent)
+                INSERT INTO ratings_rating (rating_id, user_id, media_content_id, value, created_at, updated_at)
+                SELECT gen_random_uuid(),
+                       u.ids[1 + i %% array_length(u.ids, 1)],
+                       c.ids[1 + (i * 7919) %% array_length(c.ids, 1)],
+                       1 + (i * 31) %% 5,
+                       now() - ((i %% 86400) || ' minutes')::interval,
+                       now()
+                FROM u, c, generate_series(1::bigint, %s) AS i
+            """, [rows])
+            cursor.execute('ANALYZE ratings_rating')
+        call_command('rebuild_rating_aggregates', stdout=StringIO())
+
+    def measure(self):
+        refresh_timings = []
+        for _ in range(3):
+            # Force every category to be re-scored.
+            CategoryRatingPrior.objects.update(mean_rating=0)
+            start = time.perf_counter()
+            refresh_leaderboards()
+            refresh_timings.append(time.perf_counter() - start)
+
+        user = User.objects.first()
+        targets = list(MediaContent.objects.order_by('?')[:self.writes])
+        start = time.perf_counter()
+        for content in targets:
+            rating = Rating.objects.create(user=user, media_content=content, value=4)
+            services.record_ratings_added([rating])
+        write_time = (time.perf_counter() - start) / self.writes
+        return min(refresh_timings), write_time
+
+    def test_refresh_cost_is_flat(self):
+        rows = int(os.getenv('PIXELCORE_LEADERBOARD_BENCHMARK_ROWS', '250000'))
+        self.insert_ratings(rows)
+        small_refresh, small_write = self.measure()
+        self.insert_ratings(rows * 3)
+        large_refresh, large_write = self.measure()
+        print(
+            f'\nleaderboards at {rows} ratings: refresh {small_refresh * 1000:.1f} ms, write {small_write * 1000:.2f} ms'
+            f'\nleaderboards at {rows * 4} ratings: refresh {large_refresh * 1000:.1f} ms, write {large_write * 1000:.2f} ms'
+        )
+        # 4x the ratings; the content table is unchanged, so the cost should be too.
+        self.assertLess(large_refresh, small_refresh * 2)
+        self.assertLess(large_write, small_write * 2)
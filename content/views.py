@@ -1,18 +1,81 @@
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from drf_spectacular.utils import extend_schema
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.response import Response
+from core.asyncviews import AsyncReadMixin
+from core.cache import CachedReadMixin
+from core.conditional import ConditionalRequestMixin
+from core.exports import ExportMixin
+from core.pagination import KeysetPagination
+from core.rows import RowListMixin
 from .models import MediaContent
-from .serializers import MediaContentSerializer
+from .serializers import MediaContentRowSerializer, MediaContentSerializer
+from .filters import MediaContentFilter
+from .search import FullTextSearchFilter
+from ratings.recommendations import similar_contents
+from ratings.serializers import RecommendedContentSerializer
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 
-class MediaContentViewSet(viewsets.ModelViewSet):
+class MediaContentViewSet(ExportMixin, CachedReadMixin, RowListMixin, ConditionalRequestMixin, AsyncReadMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows media content to be viewed or edited.
     """
     queryset = MediaContent.objects.all()
     serializer_class = MediaContentSerializer
+    row_serializer_class = MediaContentRowSerializer
+    row_actions = ('list', 'top', 'trending')
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category']
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, filters.OrderingFilter]
+    filterset_class = MediaContentFilter
     search_fields = ['title', 'description']
-    ordering_fields = ['created_at', 'title']
\ No newline at end of file
+    ordering_fields = ['created_at', 'title', 'avg_rating', 'rating_count']
+    cache_label = 'content'
+    export_fields = (
+        'media_id', 'title', 'description', 'category', 'thumbnail_url', 'content_url', 'created_at', 'updated_at',
+        'rating_count', 'rating_sum', 'avg_rating', 'bayesian_rating',
+    )
+
+    # Leaderboard orderings, each backed by a (category, score, media_id) index.
+    leaderboard_orderings = {
+        'top': ('-bayesian_rating', '-media_id'),
+        'trending': ('-trending_score', '-media_id'),
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        ordering = self.leaderboard_orderings.get(self.action)
+        if ordering is not None:
+            queryset = queryset.order_by(*ordering)
+            if self.action == 'top':
+                queryset = queryset.filter(rating_count__gt=0)
+        return queryset
+
+    @extend_schema(summary="Top-rated content by Bayesian average, optionally per category")
+    @action(detail=False, methods=['get'], pagination_class=KeysetPagination)
+    def top(self, request, *args, **kwargs):
+        """
+        Content ordered by bayesian_rating. Uses keyset pagination, so every
+        page is an index range scan with no COUNT.
+        """
+        return self.list(request, *args, **kwargs)
+
+    @extend_schema(summary="Trending content by time-decayed rating activity, optionally per category")
+    @action(detail=False, methods=['get'], pagination_class=KeysetPagination)
+    def trending(self, request, *args, **kwargs):
+        """
+        Content ordered by trending_score (ratings with a decay half-life of
+        TRENDING_HALF_LIFE_HOURS). Uses keyset pagination.
+        """
+        return self.list(request, *args, **kwargs)
+
+    @extend_schema(summary="Contents most similar to this one by rating patterns")
+    @action(detail=True, methods=['get'], pagination_class=None, serializer_class=RecommendedContentSerializer)
+    def similar(self, request, *args, **kwargs):
+        """
+        "Users who rated this also liked": the content's precomputed neighbours
+        (see the `build_recommendations` command), most similar first.
+        """
+        content = self.get_object()
+        return Response(self.get_serializer(similar_contents(content.pk), many=True).data)
@@ -1,3 +1,12 @@
 from django.contrib import admin
+from .models import Job
 
-# Register your models here.
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for background jobs, mainly to inspect failed ones.
+    """
+    list_display = ('name', 'state', 'attempts', 'run_after', 'created_at')
+    list_filter = ('state', 'name')
+    search_fields = ('dedup_key',)
+    ordering = ('-id',)
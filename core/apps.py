@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.utils.module_loading import autodiscover_modules
+        from .performance import install_query_recorder
+        connection_created.connect(install_query_recorder, dispatch_uid='core.performance.install_query_recorder')
+        # Registers the background job handlers of every app (see core/jobs.py).
+        autodiscover_modules('jobs')
@@ -0,0 +1,147 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import SynchronousOnlyOperation, ValidationError
+from django.http import Http404, HttpResponse
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+
+class AsyncReadMixin:
+    """
+    Async-native list and retrieve for a ModelViewSet served over ASGI.
+
+    With ASYNC_READS enabled, `as_view` returns an async view for the routes
+    whose GET action is in `async_actions`. GET and HEAD run `adispatch` on
+    the event loop: authentication through `aauthenticate` where the
+    authenticator has one, the page (and COUNT) through the async ORM, and
+    serialization and JSON rendering in place. Other methods are passed to
+    the regular synchronous view through sync_to_async, so write paths are
+    unchanged.
+
+    Filter backends still build querysets synchronously; the few that query
+    the database while doing so (related-object filters, the one-off pg_trgm
+    check) are rerun in a thread. The browsable API is rendered in a thread
+    as well.
+    """
+    async_actions = ('list', 'retrieve')
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        if settings.ASYNC_READS and actions and actions.get('get') in cls.async_actions:
+            return cls.as_async_view(actions, **initkwargs)
+        return super().as_view(actions, **initkwargs)
+
+    @classmethod
+    def as_async_view(cls, actions, **initkwargs):
+        sync_view = super().as_view(actions, **initkwargs)
+        actions = dict(sync_view.actions)
+        actions.setdefault('head', actions['get'])
+
+        async def view(request, *args, **kwargs):
+            if request.method.lower() not in ('get', 'head'):
+                return await sync_to_async(sync_view)(request, *args, **kwargs)
+            self = cls(**sync_view.initkwargs)
+            self.action_map = actions
+            for method, action in actions.items():
+                setattr(self, method, getattr(self, action))
+            return await self.adispatch(request, *args, **kwargs)
+
+        # Carries over cls, initkwargs, actions (used by schema generation) and csrf_exempt.
+        view.__dict__.update((key, value) for key, value in sync_view.__dict__.items() if key != '__wrapped__')
+        view.__name__ = sync_view.__name__
+        view.__doc__ = sync_view.__doc__
+        return view
+
+    async def adispatch(self, request, *args, **kwargs):
+        """
+        APIView.dispatch for the async read actions.
+        """
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await self.aperform_authentication(request)
+            # request.user is set, so initial() only negotiates and checks permissions.
+            self.initial(request, *args, **kwargs)
+            response = await getattr(self, f'a{self.action}')(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return await self.arender(self.response)
+
+    async def aperform_authentication(self, request):
+        """
+        Request._authenticate, awaiting `aauthenticate` where available.
+        """
+        for authenticator in request.authenticators:
+            try:
+                if hasattr(authenticator, 'aauthenticate'):
+                    user_auth_tuple = await authenticator.aauthenticate(request)
+                else:
+                    user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+            except APIException:
+                request._not_authenticated()
+                raise
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+        request._not_authenticated()
+
+    async def arender(self, response):
+        """
+        Render the response and return it as a plain HttpResponse, which
+        Django's async handler returns as is instead of rendering it in a
+        thread.
+        """
+        if not isinstance(response, Response):
+            return response
+        if isinstance(response.accepted_renderer, JSONRenderer):
+            response.render()
+        else:
+            await sync_to_async(response.render)()
+        rendered = HttpResponse(response.content, status=response.status_code)
+        for header, value in response.items():
+            rendered[header] = value
+        return rendered
+
+    async def afilter_queryset(self, queryset):
+        try:
+            return self.filter_queryset(queryset)
+        except SynchronousOnlyOperation:
+            return await sync_to_async(self.filter_queryset)(queryset)
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        apaginate = getattr(self.paginator, 'apaginate_queryset', None)
+        if apaginate is None:
+            return await sync_to_async(self.paginate_queryset)(queryset)
+        return await apaginate(queryset, self.request, view=self)
+
+    async def aget_object(self):
+        """
+        GenericAPIView.get_object with an async lookup.
+        """
+        queryset = await self.afilter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        try:
+            obj = await queryset.aget(**filter_kwargs)
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer([row async for row in queryset], many=True).data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return Response(self.get_serializer(await self.aget_object()).data)
@@ -0,0 +1,741 @@
+import asyncio
+import datetime
+import json
+import platform
+import queue
+import random
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+import types
+import uuid
+from concurrent.futures import Future
+from contextlib import contextmanager
+from io import BytesIO, StringIO
+import django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.db.backends.signals import connection_created
+from django.test import override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import path, reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from content.models import MediaContent
+from content.serializers import MediaContentRowSerializer, MediaContentSerializer
+from content.views import MediaContentViewSet
+from core.seeding import RATING_COLUMNS, _copy
+from ratings.models import Rating
+from ratings.partitions import month_start, partition_ratings_table
+from ratings.serializers import RatingRowSerializer, RatingSerializer
+from ratings.views import RatingViewSet
+from users.models import User
+from users.serializers import LoginSerializer
+
+PERCENTILES = (50, 95, 99)
+
+
+
+@contextmanager
+def benchmark_database(keepdb=False):
+    """
+    Like the test runner: run against a test copy of `default`, never the
+    configured database's data. Replica routing is switched off meanwhile,
+    since the configured replicas still point at the real databases.
+    """
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        with override_settings(REPLICA_DATABASES=[]):
+            yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+class QueryTimer:
+    """
+    Database execute wrapper counting queries and timing them with
+    perf_counter (the debug cursor only keeps millisecond precision).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+class BenchmarkContext:
+    """
+    State shared by the scenarios of one dataset size: an API client logged in
+    as a seeded user, and sample content ids and search terms.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.client = APIClient()
+        self.user = User.objects.filter(is_superuser=False).order_by('email').first()
+        self.password = 'password123'
+        self.contents = [str(pk) for pk in MediaContent.objects.order_by('-rating_count').values_list('pk', flat=True)[:100]]
+        self.words = sorted({word for title in MediaContent.objects.values_list('title', flat=True)[:100] for word in title.split() if len(word) > 3})
+        response = self.client.post(reverse('token_obtain_pair'), {'email': self.user.email, 'password': self.password}, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + response.data['access'])
+
+    def content(self, i):
+        return self.contents[i % len(self.contents)]
+
+
+# Each scenario turns (context, iteration) into one request (method, path,
+# data). Anything it does before returning, such as creating the rating a
+# delete request removes, is not timed.
+
+def content_list(ctx, i):
+    return 'get', reverse('mediacontent-list'), None
+
+
+def content_search(ctx, i):
+    return 'get', reverse('mediacontent-list'), {'search': ctx.words[i % len(ctx.words)]}
+
+
+def content_filter(ctx, i):
+    categories = [choice[0] for choice in MediaContent.CATEGORY_CHOICES]
+    return 'get', reverse('mediacontent-list'), {'category': categories[i % len(categories)]}
+
+
+def content_ordering(ctx, i):
+    return 'get', reverse('mediacontent-list'), {'ordering': ('-avg_rating', 'title', '-rating_count')[i % 3]}
+
+
+def content_detail(ctx, i):
+    return 'get', reverse('mediacontent-detail', args=[ctx.content(i)]), None
+
+
+def rating_list(ctx, i):
+    return 'get', reverse('rating-list'), None
+
+
+def rating_create(ctx, i):
+    return 'post', reverse('rating-list'), {'media_content': ctx.content(i), 'value': i % 5 + 1}
+
+
+def rating_delete(ctx, i):
+    rating = Rating.objects.create(user=ctx.user, media_content_id=ctx.content(i), value=3)
+    return 'delete', reverse('rating-detail', args=[rating.pk]), None
+
+
+def register(ctx, i):
+    email = f'bench-{ctx.size}-{i}@example.com'
+    return 'post', reverse('register'), {'email': email, 'username': email, 'password': 'Bench-password-123', 'password2': 'Bench-password-123'}
+
+
+def login(ctx, i):
+    return 'post', reverse('token_obtain_pair'), {'email': ctx.user.email, 'password': ctx.password}
+
+
+SCENARIOS = {
+    'content_list': content_list,
+    'content_search': content_search,
+    'content_filter': content_filter,
+    'content_ordering': content_ordering,
+    'content_detail': content_detail,
+    'rating_list': rating_list,
+    'rating_create': rating_create,
+    'rating_delete': rating_delete,
+    'register': register,
+    'login': login,
+}
+
+
+def percentile(samples, pct):
+    """
+    Nearest-rank percentile of a non-empty list.
+    """
+    ordered = sorted(samples)
+    return ordered[max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))]
+
+
+def run_scenario(ctx, name, requests, warmup=5, allocation_samples=20):
+    """
+    Time `requests` sequential requests of a scenario after `warmup` untimed
+    ones, then measure allocations over a few more with tracemalloc (kept out
+    of the timed loop, since tracing slows every allocation down).
+    """
+    prepare = SCENARIOS[name]
+
+    def send(i):
+        method, path, data = prepare(ctx, i)
+        start = time.perf_counter()
+        response = getattr(ctx.client, method)(path, data, format='json')
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise RuntimeError(f'{name}: {method.upper()} {path} returned {response.status_code}: {response.content[:200]!r}')
+        return elapsed
+
+    for i in range(warmup):
+        send(i)
+
+    latencies, query_counts, query_times = [], [], []
+    for i in range(warmup, warmup + requests):
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            latencies.append(send(i))
+        query_counts.append(timer.count)
+        query_times.append(timer.seconds)
+
+    allocations = []
+    tracemalloc.start()
+    try:
+        for i in range(warmup + requests, warmup + requests + allocation_samples):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            send(i)
+            allocations.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+
+    result = {f'p{pct}_ms': percentile(latencies, pct) * 1000 for pct in PERCENTILES}
+    result.update({
+        'mean_ms': statistics.fmean(latencies) * 1000,
+        'throughput_rps': len(latencies) / sum(latencies),
+        'queries': statistics.fmean(query_counts),
+        'query_ms': statistics.fmean(query_times) * 1000,
+        'alloc_peak_kib': statistics.fmean(allocations) / 1024 if allocations else 0.0,
+        'requests': len(latencies),
+    })
+    return result
+
+
+def run_benchmarks(sizes, scenarios=None, requests=100, warmup=5, seed=42, log=None):
+    """
+    Seed the current database at each size (in ratings; users and contents
+    scale with it) and run every scenario against it. Returns a JSON-ready
+    report.
+    """
+    scenarios = list(scenarios or SCENARIOS)
+    report = {
+        'environment': {
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'response_cache': settings.RESPONSE_CACHE_ENABLED,
+            'jwt_principal': settings.JWT_PRINCIPAL,
+        },
+        'settings': {'requests': requests, 'warmup': warmup, 'seed': seed},
+        'results': {},
+    }
+    for size in sizes:
+        call_command(
+            'seed', users=max(size // 10, 10), contents=max(size // 50, 10), ratings=size, seed=seed, stdout=StringIO(),
+        )
+        ctx = BenchmarkContext(size)
+        results = report['results'][str(size)] = {}
+        for name in scenarios:
+            results[name] = run_scenario(ctx, name, requests, warmup)
+            if log:
+                log(size, name, results[name])
+    return report
+
+
+def compare(report, baseline, latency_threshold=0.25, query_threshold=0):
+    """
+    Regressions of `report` against `baseline`: p95 latency more than
+    `latency_threshold` (a fraction) above the baseline, or more than
+    `query_threshold` extra queries per request. Sizes and scenarios missing
+    from either report are skipped. Returns a list of messages.
+    """
+    regressions = []
+    for size, scenarios in report['results'].items():
+        for name, result in scenarios.items():
+            base = baseline.get('results', {}).get(size, {}).get(name)
+            if base is None:
+                continue
+            if result['p95_ms'] > base['p95_ms'] * (1 + latency_threshold):
+                regressions.append(f"{name} @ {size}: p95 {result['p95_ms']:.1f} ms vs baseline {base['p95_ms']:.1f} ms")
+            if result['queries'] > base['queries'] + query_threshold:
+                regressions.append(f"{name} @ {size}: {result['queries']:.1f} queries vs baseline {base['queries']:.1f}")
+    return regressions
+
+
+def load_report(path):
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def save_report(report, path):
+    with open(path, 'w') as handle:
+        json.dump(report, handle, indent=2, sort_keys=True)
+        handle.write('\n')
+
+
+# WSGI vs ASGI under concurrency. Each mode serves the same read endpoints
+# through Django's real handlers, driven in-process by `concurrency` clients
+# that each send requests back to back. A slow client takes `client_delay`
+# seconds to receive a response: a WSGI worker thread is blocked for that
+# time, while an ASGI server only suspends the request's task.
+
+SERVER_MODES = ('wsgi', 'asgi-sync', 'asgi-async')
+
+
+def read_urlconf(async_views):
+    """
+    URLconf with the content and rating list/detail endpoints, as regular or
+    async views (AsyncReadMixin).
+    """
+    with override_settings(ASYNC_READS=async_views):
+        module = types.ModuleType(f"benchmark_urls_{'async' if async_views else 'sync'}")
+        module.urlpatterns = [
+            path('api/contents/', MediaContentViewSet.as_view({'get': 'list'}), name='mediacontent-list'),
+            path('api/contents/<pk>/', MediaContentViewSet.as_view({'get': 'retrieve'}), name='mediacontent-detail'),
+            path('api/ratings/', RatingViewSet.as_view({'get': 'list'}), name='rating-list'),
+        ]
+    return module
+
+
+def read_paths(contents):
+    """
+    The request mix: content list and detail, and rating list.
+    """
+    paths = ['/api/contents/', '/api/ratings/']
+    paths += [f'/api/contents/{pk}/' for pk in contents[:10]]
+    return paths
+
+
+def _wsgi_request(handler, path, authorization, client_delay):
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_AUTHORIZATION': authorization,
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    status = []
+    body = handler(environ, lambda status_line, headers, exc_info=None: status.append(int(status_line.split()[0])))
+    try:
+        for _ in body:
+            pass
+        time.sleep(client_delay)
+    finally:
+        body.close()
+    return status[0]
+
+
+def run_wsgi(paths, authorization, concurrency, requests, client_delay, workers):
+    """
+    Serve the requests from `workers` threads, like a threaded WSGI server.
+    """
+    handler = WSGIHandler()
+    jobs = queue.Queue()
+    latencies, statuses, lock = [], [], threading.Lock()
+    counter = iter(range(requests))
+
+    def worker():
+        try:
+            while (job := jobs.get()) is not None:
+                path, done = job
+                try:
+                    done.set_result(_wsgi_request(handler, path, authorization, client_delay))
+                except Exception as exc:
+                    done.set_exception(exc)
+        finally:
+            connections.close_all()
+
+    def client():
+        for i in counter:
+            start = time.perf_counter()
+            done = Future()
+            jobs.put((paths[i % len(paths)], done))
+            status = done.result()
+            with lock:
+                latencies.append(time.perf_counter() - start)
+                statuses.append(status)
+
+    pool = [threading.Thread(target=worker) for _ in range(workers)]
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in pool:
+        thread.start()
+    start = time.perf_counter()
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    for _ in pool:
+        jobs.put(None)
+    for thread in pool:
+        thread.join()
+    return latencies, statuses, elapsed
+
+
+async def _asgi_request(application, path, authorization, client_delay):
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'authorization', authorization.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+    received = False
+    status = []
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # The client stays connected until the handler is done.
+        await asyncio.Future()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        elif message['type'] == 'http.response.body' and not message.get('more_body'):
+            await asyncio.sleep(client_delay)
+
+    await application(scope, receive, send)
+    return status[0]
+
+
+def run_asgi(paths, authorization, concurrency, requests, client_delay):
+    """
+    Serve the requests from one event loop, like a single ASGI worker.
+    """
+    application = ASGIHandler()
+    latencies, statuses = [], []
+    counter = iter(range(requests))
+
+    async def client():
+        for i in counter:
+            start = time.perf_counter()
+            statuses.append(await _asgi_request(application, paths[i % len(paths)], authorization, client_delay))
+            latencies.append(time.perf_counter() - start)
+
+    async def main():
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        # Close the connections of the thread sync code ran in.
+        await sync_to_async(connections.close_all)()
+        return elapsed
+
+    elapsed = asyncio.run(main())
+    return latencies, statuses, elapsed
+
+
+def run_server_benchmark(size, concurrency=100, requests=1000, client_delay=0.05, workers=8, modes=SERVER_MODES, seed=42, log=None):
+    """
+    Seed the current database at `size` ratings and run the read mix in each
+    mode: 'wsgi' (regular views on a thread pool), 'asgi-sync' (regular views
+    under ASGI, each request run in a thread) and 'asgi-async' (async views).
+    Returns a JSON-ready report.
+    """
+    call_command('seed', users=max(size // 10, 10), contents=max(size // 50, 10), ratings=size, seed=seed, stdout=StringIO())
+    user = User.objects.filter(is_superuser=False).order_by('email').first()
+    authorization = f'Bearer {LoginSerializer.get_token(user).access_token}'
+    paths = read_paths([str(pk) for pk in MediaContent.objects.order_by('-rating_count').values_list('pk', flat=True)[:10]])
+
+    report = {
+        'environment': {
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'jwt_principal': settings.JWT_PRINCIPAL,
+        },
+        'settings': {
+            'size': size, 'concurrency': concurrency, 'requests': requests,
+            'client_delay': client_delay, 'workers': workers, 'seed': seed,
+        },
+        'results': {},
+    }
+    for mode in modes:
+        with override_settings(ROOT_URLCONF=read_urlconf(async_views=mode == 'asgi-async')):
+            if mode == 'wsgi':
+                latencies, statuses, elapsed = run_wsgi(paths, authorization, concurrency, requests, client_delay, workers)
+            else:
+                latencies, statuses, elapsed = run_asgi(paths, authorization, concurrency, requests, client_delay)
+        result = {f'p{pct}_ms': percentile(latencies, pct) * 1000 for pct in PERCENTILES}
+        result.update({
+            'throughput_rps': len(latencies) / elapsed,
+            'errors': sum(1 for status in statuses if status >= 400),
+            'requests': len(latencies),
+        })
+        report['results'][mode] = result
+        if log:
+            log(mode, result)
+    return report
+
+
+# List serialization: rows per second of fetching, serializing and rendering
+# list pages with the ModelSerializer (model instances) and with the row
+# serializer (values() rows). Both outputs are checked to be byte-identical.
+
+SERIALIZATION_TARGETS = {
+    'content': (lambda: MediaContent.objects.all(), MediaContentSerializer, MediaContentRowSerializer),
+    'ratings': (lambda: Rating.objects.for_serializer(), RatingSerializer, RatingRowSerializer),
+}
+
+
+def render_page(queryset, serializer_class, row_serializer_class, page_size, rows):
+    """
+    One rendered list page: the query, serialization and JSON rendering.
+    """
+    if rows:
+        row_serializer = row_serializer_class()
+        data = row_serializer.to_representation(list(queryset.values(*row_serializer.columns)[:page_size]))
+    else:
+        data = serializer_class(list(queryset[:page_size]), many=True).data
+    return JSONRenderer().render(data)
+
+
+def run_serializer_benchmark(size, page_size=100, pages=200, targets=None, seed=42, log=None):
+    """
+    Seed the current database at `size` ratings and render `pages` list pages
+    of `page_size` rows per target, with the serializer and with row
+    serialization. Returns a JSON-ready report.
+    """
+    call_command('seed', users=max(size // 10, 10), contents=max(size // 50, 10), ratings=size, seed=seed, stdout=StringIO())
+    report = {
+        'environment': {
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'settings': {'size': size, 'page_size': page_size, 'pages': pages, 'seed': seed},
+        'results': {},
+    }
+    for name in targets or SERIALIZATION_TARGETS:
+        get_queryset, serializer_class, row_serializer_class = SERIALIZATION_TARGETS[name]
+        expected = render_page(get_queryset(), serializer_class, row_serializer_class, page_size, rows=False)
+        if render_page(get_queryset(), serializer_class, row_serializer_class, page_size, rows=True) != expected:
+            raise RuntimeError(f'{name}: row serialization output differs from {serializer_class.__name__}')
+
+        results = report['results'][name] = {}
+        for mode in ('serializer', 'rows'):
+            timer = QueryTimer()
+            start = time.perf_counter()
+            with connection.execute_wrapper(timer):
+                for _ in range(pages):
+                    render_page(get_queryset(), serializer_class, row_serializer_class, page_size, rows=mode == 'rows')
+            elapsed = time.perf_counter() - start
+            results[mode] = {
+                'rows_per_second': pages * page_size / elapsed,
+                'page_ms': elapsed / pages * 1000,
+                'query_ms': timer.seconds / pages * 1000,
+            }
+        results['speedup'] = results['rows']['rows_per_second'] / results['serializer']['rows_per_second']
+        if log:
+            log(name, results)
+    return report
+
+
+# Partitioning: single-row insert and newest-page latency while rating history
+# grows a month at a time, on the monolithic table and on the table
+# partitioned by created_at month (PostgreSQL only).
+
+PARTITION_MODES = ('monolithic', 'partitioned')
+
+
+def load_month(month, count, user_ids, content_ids, rng):
+    """
+    COPY `count` ratings with created_at spread over the month starting at `month`.
+    """
+    seconds = (month_start(month, 1) - month).total_seconds()
+    rows = []
+    for _ in range(count):
+        created = (month + datetime.timedelta(seconds=rng.random() * seconds)).isoformat()
+        rows.append((
+            str(uuid.UUID(int=rng.getrandbits(128))), rng.choice(user_ids), rng.choice(content_ids),
+            str(rng.randint(1, 5)), created, created, 'f',
+        ))
+    with transaction.atomic(), connection.cursor() as cursor:
+        _copy(cursor, Rating._meta.db_table, RATING_COLUMNS, rows)
+        cursor.execute(f'ANALYZE {Rating._meta.db_table}')
+
+
+def time_partition_step(user_ids, content_ids, inserts, pages, page_size, rng):
+    """
+    Latency samples of single-row inserts, of the newest page in the default
+    ordering and of the newest page of a seven-day created_at range.
+    """
+    samples = {'insert': [], 'page': [], 'range_page': []}
+    for _ in range(inserts):
+        start = time.perf_counter()
+        Rating.objects.create(user_id=rng.choice(user_ids), media_content_id=rng.choice(content_ids), value=rng.randint(1, 5))
+        samples['insert'].append(time.perf_counter() - start)
+    since = timezone.now() - datetime.timedelta(days=7)
+    for _ in range(pages):
+        start = time.perf_counter()
+        list(Rating.objects.for_serializer().order_by('-created_at', '-rating_id')[:page_size])
+        samples['page'].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        list(Rating.objects.for_serializer().filter(created_at__gte=since).order_by('-created_at', '-rating_id')[:page_size])
+        samples['range_page'].append(time.perf_counter() - start)
+    return samples
+
+
+def run_partition_benchmark(months=12, ratings_per_month=100000, inserts=200, pages=200, page_size=10, modes=PARTITION_MODES, seed=42, log=None):
+    """
+    For each mode, start from an empty ratings table, then load `months`
+    months of history (oldest first) one month at a time, timing `inserts`
+    inserts and `pages` newest-page reads after each. The partitioned mode
+    converts the table, so it runs after the monolithic one. Returns a
+    JSON-ready report.
+    """
+    if connection.vendor != 'postgresql':
+        raise RuntimeError('The partition benchmark requires PostgreSQL.')
+    call_command('seed', users=1000, contents=200, ratings=1000, seed=seed, stdout=StringIO())
+    user_ids = [str(pk) for pk in User.objects.values_list('pk', flat=True)]
+    content_ids = [str(pk) for pk in MediaContent.objects.values_list('pk', flat=True)]
+    first_month = month_start(timezone.now(), -months)
+
+    report = {
+        'environment': {
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'settings': {
+            'months': months, 'ratings_per_month': ratings_per_month, 'inserts': inserts, 'pages': pages,
+            'page_size': page_size, 'seed': seed,
+        },
+        'results': {},
+    }
+    for mode in [mode for mode in PARTITION_MODES if mode in modes]:
+        rng = random.Random(seed)
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {Rating._meta.db_table}')
+        if mode == 'partitioned':
+            partition_ratings_table(history_before=first_month, months_ahead=1)
+        steps = report['results'][mode] = []
+        for step in range(months):
+            load_month(month_start(first_month, step), ratings_per_month, user_ids, content_ids, rng)
+            samples = time_partition_step(user_ids, content_ids, inserts, pages, page_size, rng)
+            result = {'months': step + 1, 'rows': Rating.objects.count()}
+            for name, latencies in samples.items():
+                result.update({f'{name}_p{pct}_ms': percentile(latencies, pct) * 1000 for pct in PERCENTILES})
+            steps.append(result)
+            if log:
+                log(mode, result)
+    return report
+
+
+# Connection pooling: physical connections opened and latency of the read mix
+# at high concurrency with one persistent connection per thread
+# (CONN_MAX_AGE), a shared pool per process, and a pool with server-side
+# prepared statements (PostgreSQL with psycopg 3 only).
+
+POOL_MODES = ('persistent', 'pooled', 'prepared')
+
+
+@contextmanager
+def database_mode(mode, pool_size, prepare_threshold):
+    """
+    Reconfigure the default database for `mode` inside the block. Every
+    thread's connection must be closed before the block ends.
+    """
+    settings_dict = connection.settings_dict
+    saved = settings_dict['CONN_MAX_AGE'], settings_dict['OPTIONS']
+    options = {key: value for key, value in saved[1].items() if key not in ('pool', 'server_side_binding', 'prepare_threshold')}
+    if mode == 'persistent':
+        settings_dict['CONN_MAX_AGE'] = 600
+    else:
+        settings_dict['CONN_MAX_AGE'] = 0
+        options['pool'] = {'min_size': 1, 'max_size': pool_size, 'timeout': 30}
+    if mode == 'prepared':
+        options['server_side_binding'] = True
+        options['prepare_threshold'] = prepare_threshold
+    connection.close()
+    settings_dict['OPTIONS'] = options
+    try:
+        yield
+    finally:
+        connection.close()
+        connection.close_pool()
+        settings_dict['CONN_MAX_AGE'], settings_dict['OPTIONS'] = saved
+
+
+def run_pool_benchmark(size, concurrency=200, requests=2000, pool_size=20, prepare_threshold=5, modes=POOL_MODES, seed=42, log=None):
+    """
+    Seed the current database at `size` ratings and serve the read mix from
+    `concurrency` WSGI threads in each mode, counting the connections opened
+    to the server. Returns a JSON-ready report.
+    """
+    if connection.vendor != 'postgresql':
+        raise RuntimeError('The pool benchmark requires PostgreSQL.')
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+    if not is_psycopg3:
+        raise RuntimeError('The pool benchmark requires psycopg 3.')
+    call_command('seed', users=max(size // 10, 10), contents=max(size // 50, 10), ratings=size, seed=seed, stdout=StringIO())
+    user = User.objects.filter(is_superuser=False).order_by('email').first()
+    authorization = f'Bearer {LoginSerializer.get_token(user).access_token}'
+    paths = read_paths([str(pk) for pk in MediaContent.objects.order_by('-rating_count').values_list('pk', flat=True)[:10]])
+
+    report = {
+        'environment': {
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'settings': {
+            'size': size, 'concurrency': concurrency, 'requests': requests, 'pool_size': pool_size,
+            'prepare_threshold': prepare_threshold, 'seed': seed,
+        },
+        'results': {},
+    }
+    for mode in modes:
+        opened = []
+
+        def count_connection(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        with database_mode(mode, pool_size, prepare_threshold), override_settings(ROOT_URLCONF=read_urlconf(async_views=False)):
+            connection_created.connect(count_connection)
+            try:
+                latencies, statuses, elapsed = run_wsgi(paths, authorization, concurrency, requests, 0, concurrency)
+            finally:
+                connection_created.disconnect(count_connection)
+            if mode == 'persistent':
+                connections_opened = len(opened)
+            else:
+                # Every checkout from the pool sends connection_created; the pool counts real connections.
+                connections_opened = connection.pool.get_stats().get('connections_num', 0)
+        result = {f'p{pct}_ms': percentile(latencies, pct) * 1000 for pct in PERCENTILES}
+        result.update({
+            'throughput_rps': len(latencies) / elapsed,
+            'connections_opened': connections_opened,
+            'errors': sum(1 for status in statuses if status >= 400),
+            'requests': len(latencies),
+        })
+        report['results'][mode] = result
+        if log:
+            log(mode, result)
+    return report
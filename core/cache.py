@@ -0,0 +1,327 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+from .conditional import evaluate_cached_preconditions
+from .jobs import enqueue
+from .metrics import RESPONSE_CACHE_LOOKUPS
+from .routing import use_primary
+
+KEY_PREFIX = 'respcache'
+STAT_NAMES = ('hit', 'miss', 'stale')
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified')
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def _version_key(namespace):
+    return f'{KEY_PREFIX}:ns:{namespace}'
+
+
+def version_timeout():
+    # Namespace versions expire like the entries written under them. Writing
+    # an entry renews its versions, so a version can only expire once every
+    # entry that depends on it has.
+    return settings.RESPONSE_CACHE_TIMEOUT + settings.RESPONSE_CACHE_STALE_TIMEOUT
+
+
+def namespace_versions(namespaces):
+    """
+    Return the current version of each namespace, in order.
+
+    A namespace without a stored version (never bumped, expired or evicted)
+    starts at the current time in nanoseconds, so a lost version can never
+    make entries written under an older version reachable again.
+    """
+    cache = get_cache()
+    keys = [_version_key(namespace) for namespace in namespaces]
+    stored = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        if key not in stored:
+            cache.add(key, time.time_ns(), version_timeout())
+            stored[key] = cache.get(key)
+        versions.append(stored[key])
+    return versions
+
+
+async def anamespace_versions(namespaces):
+    """
+    namespace_versions through the cache's async API.
+    """
+    cache = get_cache()
+    keys = [_version_key(namespace) for namespace in namespaces]
+    stored = await cache.aget_many(keys)
+    versions = []
+    for key in keys:
+        if key not in stored:
+            await cache.aadd(key, time.time_ns(), version_timeout())
+            stored[key] = await cache.aget(key)
+        versions.append(stored[key])
+    return versions
+
+
+def bump_namespaces(namespaces):
+    cache = get_cache()
+    for namespace in namespaces:
+        key = _version_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), version_timeout())
+
+
+def touch_namespaces(namespaces):
+    cache = get_cache()
+    for namespace in namespaces:
+        cache.touch(_version_key(namespace), version_timeout())
+
+
+async def atouch_namespaces(namespaces):
+    cache = get_cache()
+    for namespace in namespaces:
+        await cache.atouch(_version_key(namespace), version_timeout())
+
+
+def invalidate(label, *pks, created=False):
+    """
+    Invalidate cached responses for a model.
+
+    Always bumps the `label` collection namespace (list responses). With
+    primary keys, also bumps each object's namespace (detail responses);
+    without, bumps `label:*`, which every detail response of the model
+    depends on. With `created`, the objects are new and no cached detail
+    response can contain them, so only the collection namespace is bumped.
+    Versions are bumped immediately and again on commit, so a reader that
+    cached pre-commit data in between is invalidated as well.
+    With BACKGROUND_JOBS, the second bump is a job queued in the transaction
+    instead, run by a worker shortly after the commit.
+    """
+    namespaces = [label]
+    if not pks:
+        namespaces.append(f'{label}:*')
+    elif not created:
+        namespaces.extend(f'{label}:{pk}' for pk in pks)
+    bump_namespaces(namespaces)
+    if settings.BACKGROUND_JOBS:
+        key = hashlib.sha256('\n'.join(namespaces).encode()).hexdigest()
+        enqueue('core.bump_namespaces', {'namespaces': namespaces}, dedup_key=f'bump_namespaces:{key}')
+    else:
+        transaction.on_commit(lambda: bump_namespaces(namespaces))
+
+
+def collection_namespaces(label):
+    return [label]
+
+
+def object_namespaces(label, pk):
+    return [f'{label}:*', f'{label}:{pk}']
+
+
+def _record(stat):
+    RESPONSE_CACHE_LOOKUPS.labels(stat).inc()
+    cache = get_cache()
+    key = f'{KEY_PREFIX}:stats:{stat}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+async def _arecord(stat):
+    RESPONSE_CACHE_LOOKUPS.labels(stat).inc()
+    cache = get_cache()
+    key = f'{KEY_PREFIX}:stats:{stat}'
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, None):
+            await cache.aincr(key)
+
+
+def cache_stats():
+    """
+    Return the hit/miss/stale counters shared by every process using the cache.
+    """
+    stored = get_cache().get_many([f'{KEY_PREFIX}:stats:{stat}' for stat in STAT_NAMES])
+    return {stat: stored.get(f'{KEY_PREFIX}:stats:{stat}', 0) for stat in STAT_NAMES}
+
+
+def reset_cache_stats():
+    get_cache().delete_many([f'{KEY_PREFIX}:stats:{stat}' for stat in STAT_NAMES])
+
+
+def response_cache_key(request, scope, namespaces):
+    """
+    Key for a cached response: the scope (view and action), the request URL
+    with its query parameters sorted, and the current namespace versions.
+    """
+    return _response_cache_key(request, scope, namespace_versions(namespaces))
+
+
+async def aresponse_cache_key(request, scope, namespaces):
+    return _response_cache_key(request, scope, await anamespace_versions(namespaces))
+
+
+def _response_cache_key(request, scope, versions):
+    params = sorted((key, value) for key in request.query_params for value in request.query_params.getlist(key))
+    url = f'{request.scheme}://{request.get_host()}{request.path}?{urlencode(params)}'
+    digest = hashlib.sha256(url.encode()).hexdigest()
+    versions = '.'.join(str(version) for version in versions)
+    return f'{KEY_PREFIX}:{scope}:{digest}:{versions}'
+
+
+def cached_response(request, scope, namespaces, render):
+    """
+    Return render()'s response through the shared cache.
+
+    Entries are fresh for RESPONSE_CACHE_TIMEOUT seconds and may then be served
+    stale for RESPONSE_CACHE_STALE_TIMEOUT more while a single request (holding
+    a short lock) recomputes them. Only 200 responses are stored; the data is
+    cached before rendering so content negotiation still applies, together with
+    the ETag/Last-Modified validators so cached conditional GETs can still be
+    answered with 304. The outcome is reported in an X-Cache header and counted
+    in `cache_stats`.
+    """
+    cache = get_cache()
+    key = response_cache_key(request, scope, namespaces)
+    lock_key = f'{key}:lock'
+    entry = cache.get(key)
+    locked = False
+    if entry is not None:
+        if time.time() < entry['fresh_until']:
+            return _cached(request, entry, 'hit')
+        locked = cache.add(lock_key, 1, settings.RESPONSE_CACHE_LOCK_TIMEOUT)
+        if not locked:
+            # Another request is already refreshing this entry.
+            return _cached(request, entry, 'stale')
+
+    try:
+        # From the primary: a lagging replica could store pre-write data under
+        # the namespace version the write just bumped.
+        with use_primary():
+            response = render()
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, _entry(response), settings.RESPONSE_CACHE_TIMEOUT + settings.RESPONSE_CACHE_STALE_TIMEOUT)
+            touch_namespaces(namespaces)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    _record('miss')
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+async def acached_response(request, scope, namespaces, render):
+    """
+    cached_response for async views: `render` is a coroutine function and the
+    cache is used through its async API.
+    """
+    cache = get_cache()
+    key = await aresponse_cache_key(request, scope, namespaces)
+    lock_key = f'{key}:lock'
+    entry = await cache.aget(key)
+    locked = False
+    if entry is not None:
+        if time.time() < entry['fresh_until']:
+            await _arecord('hit')
+            return _cached_response(request, entry, 'hit')
+        locked = await cache.aadd(lock_key, 1, settings.RESPONSE_CACHE_LOCK_TIMEOUT)
+        if not locked:
+            await _arecord('stale')
+            return _cached_response(request, entry, 'stale')
+
+    try:
+        with use_primary():
+            response = await render()
+        if response.status_code == status.HTTP_200_OK:
+            await cache.aset(key, _entry(response), settings.RESPONSE_CACHE_TIMEOUT + settings.RESPONSE_CACHE_STALE_TIMEOUT)
+            await atouch_namespaces(namespaces)
+    finally:
+        if locked:
+            await cache.adelete(lock_key)
+    await _arecord('miss')
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+def _entry(response):
+    return {
+        'data': response.data,
+        'headers': {header: response[header] for header in VALIDATOR_HEADERS if header in response},
+        'fresh_until': time.time() + settings.RESPONSE_CACHE_TIMEOUT,
+    }
+
+
+def _cached(request, entry, stat):
+    _record(stat)
+    return _cached_response(request, entry, stat)
+
+
+def _cached_response(request, entry, stat):
+    response = evaluate_cached_preconditions(request, entry['headers'])
+    if response is None:
+        response = Response(entry['data'], headers=entry['headers'])
+    response['X-Cache'] = stat.upper()
+    return response
+
+
+class CachedReadMixin:
+    """
+    Serve list and retrieve responses from the shared response cache.
+
+    List responses depend on the `cache_label` collection namespace and detail
+    responses on the object's namespace; model signals bump them on writes.
+    Permission checks still run on every request, before the cache is read.
+    `alist` and `aretrieve` do the same for async views.
+    """
+    cache_label = None
+
+    def list(self, request, *args, **kwargs):
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return super().list(request, *args, **kwargs)
+        return cached_response(
+            request, f'{self.basename}:list', collection_namespaces(self.cache_label),
+            lambda: super(CachedReadMixin, self).list(request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return super().retrieve(request, *args, **kwargs)
+        try:
+            # Normalize the URL value (e.g. UUID case) to the form signals use.
+            pk = self.get_queryset().model._meta.pk.to_python(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except ValidationError:
+            return super().retrieve(request, *args, **kwargs)
+        return cached_response(
+            request, f'{self.basename}:detail', object_namespaces(self.cache_label, pk),
+            lambda: super(CachedReadMixin, self).retrieve(request, *args, **kwargs),
+        )
+
+    async def alist(self, request, *args, **kwargs):
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return await super().alist(request, *args, **kwargs)
+        return await acached_response(
+            request, f'{self.basename}:list', collection_namespaces(self.cache_label),
+            lambda: super(CachedReadMixin, self).alist(request, *args, **kwargs),
+        )
+
+    async def aretrieve(self, request, *args, **kwargs):
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return await super().aretrieve(request, *args, **kwargs)
+        try:
+            pk = self.get_queryset().model._meta.pk.to_python(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except ValidationError:
+            return await super().aretrieve(request, *args, **kwargs)
+        return await acached_response(
+            request, f'{self.basename}:detail', object_namespaces(self.cache_label, pk),
+            lambda: super(CachedReadMixin, self).aretrieve(request, *args, **kwargs),
+        )
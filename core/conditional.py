@@ -0,0 +1,138 @@
+import hashlib
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+from .exceptions import PreconditionFailed
+from .performance import timed
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.sha1(repr(parts).encode()).hexdigest())
+
+
+def evaluate_preconditions(request, etag=None, last_modified=None):
+    """
+    Evaluate If-Match / If-None-Match / If-(Un)Modified-Since against the
+    given validators. Returns a 304 response for a fresh conditional GET, None
+    when the request should proceed, and raises PreconditionFailed (412) when
+    a precondition fails.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        return None
+    if response.status_code == status.HTTP_412_PRECONDITION_FAILED:
+        raise PreconditionFailed()
+    return set_validators(response, etag, last_modified)
+
+
+def evaluate_cached_preconditions(request, headers):
+    """
+    evaluate_preconditions for validators stored as response headers.
+    """
+    last_modified = headers.get('Last-Modified')
+    timestamp = parse_http_date_safe(last_modified) if last_modified else None
+    response = get_conditional_response(request, etag=headers.get('ETag'), last_modified=timestamp)
+    if response is None or response.status_code != status.HTTP_304_NOT_MODIFIED:
+        return None
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def set_validators(response, etag=None, last_modified=None):
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+class ConditionalRequestMixin:
+    """
+    ETag / Last-Modified support for ModelViewSet reads and updates.
+
+    Validators come from each row's primary key and `updated_at`, which every
+    write path maintains, so a conditional GET is answered with 304 before any
+    serialization. List ETags cover the rows of the page plus the pagination
+    metadata (count and links); lists have no Last-Modified, since a removed
+    row does not move it. Updates honor If-Match (412 on mismatch) while the
+    row is locked, so concurrent edits cannot overwrite each other.
+
+    `alist` and `aretrieve` are the same reads for async views (see
+    core.asyncviews.AsyncReadMixin).
+    """
+    last_modified_field = 'updated_at'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('update', 'partial_update'):
+            # Hold the row from the precondition check until the write commits.
+            queryset = queryset.select_for_update(of=('self',))
+        return queryset
+
+    def get_last_modified(self, instance):
+        return getattr(instance, self.last_modified_field)
+
+    def get_etag(self, instance):
+        return make_etag(instance._meta.label, str(instance.pk), self.get_last_modified(instance).isoformat())
+
+    def get_row_validator(self, row):
+        return str(row.pk), self.get_last_modified(row).isoformat()
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else list(queryset)
+        return self.list_response(request, queryset, rows, page is not None)
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset(self.get_queryset())
+        page = await self.apaginate_queryset(queryset)
+        rows = page if page is not None else [row async for row in queryset]
+        return self.list_response(request, queryset, rows, page is not None)
+
+    def list_response(self, request, queryset, rows, paginated):
+        parts = [self.get_row_validator(row) for row in rows]
+        if paginated:
+            meta = self.get_paginated_response([]).data
+            parts.append(sorted((key, value) for key, value in meta.items() if key != 'results'))
+        etag = make_etag(queryset.model._meta.label, *parts)
+
+        not_modified = evaluate_preconditions(request, etag)
+        if not_modified is not None:
+            return not_modified
+        with timed('serialize'):
+            data = self.serialize_list(rows)
+        response = self.get_paginated_response(data) if paginated else Response(data)
+        return set_validators(response, etag)
+
+    def serialize_list(self, rows):
+        return self.get_serializer(rows, many=True).data
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.retrieve_response(request, self.get_object())
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return self.retrieve_response(request, await self.aget_object())
+
+    def retrieve_response(self, request, instance):
+        etag, last_modified = self.get_etag(instance), self.get_last_modified(instance)
+        not_modified = evaluate_preconditions(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        with timed('serialize'):
+            data = self.get_serializer(instance).data
+        return set_validators(Response(data), etag, last_modified)
+
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        with transaction.atomic():
+            instance = self.get_object()
+            evaluate_preconditions(request, self.get_etag(instance), self.get_last_modified(instance))
+            serializer = self.get_serializer(instance, data=request.data, partial=partial)
+            serializer.is_valid(raise_exception=True)
+            self.perform_update(serializer)
+        return set_validators(Response(serializer.data), self.get_etag(instance), self.get_last_modified(instance))
@@ -1,3 +1,4 @@
+from rest_framework.exceptions import APIException
 from rest_framework.views import exception_handler
 from rest_framework.response import Response
 from rest_framework import status
@@ -30,3 +31,9 @@ def custom_exception_handler(exc, context):
         )
 
     return response
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The resource has been modified since the given version.'
+    default_code = 'precondition_failed'
@@ -0,0 +1,236 @@
+"""
+Durable background jobs in the core_job table, run by `manage.py run_workers`.
+
+enqueue() writes a job in the caller's transaction, so it is committed or
+rolled back together with the write that needs it, and no broker is
+involved. Workers claim ready jobs in batches with SELECT ... FOR UPDATE
+SKIP LOCKED, so concurrent workers never wait for or run each other's jobs.
+The claimed jobs of each name are passed to their handler in one call, which
+can fold them (e.g. sum counter deltas into one UPDATE per row); the
+handler's writes and the deletion of its jobs commit together.
+
+A failed call is retried one job at a time, so a bad payload only delays
+itself. Each failed attempt reschedules the job after JOB_RETRY_DELAY
+seconds, doubled per attempt, until JOB_MAX_ATTEMPTS; it is then kept as
+failed for inspection. A job whose worker died is requeued after
+JOB_CLAIM_TIMEOUT seconds.
+
+Jobs with a deduplication key coalesce while pending: enqueueing a key that
+is already queued replaces the queued payload, so handlers of deduplicated
+jobs must only need the latest one.
+"""
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, close_old_connections, connections, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+from .metrics import JOBS
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Coalesces with the pending job of the same key, which keeps its place in the queue.
+ENQUEUE_DEDUPLICATED = """
+INSERT INTO core_job (name, payload, dedup_key, state, attempts, run_after, created_at, last_error)
+VALUES (%s, %s, %s, 'pending', 0, %s, %s, '')
+ON CONFLICT (dedup_key) WHERE state = 'pending'
+DO UPDATE SET payload = EXCLUDED.payload
+"""
+
+_handlers = {}
+
+
+def handler(name):
+    """
+    Register the decorated function as the handler of `name` jobs. It is
+    called with the list of payloads of the claimed jobs, inside the
+    transaction that deletes them. Handlers live in `<app>/jobs.py` modules,
+    which are imported when Django starts.
+    """
+    def register(function):
+        _handlers[name] = function
+        return function
+    return register
+
+
+def enqueue(name, payload=None, dedup_key=None, delay=0):
+    """
+    Queue a `name` job with a JSON-serializable payload, to run after `delay`
+    seconds. Call it inside the transaction of the work it follows up on.
+    """
+    now = timezone.now()
+    job = Job(name=name, payload=payload or {}, dedup_key=dedup_key, run_after=now + timedelta(seconds=delay), created_at=now)
+    if dedup_key is None:
+        job.save(force_insert=True)
+        return
+    connection = connections[Job.objects.db]
+    params = [
+        Job._meta.get_field(field).get_db_prep_save(getattr(job, field), connection)
+        for field in ('name', 'payload', 'dedup_key', 'run_after', 'created_at')
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(ENQUEUE_DEDUPLICATED, params)
+
+
+def claim(batch_size=None):
+    """
+    Mark up to `batch_size` (default JOB_BATCH_SIZE) ready jobs as running
+    and return them, oldest first. Rows another worker is claiming are
+    skipped rather than waited for.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(state=Job.PENDING, run_after__lte=now)
+            .order_by('run_after', 'id')[:batch_size or settings.JOB_BATCH_SIZE]
+        )
+        if jobs:
+            Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                state=Job.RUNNING, claimed_at=now, attempts=F('attempts') + 1,
+            )
+    for job in jobs:
+        job.state, job.claimed_at, job.attempts = Job.RUNNING, now, job.attempts + 1
+    return jobs
+
+
+def run(jobs):
+    """
+    Run claimed jobs, one handler call per name. Returns the number of jobs
+    that finished.
+    """
+    by_name = defaultdict(list)
+    for job in jobs:
+        by_name[job.name].append(job)
+    done = 0
+    for name, group in by_name.items():
+        error, finished = _call(name, group)
+        if error is None:
+            done += finished
+            continue
+        if len(group) == 1:
+            _retry(group[0], error)
+            continue
+        for job in group:
+            error, finished = _call(name, [job])
+            if error is None:
+                done += finished
+            else:
+                _retry(job, error)
+    return done
+
+
+def _call(name, jobs):
+    # Returns (error, jobs finished). Jobs are locked first and skipped if
+    # requeue_stale took them back in the meantime.
+    try:
+        with transaction.atomic():
+            owned = list(
+                Job.objects.select_for_update()
+                .filter(pk__in=[job.pk for job in jobs], state=Job.RUNNING, claimed_at=jobs[0].claimed_at)
+                .values_list('pk', flat=True)
+            )
+            if owned:
+                owned_ids = set(owned)
+                _handlers[name]([job.payload for job in jobs if job.pk in owned_ids])
+                Job.objects.filter(pk__in=owned).delete()
+    except Exception as exc:
+        logger.warning('Job %s failed.', name, exc_info=True)
+        return exc, 0
+    JOBS.labels(name, 'done').inc(len(owned))
+    return None, len(owned)
+
+
+def _retry(job, error):
+    """
+    Record a failed attempt: reschedule the job with exponential backoff,
+    or keep it as failed once it is out of attempts.
+    """
+    claimed = Job.objects.filter(pk=job.pk, state=Job.RUNNING, claimed_at=job.claimed_at)
+    message = error if isinstance(error, str) else f'{type(error).__name__}: {error}'
+    if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+        if claimed.update(state=Job.FAILED, claimed_at=None, last_error=message):
+            logger.error('Job %s #%s failed after %s attempts.', job.name, job.pk, job.attempts)
+            JOBS.labels(job.name, 'failed').inc()
+        return
+    run_after = timezone.now() + timedelta(seconds=settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1))
+    try:
+        with transaction.atomic():
+            retried = claimed.update(state=Job.PENDING, run_after=run_after, claimed_at=None, last_error=message)
+    except IntegrityError:
+        # A job with the same dedup_key was queued since; its payload supersedes this one's.
+        retried = claimed.delete()[0]
+    if retried:
+        JOBS.labels(job.name, 'retried').inc()
+
+
+def requeue_stale():
+    """
+    Count an attempt against jobs claimed more than JOB_CLAIM_TIMEOUT seconds
+    ago, whose worker died or hung, and queue them again. Returns how many
+    there were.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_CLAIM_TIMEOUT)
+    stale = list(Job.objects.filter(state=Job.RUNNING, claimed_at__lt=cutoff).only('name', 'attempts', 'claimed_at'))
+    for job in stale:
+        _retry(job, 'Claim timed out.')
+    return len(stale)
+
+
+def run_pending(batch_size=None):
+    """
+    Claim and run jobs until none is ready. Returns the number of jobs that
+    finished.
+    """
+    done = 0
+    while jobs := claim(batch_size):
+        done += run(jobs)
+    return done
+
+
+def work(stop, batch_size=None):
+    """
+    Worker loop: claim and run jobs until `stop` (a threading or
+    multiprocessing Event) is set, waiting JOB_POLL_INTERVAL seconds
+    whenever the queue is empty or the database is unreachable. Returns the
+    number of jobs that finished.
+    """
+    done = 0
+    next_requeue = 0.0
+    while not stop.is_set():
+        # Connections follow the same lifetime rules as between requests.
+        close_old_connections()
+        try:
+            if time.monotonic() >= next_requeue:
+                requeue_stale()
+                next_requeue = time.monotonic() + settings.JOB_CLAIM_TIMEOUT / 2
+            jobs = claim(batch_size)
+            if jobs:
+                done += run(jobs)
+                continue
+        except DatabaseError:
+            logger.warning('Job worker could not reach the database.', exc_info=True)
+        stop.wait(settings.JOB_POLL_INTERVAL)
+    close_old_connections()
+    return done
+
+
+def queue_stats():
+    """
+    Jobs per state, and the seconds the oldest ready pending job has waited.
+    """
+    depth = {state: 0 for state, _ in Job.STATE_CHOICES}
+    depth.update(Job.objects.order_by().values_list('state').annotate(count=Count('pk')))
+    now = timezone.now()
+    oldest = Job.objects.filter(state=Job.PENDING, run_after__lte=now).aggregate(oldest=Min('run_after'))['oldest']
+    return {'depth': depth, 'age': (now - oldest).total_seconds() if oldest else 0.0}
+
+
+@handler('core.bump_namespaces')
+def bump_cache_namespaces(payloads):
+    # Queued by core.cache.invalidate in place of its on-commit bump.
+    from .cache import bump_namespaces
+    bump_namespaces(sorted({namespace for payload in payloads for namespace in payload['namespaces']}))
@@ -0,0 +1,36 @@
+import datetime
+import os
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from ratings.partitions import archive_partition, is_partitioned, partitions
+
+class Command(BaseCommand):
+    help = (
+        'Detaches the rating partitions that end on or before the start of --before, writes each to a '
+        'gzip-compressed CSV file in --directory and drops it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', required=True, help='First month to keep, as YYYY-MM.')
+        parser.add_argument('--directory', required=True, help='Directory the archive files are written to.')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the partitions that would be archived.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql' or not is_partitioned():
+            raise CommandError('Ratings are not partitioned; run partition_ratings first.')
+        try:
+            before = datetime.datetime.strptime(options['before'], '%Y-%m').replace(tzinfo=datetime.timezone.utc)
+        except ValueError:
+            raise CommandError('--before must be a month, as YYYY-MM.')
+        if not os.path.isdir(options['directory']):
+            raise CommandError(f"{options['directory']} is not a directory.")
+
+        cold = [partition for partition in partitions() if partition.upper <= before]
+        for partition in cold:
+            if options['dry_run']:
+                self.stdout.write(partition.name)
+                continue
+            path, rows = archive_partition(partition, options['directory'])
+            self.stdout.write(f'{partition.name}: {rows} ratings archived to {path}.')
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Archived {len(cold)} partitions.'))
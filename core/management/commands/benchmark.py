@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.benchmarks import SCENARIOS, benchmark_database, compare, load_report, run_benchmarks, save_report
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the API endpoints in-process against a freshly seeded test database and reports '
+        'latency percentiles, throughput, SQL queries and allocations per endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000', help='Comma-separated dataset sizes, in ratings.')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"Comma-separated subset of: {', '.join(SCENARIOS)}.")
+        parser.add_argument('--requests', type=int, default=100, help='Timed requests per scenario.')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per scenario before timing.')
+        parser.add_argument('--seed', type=int, default=42, help='Seed of the generated dataset.')
+        parser.add_argument('--output', help='Write the results as JSON to this file (e.g. to use as a baseline).')
+        parser.add_argument('--baseline', help='Compare against a JSON file written by --output and fail on regressions.')
+        parser.add_argument('--latency-threshold', type=float, default=0.25, help='Allowed p95 latency increase over the baseline (0.25 = 25%%).')
+        parser.add_argument('--query-threshold', type=float, default=0, help='Allowed extra SQL queries per request over the baseline.')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the benchmark database after the run.')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size]
+        scenarios = [name for name in options['scenarios'].split(',') if name]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        baseline = load_report(options['baseline']) if options['baseline'] else None
+
+        with benchmark_database(keepdb=options['keepdb']):
+            self.stdout.write(
+                f"{'size':>8} {'scenario':<18} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} "
+                f"{'queries':>8} {'SQL ms':>8} {'alloc KiB':>10}"
+            )
+            report = run_benchmarks(
+                sizes, scenarios, requests=options['requests'], warmup=options['warmup'], seed=options['seed'], log=self.log,
+            )
+
+        if options['output']:
+            save_report(report, options['output'])
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}."))
+        if baseline is not None:
+            regressions = compare(report, baseline, options['latency_threshold'], options['query_threshold'])
+            if regressions:
+                raise CommandError('Performance regressions:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
+
+    def log(self, size, name, result):
+        self.stdout.write(
+            f"{size:>8} {name:<18} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+            f"{result['throughput_rps']:>8.1f} {result['queries']:>8.1f} {result['query_ms']:>8.2f} {result['alloc_peak_kib']:>10.1f}"
+        )
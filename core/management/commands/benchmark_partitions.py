@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from core.benchmarks import PARTITION_MODES, benchmark_database, run_partition_benchmark, save_report
+
+class Command(BaseCommand):
+    help = (
+        'Measures insert and newest-page latency as rating history grows month by month, on the monolithic '
+        'and the month-partitioned ratings table, against a fresh PostgreSQL test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=12, help='Months of history loaded, one per step.')
+        parser.add_argument('--ratings-per-month', type=int, default=100000, help='Ratings loaded per month of history.')
+        parser.add_argument('--modes', default=','.join(PARTITION_MODES), help=f"Comma-separated subset of: {', '.join(PARTITION_MODES)}.")
+        parser.add_argument('--inserts', type=int, default=200, help='Timed inserts per step.')
+        parser.add_argument('--pages', type=int, default=200, help='Timed page reads per step.')
+        parser.add_argument('--page-size', type=int, default=10, help='Rows per page.')
+        parser.add_argument('--seed', type=int, default=42, help='Seed of the generated dataset.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the benchmark database after the run.')
+
+    def handle(self, *args, **options):
+        modes = [mode for mode in options['modes'].split(',') if mode]
+        unknown = set(modes) - set(PARTITION_MODES)
+        if unknown:
+            raise CommandError(f"Unknown modes: {', '.join(sorted(unknown))}")
+        if connection.vendor != 'postgresql':
+            raise CommandError('The partition benchmark requires PostgreSQL.')
+
+        with benchmark_database(keepdb=options['keepdb']):
+            self.stdout.write(
+                f"{'mode':<12} {'months':>6} {'rows':>10} {'insert p50':>10} {'insert p95':>10} "
+                f"{'page p50':>9} {'page p95':>9} {'range p50':>9}"
+            )
+            report = run_partition_benchmark(
+                months=options['months'], ratings_per_month=options['ratings_per_month'], inserts=options['inserts'],
+                pages=options['pages'], page_size=options['page_size'], modes=modes, seed=options['seed'], log=self.log,
+            )
+
+        if options['output']:
+            save_report(report, options['output'])
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}."))
+
+    def log(self, mode, result):
+        self.stdout.write(
+            f"{mode:<12} {result['months']:>6} {result['rows']:>10} {result['insert_p50_ms']:>10.2f} "
+            f"{result['insert_p95_ms']:>10.2f} {result['page_p50_ms']:>9.2f} {result['page_p95_ms']:>9.2f} "
+            f"{result['range_page_p50_ms']:>9.2f}"
+        )
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from core.benchmarks import POOL_MODES, benchmark_database, run_pool_benchmark, save_report
+
+class Command(BaseCommand):
+    help = (
+        'Compares connections opened and latency of the content and rating reads at high concurrency with '
+        'persistent per-thread connections, a shared connection pool, and a pool with prepared statements '
+        '(PostgreSQL with psycopg 3), in-process against a freshly seeded test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=10000, help='Dataset size, in ratings.')
+        parser.add_argument('--modes', default=','.join(POOL_MODES), help=f"Comma-separated subset of: {', '.join(POOL_MODES)}.")
+        parser.add_argument('--concurrency', type=int, default=200, help='Concurrent requests, each served by its own thread.')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per mode.')
+        parser.add_argument('--pool-size', type=int, default=20, help='Maximum connections of the pool.')
+        parser.add_argument('--prepare-threshold', type=int, default=5, help='Executions after which a statement is prepared.')
+        parser.add_argument('--seed', type=int, default=42, help='Seed of the generated dataset.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the benchmark database after the run.')
+
+    def handle(self, *args, **options):
+        modes = [mode for mode in options['modes'].split(',') if mode]
+        unknown = set(modes) - set(POOL_MODES)
+        if unknown:
+            raise CommandError(f"Unknown modes: {', '.join(sorted(unknown))}")
+        if connection.vendor != 'postgresql':
+            raise CommandError('The pool benchmark requires PostgreSQL.')
+
+        with benchmark_database(keepdb=options['keepdb']):
+            self.stdout.write(f"{'mode':<12} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'opened':>7} {'errors':>7}")
+            try:
+                report = run_pool_benchmark(
+                    options['size'], concurrency=options['concurrency'], requests=options['requests'],
+                    pool_size=options['pool_size'], prepare_threshold=options['prepare_threshold'], modes=modes,
+                    seed=options['seed'], log=self.log,
+                )
+            except RuntimeError as exc:
+                raise CommandError(str(exc))
+
+        if options['output']:
+            save_report(report, options['output'])
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}."))
+
+    def log(self, mode, result):
+        self.stdout.write(
+            f"{mode:<12} {result['throughput_rps']:>8.1f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+            f"{result['p99_ms']:>8.2f} {result['connections_opened']:>7} {result['errors']:>7}"
+        )
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.benchmarks import SERIALIZATION_TARGETS, benchmark_database, run_serializer_benchmark, save_report
+
+class Command(BaseCommand):
+    help = (
+        'Compares list serialization throughput (rows/sec) of the model serializers and the values() row '
+        'serializers, in-process against a freshly seeded test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=10000, help='Dataset size, in ratings.')
+        parser.add_argument('--targets', default=','.join(SERIALIZATION_TARGETS), help=f"Comma-separated subset of: {', '.join(SERIALIZATION_TARGETS)}.")
+        parser.add_argument('--page-size', type=int, default=100, help='Rows per list page.')
+        parser.add_argument('--pages', type=int, default=200, help='Pages rendered per target and mode.')
+        parser.add_argument('--seed', type=int, default=42, help='Seed of the generated dataset.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the benchmark database after the run.')
+
+    def handle(self, *args, **options):
+        targets = [name for name in options['targets'].split(',') if name]
+        unknown = set(targets) - set(SERIALIZATION_TARGETS)
+        if unknown:
+            raise CommandError(f"Unknown targets: {', '.join(sorted(unknown))}")
+
+        with benchmark_database(keepdb=options['keepdb']):
+            self.stdout.write(f"{'target':<10} {'mode':<12} {'rows/s':>10} {'page ms':>9} {'query ms':>9}")
+            report = run_serializer_benchmark(
+                options['size'], page_size=options['page_size'], pages=options['pages'], targets=targets,
+                seed=options['seed'], log=self.log,
+            )
+
+        if options['output']:
+            save_report(report, options['output'])
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}."))
+
+    def log(self, target, results):
+        for mode in ('serializer', 'rows'):
+            result = results[mode]
+            self.stdout.write(
+                f"{target:<10} {mode:<12} {result['rows_per_second']:>10.0f} {result['page_ms']:>9.2f} {result['query_ms']:>9.2f}"
+            )
+        self.stdout.write(f"{target:<10} {'speedup':<12} {results['speedup']:>9.2f}x")
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.benchmarks import SERVER_MODES, benchmark_database, run_server_benchmark, save_report
+
+class Command(BaseCommand):
+    help = (
+        'Compares WSGI and ASGI throughput for the content and rating read endpoints at high concurrency '
+        'with slow clients, in-process against a freshly seeded test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=10000, help='Dataset size, in ratings.')
+        parser.add_argument('--modes', default=','.join(SERVER_MODES), help=f"Comma-separated subset of: {', '.join(SERVER_MODES)}.")
+        parser.add_argument('--concurrency', type=int, default=100, help='Concurrent clients.')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per mode.')
+        parser.add_argument('--client-delay', type=float, default=0.05, help='Seconds each client takes to receive a response.')
+        parser.add_argument('--workers', type=int, default=8, help='WSGI worker threads.')
+        parser.add_argument('--seed', type=int, default=42, help='Seed of the generated dataset.')
+        parser.add_argument('--output', help='Write the results as JSON to this file.')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the benchmark database after the run.')
+
+    def handle(self, *args, **options):
+        modes = [mode for mode in options['modes'].split(',') if mode]
+        unknown = set(modes) - set(SERVER_MODES)
+        if unknown:
+            raise CommandError(f"Unknown modes: {', '.join(sorted(unknown))}")
+
+        with benchmark_database(keepdb=options['keepdb']):
+            self.stdout.write(f"{'mode':<12} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+            report = run_server_benchmark(
+                options['size'], concurrency=options['concurrency'], requests=options['requests'],
+                client_delay=options['client_delay'], workers=options['workers'], modes=modes, seed=options['seed'],
+                log=self.log,
+            )
+
+        if options['output']:
+            save_report(report, options['output'])
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}."))
+
+    def log(self, mode, result):
+        self.stdout.write(
+            f"{mode:<12} {result['throughput_rps']:>8.1f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+            f"{result['p99_ms']:>8.2f} {result['errors']:>7}"
+        )
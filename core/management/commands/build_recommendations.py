@@ -0,0 +1,25 @@
+import time
+from django.core.management.base import BaseCommand
+from ratings.recommendations import build_content_neighbors, update_content_neighbors
+
+class Command(BaseCommand):
+    help = 'Precomputes the most similar contents of every content from the Rating table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Only recompute contents rated since the last build (falls back to a full build if there is none).',
+        )
+        parser.add_argument('--block-size', type=int, default=256, help='Contents scored per vectorized block; bounds peak memory.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        written = None
+        if options['incremental']:
+            self.stdout.write(self.style.SUCCESS('Updating content neighbours...'))
+            written = update_content_neighbors(block_size=options['block_size'])
+        if written is None:
+            self.stdout.write(self.style.SUCCESS('Building content neighbours...'))
+            written = build_content_neighbors(block_size=options['block_size'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} neighbour rows in {elapsed:.1f}s.'))
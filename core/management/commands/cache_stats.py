@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from core.cache import cache_stats, reset_cache_stats
+
+class Command(BaseCommand):
+    help = 'Shows the response cache hit/miss/stale counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them.')
+
+    def handle(self, *args, **options):
+        stats = cache_stats()
+        lookups = sum(stats.values())
+        hit_ratio = (stats['hit'] + stats['stale']) / lookups if lookups else 0.0
+        self.stdout.write(
+            f"hits={stats['hit']} stale={stats['stale']} misses={stats['miss']} hit_ratio={hit_ratio:.2%}"
+        )
+        if options['reset']:
+            reset_cache_stats()
+            self.stdout.write(self.style.SUCCESS('Response cache counters reset.'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from ratings.services import collapse_duplicate_ratings
+
+class Command(BaseCommand):
+    help = (
+        "Collapses each user's ratings of a content into one single vote, keeping the most recently updated, "
+        'in short per-batch transactions. Run it when enabling RATINGS_SINGLE_VOTE.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of users processed per transaction.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Collapsing duplicate ratings...'))
+        deleted = collapse_duplicate_ratings(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} duplicate ratings.'))
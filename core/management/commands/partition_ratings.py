@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from ratings.partitions import ensure_partitions, is_partitioned, partition_ratings_table
+
+class Command(BaseCommand):
+    help = (
+        'Converts ratings_rating into a table partitioned by created_at month (PostgreSQL only), then '
+        'creates monthly partitions ahead of time. Safe to rerun; schedule it at least monthly.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=3, help='Months after the current one to create partitions for.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Rating partitioning requires PostgreSQL.')
+        if is_partitioned():
+            created = ensure_partitions(options['months_ahead'])
+            self.stdout.write(self.style.SUCCESS(f'Created {len(created)} partitions.'))
+            return
+        if settings.RATINGS_SINGLE_VOTE:
+            raise CommandError('Single-vote mode needs the unpartitioned table; disable RATINGS_SINGLE_VOTE first.')
+
+        self.stdout.write(self.style.SUCCESS('Partitioning ratings...'))
+        try:
+            partition_ratings_table(months_ahead=options['months_ahead'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS('Ratings are partitioned by month.'))
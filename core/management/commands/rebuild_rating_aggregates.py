@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from content.leaderboards import rebuild_trending_scores, refresh_leaderboards
+from core.cache import invalidate
+from ratings.services import rebuild_rating_aggregates
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per-content rating aggregates (count, sum, average, histogram) and leaderboard scores from the Rating table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of media content rows written per UPDATE batch.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Rebuilding rating aggregates...'))
+        with transaction.atomic():
+            written = rebuild_rating_aggregates(batch_size=options['batch_size'])
+            rebuild_trending_scores(batch_size=options['batch_size'])
+            refresh_leaderboards()
+            # bulk_update sends no signals; drop every cached content response.
+            invalidate('content')
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating aggregates for {written} media content items.'))
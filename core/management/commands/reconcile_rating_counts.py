@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from ratings.services import reconcile_rating_counts
+
+class Command(BaseCommand):
+    help = 'Repairs User.rating_count values that drifted from the Rating table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of users checked per transaction.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Reconciling user rating counts...'))
+        repaired = reconcile_rating_counts(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Repaired rating_count for {repaired} users.'))
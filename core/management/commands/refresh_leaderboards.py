@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from content.leaderboards import refresh_leaderboards
+from core.cache import invalidate
+
+class Command(BaseCommand):
+    help = 'Recomputes the per-category rating priors and re-scores Bayesian ratings where a prior moved.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Refreshing leaderboards...'))
+        with transaction.atomic():
+            means = refresh_leaderboards()
+            # Re-scoring uses QuerySet.update(), which sends no signals.
+            invalidate('content')
+        for category, mean in means.items():
+            self.stdout.write(f'{category}: prior mean {mean:.3f}')
+        self.stdout.write(self.style.SUCCESS('Leaderboards refreshed.'))
@@ -0,0 +1,55 @@
+import multiprocessing
+import signal
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from core.jobs import requeue_stale, run_pending, work
+
+
+def work_in_process(stop, batch_size):
+    # Ctrl-C reaches the whole process group; workers stop through `stop`
+    # after their current batch instead of being interrupted in it.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    work(stop, batch_size)
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs background jobs from the core_job table (see core/jobs.py) until interrupted, '
+        'in one or more worker processes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='Worker processes (more than one needs PostgreSQL).')
+        parser.add_argument('--batch-size', type=int, default=None, help='Jobs claimed at a time (default: JOB_BATCH_SIZE).')
+        parser.add_argument('--burst', action='store_true', help='Run the ready jobs in this process, then exit.')
+
+    def handle(self, *args, **options):
+        if options['burst']:
+            requeue_stale()
+            done = run_pending(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Ran {done} jobs.'))
+            return
+
+        workers = options['workers']
+        if workers > 1 and connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING('Parallel workers need PostgreSQL; running one worker.'))
+            workers = 1
+        stop = multiprocessing.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stop.set())
+        self.stdout.write(self.style.SUCCESS(f'Running {workers} job workers; press Ctrl-C to stop.'))
+        if workers == 1:
+            work(stop, options['batch_size'])
+        else:
+            # Workers must not share the parent's database connection.
+            connections.close_all()
+            processes = [
+                multiprocessing.Process(target=work_in_process, args=(stop, options['batch_size']), name=f'job-worker-{index}')
+                for index in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+        self.stdout.write(self.style.SUCCESS('Job workers stopped.'))
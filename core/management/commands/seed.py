@@ -1,91 +1,83 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.core.management.color import no_style
+from django.db import connection, connections
+from content.models import CategoryRatingPrior, MediaContent
+from core.seeding import SEED_PASSWORD, SeedPlan, create_contents, create_users, deferred_indexes, init_worker, write_ratings
+from ratings.models import ContentNeighbor, Rating
 from users.models import User
-from content.models import MediaContent
-from ratings.models import Rating
-import uuid
-from faker import Faker
-import random
 
 class Command(BaseCommand):
-    help = 'Seeds the database with sample data for users, media content, and ratings.'
+    help = (
+        'Replaces all data with a deterministic synthetic data set: users with power-law activity, '
+        'content with Zipfian popularity and ratings spread over time.'
+    )
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Number of regular users.')
+        parser.add_argument('--contents', type=int, default=200, help='Number of media content items.')
+        parser.add_argument('--ratings', type=int, default=10000, help='Number of ratings.')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; equal seeds and counts produce equal data.')
+        parser.add_argument('--days', type=int, default=365, help='Spread ratings over this many days before now.')
+        parser.add_argument('--popularity-skew', type=float, default=1.0, help='Zipf exponent of content popularity.')
+        parser.add_argument('--activity-skew', type=float, default=1.2, help='Pareto shape of user activity (smaller is more skewed).')
+        parser.add_argument('--batch-size', type=int, default=100000, help='Ratings generated and written per transaction.')
+        parser.add_argument('--workers', type=int, default=1, help='Processes writing ratings in parallel (PostgreSQL only).')
+
+    def handle(self, *args, **options):
         self.stdout.write(self.style.SUCCESS('Seeding database...'))
+        start = time.perf_counter()
+        plan = SeedPlan(
+            users=options['users'], contents=options['contents'], ratings=options['ratings'], seed=options['seed'],
+            days=options['days'], popularity_skew=options['popularity_skew'], activity_skew=options['activity_skew'],
+            shard_size=options['batch_size'],
+        )
 
-        fake = Faker()
+        # Clear existing data (keeps superusers). Rating and content tables are
+        # flushed with TRUNCATE on PostgreSQL instead of row-by-row deletes.
+        tables = [model._meta.db_table for model in (Rating, ContentNeighbor, CategoryRatingPrior, MediaContent)]
+        connection.ops.execute_sql_flush(connection.ops.sql_flush(no_style(), tables))
+        User.objects.filter(is_superuser=False).delete()
+        self.stdout.write(self.style.SUCCESS('Existing data cleared.'))
 
-        # Clear existing data (optional, but good for repeatable seeding)
-        Rating.objects.all().delete()
-        MediaContent.objects.all().delete()
-        User.objects.filter(is_superuser=False).delete() # Keep superusers if any
+        self.create_superuser()
+        with self.timed(f'Created {plan.users} users with password "{SEED_PASSWORD}"'):
+            create_users(plan)
+        # Contents and users carry their final rating aggregates and counters,
+        # computed from the same deterministic streams as the ratings.
+        with self.timed(f'Created {plan.contents} media content items'):
+            create_contents(plan)
+        with self.timed(f'Created {plan.ratings} ratings'):
+            with deferred_indexes(Rating):
+                self.write_ratings(plan, options['workers'])
 
-        self.stdout.write(self.style.SUCCESS('Existing data cleared.'))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'Database seeding complete in {elapsed:.1f}s!'))
 
-        # 1. Create 2 regular users
-        users = []
-        for i in range(2):
-            email = fake.email()
-            username = fake.user_name() + str(i) # Appending i to ensure uniqueness
-            password = 'password123' # Simple password for seeded users
-            user = User.objects.create_user(email=email, username=username, password=password)
-            users.append(user)
-            self.stdout.write(self.style.SUCCESS(f'Created regular user: {user.email}'))
+    @contextmanager
+    def timed(self, message):
+        start = time.perf_counter()
+        yield
+        self.stdout.write(self.style.SUCCESS(f'{message} in {time.perf_counter() - start:.1f}s.'))
 
-        # Create a superuser for admin access
+    def create_superuser(self):
         admin_email = 'admin@tests.com'
         admin_password = 'admin123'
         if not User.objects.filter(email=admin_email).exists():
-            superuser = User.objects.create_superuser(
-                email=admin_email,
-                username='admin',
-                password=admin_password
-            )
+            superuser = User.objects.create_superuser(email=admin_email, username='admin', password=admin_password)
             self.stdout.write(self.style.SUCCESS(f'Created superuser: {superuser.email} with password "{admin_password}"'))
         else:
             self.stdout.write(self.style.WARNING(f'Superuser with email {admin_email} already exists.'))
 
-        # 2. Create 5 media items
-        media_contents = []
-        categories = [choice[0] for choice in MediaContent.CATEGORY_CHOICES]
-        for i in range(5):
-            title = fake.sentence(nb_words=4)[:-1]
-            description = fake.paragraph(nb_sentences=3)
-            category = random.choice(categories)
-            thumbnail_url = fake.image_url()
-            content_url = fake.url()
-            media_content = MediaContent.objects.create(
-                title=title,
-                description=description,
-                category=category,
-                thumbnail_url=thumbnail_url,
-                content_url=content_url
-            )
-            media_contents.append(media_content)
-            self.stdout.write(self.style.SUCCESS(f'Created media content: {media_content.title}'))
-
-        # 3. Create 3 rating scenarios
-        # Scenario 1: Two or more ratings from one user on one media content
-        user1 = users[0]
-        content_for_multiple_ratings = media_contents[0] # Pick one content for multiple ratings
-        Rating.objects.create(user=user1, media_content=content_for_multiple_ratings, value=random.randint(1, 5))
-        self.stdout.write(self.style.SUCCESS(f'User {user1.email} rated {content_for_multiple_ratings.title} (first rating)'))
-        Rating.objects.create(user=user1, media_content=content_for_multiple_ratings, value=random.randint(1, 5))
-        self.stdout.write(self.style.SUCCESS(f'User {user1.email} rated {content_for_multiple_ratings.title} (second rating)'))
-
-        # Scenario 2: Multiple users one content
-        content1 = media_contents[0]
-        for user in users:
-            if not Rating.objects.filter(user=user, media_content=content1).exists():
-                Rating.objects.create(user=user, media_content=content1, value=random.randint(1, 5))
-                self.stdout.write(self.style.SUCCESS(f'User {user.email} rated {content1.title}'))
-
-        # Scenario 3: User rates multiple items (already covered by scenario 1 and 2, but adding more for variety)
-        user2 = users[1]
-        for i in range(2):
-            media = random.choice(media_contents)
-            if not Rating.objects.filter(user=user2, media_content=media).exists():
-                Rating.objects.create(user=user2, media_content=media, value=random.randint(1, 5))
-                self.stdout.write(self.style.SUCCESS(f'User {user2.email} rated {media.title}'))
-
-        self.stdout.write(self.style.SUCCESS('Database seeding complete!'))
+    def write_ratings(self, plan, workers):
+        if workers > 1 and connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING('Parallel workers need PostgreSQL; writing ratings in one process.'))
+            workers = 1
+        if workers <= 1:
+            return sum(write_ratings(plan, shard) for shard in plan.shards)
+        # Workers must not share the parent's database connection.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            return sum(pool.map(write_ratings, [plan] * len(plan.shards), plan.shards))
@@ -0,0 +1,188 @@
+import os
+import threading
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+# Metrics are plain prometheus_client objects. In a single process their values
+# live in memory; when PROMETHEUS_MULTIPROC_DIR is set (before the server
+# starts), every worker process writes them to its own mmap-backed files in
+# that directory instead, and `metrics_view` merges the files of all workers.
+
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+REQUESTS = Counter(
+    'pixelcore_http_requests', 'HTTP requests by route, method and status code.',
+    ['view', 'method', 'status'],
+)
+REQUEST_SECONDS = Histogram(
+    'pixelcore_http_request_duration_seconds', 'Wall time of HTTP requests.',
+    ['view', 'method'],
+)
+REQUEST_QUERIES = Histogram(
+    'pixelcore_db_queries_per_request', 'SQL queries run by one HTTP request.',
+    ['view', 'method'], buckets=QUERY_BUCKETS,
+)
+QUERY_SECONDS = Counter(
+    'pixelcore_db_query_seconds', 'Time spent running SQL queries, by route.',
+    ['view', 'method'],
+)
+CONNECTIONS = Counter(
+    'pixelcore_db_connections', 'Requests that used a database connection, by whether it was opened '
+    'for the request ("new") or kept from an earlier one under CONN_MAX_AGE ("reused").',
+    ['alias', 'state'],
+)
+# Connection pool state, summed over live processes in multiprocess mode.
+POOL_CONNECTIONS = Gauge(
+    'pixelcore_db_pool_connections', 'Connections held by the database connection pool, by state (idle or in_use).',
+    ['alias', 'state'], multiprocess_mode='livesum',
+)
+POOL_MAX_SIZE = Gauge(
+    'pixelcore_db_pool_max_size', 'Connections the database connection pool may open.',
+    ['alias'], multiprocess_mode='livesum',
+)
+POOL_WAITING = Gauge(
+    'pixelcore_db_pool_waiting', 'Requests currently waiting for a pooled connection.',
+    ['alias'], multiprocess_mode='livesum',
+)
+POOL_WAITS = Counter(
+    'pixelcore_db_pool_waits', 'Requests for a pooled connection that had to wait, by outcome (served or failed).',
+    ['alias', 'outcome'],
+)
+POOL_WAIT_SECONDS = Counter(
+    'pixelcore_db_pool_wait_seconds', 'Time spent waiting for pooled connections.',
+    ['alias'],
+)
+POOL_CONNECTIONS_OPENED = Counter(
+    'pixelcore_db_pool_connections_opened', 'Connections opened by the database connection pool.',
+    ['alias'],
+)
+REPLICA_HEALTH_CHECKS = Counter(
+    'pixelcore_db_replica_health_checks', 'Read replica health checks by alias and result (healthy or unhealthy).',
+    ['alias', 'result'],
+)
+# Queue state is read from the database at scrape time; every process sees the same values.
+JOB_QUEUE_DEPTH = Gauge(
+    'pixelcore_job_queue_depth', 'Background jobs in the queue, by state (pending, running or failed).',
+    ['state'], multiprocess_mode='livemax',
+)
+JOB_QUEUE_AGE = Gauge(
+    'pixelcore_job_queue_age_seconds', 'How long the oldest ready pending background job has waited to run.',
+    multiprocess_mode='livemax',
+)
+JOBS = Counter(
+    'pixelcore_jobs', 'Background jobs run by workers, by name and outcome (done, retried or failed).',
+    ['name', 'outcome'],
+)
+RESPONSE_CACHE_LOOKUPS = Counter(
+    'pixelcore_response_cache_lookups', 'Response cache lookups by result (hit, stale or miss).',
+    ['result'],
+)
+USER_CACHE_LOOKUPS = Counter(
+    'pixelcore_jwt_user_cache_lookups', 'JWT user cache lookups by result (hit or miss).',
+    ['result'],
+)
+LOGIN_SECONDS = Histogram(
+    'pixelcore_login_duration_seconds', 'Wall time of token requests, by outcome (success or failure).',
+    ['outcome'],
+)
+PASSWORD_HASH_SECONDS = Histogram(
+    'pixelcore_password_hash_duration_seconds', 'Time spent hashing passwords, by operation (encode or verify).',
+    ['operation'], buckets=(0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.75, 1.0, 2.0),
+)
+
+
+def observe_request(view, method, status, seconds, queries, query_seconds, connection_states):
+    """
+    Record one HTTP request. `connection_states` maps each database alias the
+    request used to "new" or "reused".
+    """
+    REQUESTS.labels(view, method, status).inc()
+    REQUEST_SECONDS.labels(view, method).observe(seconds)
+    REQUEST_QUERIES.labels(view, method).observe(queries)
+    if query_seconds:
+        QUERY_SECONDS.labels(view, method).inc(query_seconds)
+    for alias, state in connection_states.items():
+        CONNECTIONS.labels(alias, state).inc()
+    observe_pools()
+
+
+# Counters of each pool at the last observe_pools(), keyed by pool identity
+# so a recreated pool starts from zero.
+_pool_totals = {}
+_pool_totals_lock = threading.Lock()
+
+
+def observe_pools():
+    """
+    Copy the statistics of the process's database connection pools into the
+    pool metrics. Pools exist when DATABASE_POOL is enabled.
+    """
+    for alias, database in settings.DATABASES.items():
+        if not database.get('OPTIONS', {}).get('pool'):
+            continue
+        pool = connections[alias].pool
+        stats = pool.get_stats()
+        POOL_CONNECTIONS.labels(alias, 'idle').set(stats['pool_available'])
+        POOL_CONNECTIONS.labels(alias, 'in_use').set(stats['pool_size'] - stats['pool_available'])
+        POOL_MAX_SIZE.labels(alias).set(stats['pool_max'])
+        POOL_WAITING.labels(alias).set(stats['requests_waiting'])
+
+        names = ('requests_queued', 'requests_errors', 'requests_wait_ms', 'connections_num')
+        with _pool_totals_lock:
+            key, totals = _pool_totals.get(alias, (None, {}))
+            if key != id(pool):
+                totals = {}
+            current = {name: max(stats.get(name, 0), totals.get(name, 0)) for name in names}
+            delta = {name: current[name] - totals.get(name, 0) for name in names}
+            _pool_totals[alias] = (id(pool), current)
+        POOL_WAITS.labels(alias, 'served').inc(max(delta['requests_queued'] - delta['requests_errors'], 0))
+        POOL_WAITS.labels(alias, 'failed').inc(delta['requests_errors'])
+        POOL_WAIT_SECONDS.labels(alias).inc(delta['requests_wait_ms'] / 1000)
+        POOL_CONNECTIONS_OPENED.labels(alias).inc(delta['connections_num'])
+
+
+def observe_jobs():
+    """
+    Copy the depth of the background job queue into the queue metrics.
+    """
+    from .jobs import queue_stats
+    stats = queue_stats()
+    for state, count in stats['depth'].items():
+        JOB_QUEUE_DEPTH.labels(state).set(count)
+    JOB_QUEUE_AGE.set(stats['age'])
+
+
+def registry():
+    """
+    The registry to export: the process's own, or in multiprocess mode one
+    collecting the values written by every worker.
+    """
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    collector_registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collector_registry)
+    return collector_registry
+
+
+@require_GET
+def metrics_view(request):
+    """
+    Metrics in the Prometheus text exposition format. Scrapers must send
+    METRICS_TOKEN as a bearer token; without a token, metrics are only
+    served when DEBUG is on.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            return HttpResponseForbidden()
+    elif not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    observe_pools()
+    if settings.BACKGROUND_JOBS:
+        observe_jobs()
+    return HttpResponse(generate_latest(registry()), content_type=CONTENT_TYPE_LATEST)
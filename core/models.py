@@ -1,3 +1,55 @@
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class Job(models.Model):
+    """
+    A background job, run by `manage.py run_workers` (see core/jobs.py).
+
+    Fields:
+    - name: The registered handler that runs the job.
+    - payload: JSON arguments passed to the handler.
+    - dedup_key: Optional key; at most one pending job per key exists, and
+      enqueueing the key again replaces that job's payload.
+    - state: pending (queued or waiting for a retry), running (claimed by a
+      worker) or failed (out of attempts). Finished jobs are deleted.
+    - attempts: Number of times a worker claimed the job.
+    - run_after: The job is not claimed before this time.
+    - claimed_at: When the current worker claimed the job.
+    - last_error: The error of the last failed attempt.
+    - created_at: Timestamp when the job was first enqueued.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATE_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    dedup_key = models.CharField(max_length=200, null=True, blank=True)
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Job"
+        verbose_name_plural = "Jobs"
+        # Partial, so the indexes only hold the few rows workers look for,
+        # however many failed jobs are kept.
+        indexes = [
+            models.Index(fields=['run_after', 'id'], condition=models.Q(state='pending'), name='job_pending_idx'),
+            models.Index(fields=['claimed_at'], condition=models.Q(state='running'), name='job_running_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['dedup_key'], condition=models.Q(state='pending'), name='job_pending_dedup_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.state})"
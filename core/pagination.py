@@ -1,9 +1,359 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from asgiref.sync import sync_to_async
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimate_count(queryset):
+    """
+    Cheap row-count estimate for a queryset.
+
+    On PostgreSQL an unfiltered queryset reads the planner statistics in
+    pg_class.reltuples and a filtered one reads the row estimate of its
+    EXPLAIN plan, so neither scans the table. Other backends (and tables that
+    have never been analyzed) fall back to an exact COUNT(*).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            estimate = row[0] if row else -1
+        else:
+            sql, params = queryset.order_by().query.sql_with_params()
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = int(plan[0]['Plan']['Plan Rows'])
+
+    # reltuples is -1 until the table is first analyzed.
+    if estimate < 0:
+        return queryset.count()
+    return estimate
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on (ordering field, primary key).
+
+    Pages are fetched with a `WHERE (field, pk) < (last field, last pk)` seek
+    instead of OFFSET, so deep pages cost the same as the first one. The
+    ordering field is whatever the queryset is ordered by (the OrderingFilter
+    choice or the model's default `-created_at`), with the primary key as a
+    tie-breaker. Cursors are signed and opaque to clients.
+
+    The total count is optional: `count=exact` runs COUNT(*), `count=estimate`
+    uses `estimate_count`, and by default no count is computed.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    default_ordering = '-created_at'
+    cursor_salt = 'core.pagination.KeysetPagination'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.seek(queryset, request)
+        self.count = self.get_count(queryset, request)
+        return self.page_rows(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset for async views, with the page and count read
+        through the async ORM.
+        """
+        page_queryset = self.seek(queryset, request)
+        self.count = await self.aget_count(queryset, request)
+        return self.page_rows([row async for row in page_queryset])
+
+    def seek(self, queryset, request):
+        """
+        Return the unevaluated queryset of the requested page, plus one row to
+        tell whether there are more.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        ordering, field_name, descending = self.get_ordering(queryset)
+        model_field = queryset.model._meta.get_field(field_name)
+        pk_field = queryset.model._meta.pk
+
+        cursor = self.decode_cursor(request, ordering)
+        self._keyset = (ordering, field_name, pk_field.name)
+        self._cursor = cursor
+
+        # Walking backwards flips the sort so the seek still reads forwards.
+        reverse = bool(cursor and cursor['r'])
+        descending_scan = descending != reverse
+        prefix = '-' if descending_scan else ''
+        queryset = queryset.order_by(f'{prefix}{field_name}', f'{prefix}{pk_field.name}')
+
+        if cursor:
+            try:
+                value = model_field.to_python(cursor['v'])
+                pk = pk_field.to_python(cursor['k'])
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            lookup = 'lt' if descending_scan else 'gt'
+            # The redundant inclusive bound gives the planner an index range
+            # condition; the OR alone would only be applied as a filter.
+            queryset = queryset.filter(
+                Q(**{f'{field_name}__{lookup}e': value}),
+                Q(**{f'{field_name}__{lookup}': value}) | Q(**{field_name: value, f'pk__{lookup}': pk}),
+            )
+        return queryset[:self.page_size + 1]
+
+    def page_rows(self, rows):
+        """
+        Trim the rows fetched from `seek`'s queryset to the page and set the
+        next/previous cursors.
+        """
+        ordering, field_name, pk_name = self._keyset
+        cursor = self._cursor
+        reverse = bool(cursor and cursor['r'])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, cursor is not None
+
+        self.next_cursor = None
+        self.previous_cursor = None
+        if rows and has_next:
+            self.next_cursor = self.encode_cursor(ordering, rows[-1], field_name, pk_name, reverse=False)
+        if rows and has_previous:
+            self.previous_cursor = self.encode_cursor(ordering, rows[0], field_name, pk_name, reverse=True)
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        """
+        Return (ordering, field name, descending) for the keyset. Only plain
+        model fields can be seeked on; anything else falls back to
+        `default_ordering`.
+        """
+        candidates = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        for ordering in candidates[:1] + [self.default_ordering, '-pk']:
+            if not isinstance(ordering, str):
+                continue
+            field_name = ordering.lstrip('-')
+            if field_name == 'pk':
+                field_name = queryset.model._meta.pk.name
+            try:
+                field = queryset.model._meta.get_field(field_name)
+            except FieldDoesNotExist:
+                continue
+            if field.is_relation or not field.concrete:
+                continue
+            descending = ordering.startswith('-')
+            return f"{'-' if descending else ''}{field_name}", field_name, descending
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            return queryset.count()
+        if mode == 'estimate':
+            return estimate_count(queryset)
+        return None
+
+    async def aget_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            return await queryset.acount()
+        if mode == 'estimate':
+            return await sync_to_async(estimate_count)(queryset)
+        return None
+
+    def encode_cursor(self, ordering, row, field_name, pk_name, reverse):
+        payload = {
+            'o': ordering,
+            'v': self._to_json(self._position(row, field_name)),
+            'k': self._to_json(self._position(row, pk_name)),
+            'r': int(reverse),
+        }
+        return signing.dumps(payload, salt=self.cursor_salt, compress=True)
+
+    def decode_cursor(self, request, ordering):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            cursor = signing.loads(token, salt=self.cursor_salt)
+        except signing.BadSignature:
+            raise NotFound(self.invalid_cursor_message)
+        # A cursor is only meaningful for the ordering it was issued for.
+        if not isinstance(cursor, dict) or cursor.get('o') != ordering:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def get_next_link(self):
+        return self._link(self.next_cursor)
+
+    def get_previous_link(self):
+        return self._link(self.previous_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer', 'nullable': True, 'example': 123},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque cursor returned in the next/previous links.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': self.count_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Include a total count: `exact` or `estimate`. Omitted by default.',
+                'schema': {'type': 'string', 'enum': ['exact', 'estimate']},
+            },
+        ]
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), 'page')
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    @staticmethod
+    def _position(row, name):
+        # Rows may be model instances or values() dicts.
+        if isinstance(row, dict):
+            return row[name]
+        return getattr(row, name)
+
+    @staticmethod
+    def _to_json(value):
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return str(value)
+
 
 class CustomPageNumberPagination(PageNumberPagination):
     """
     Custom pagination class for consistent pagination across the API.
+
+    Page-number pagination stays the default. Clients can opt into keyset
+    pagination per request with `pagination=cursor` (or by following a
+    `cursor` link), which avoids COUNT(*) and OFFSET on large tables.
     """
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+    pagination_query_param = 'pagination'
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.wants_keyset(request):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset for async views: COUNT(*) and the page are read
+        through the async ORM.
+        """
+        self.keyset = None
+        if self.wants_keyset(request):
+            self.keyset = self.keyset_class()
+            return await self.keyset.apaginate_queryset(queryset, request, view)
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Paginator.count is a cached_property; fill it so nothing counts synchronously.
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [row async for row in self.page.object_list]
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return list(self.page)
+
+    def wants_keyset(self, request):
+        return (
+            request.query_params.get(self.pagination_query_param) == 'cursor'
+            or self.keyset_class.cursor_query_param in request.query_params
+        )
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.append({
+            'name': self.pagination_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Set to `cursor` for keyset pagination (no COUNT/OFFSET).',
+            'schema': {'type': 'string', 'enum': ['page', 'cursor']},
+        })
+        known = {parameter['name'] for parameter in parameters}
+        parameters.extend(
+            parameter for parameter in self.keyset_class().get_schema_operation_parameters(view)
+            if parameter['name'] not in known
+        )
+        return parameters
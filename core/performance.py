@@ -0,0 +1,303 @@
+import bisect
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from rest_framework.renderers import JSONRenderer
+from . import metrics
+
+logger = logging.getLogger('core.performance')
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open.
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """
+    Time spent in each phase of one request, in seconds, plus the number of
+    database queries and the aliases of the connections they ran on. Phases
+    can nest: `db` time spent during `auth` counts towards both.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.queries = 0
+        self.active = set()
+        self.aliases = set()
+        self.opened = set()
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def connection_states(self):
+        """
+        {alias: 'new' | 'reused'} for each connection the request queried:
+        opened during the request, or kept from an earlier one (CONN_MAX_AGE).
+        """
+        return {alias: 'new' if alias in self.opened else 'reused' for alias in self.aliases}
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper installed on every connection (see
+    `install_query_recorder`). Queries are attributed to the request through
+    a context variable, which asgiref copies into sync_to_async threads, so
+    async ORM calls are counted as well.
+    """
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.aliases.add(context['connection'].alias)
+        timings.add('db', time.perf_counter() - start)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    connection_created receiver (connected in CoreConfig.ready).
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+    timings = _current.get()
+    if timings is not None:
+        timings.opened.add(connection.alias)
+
+
+@contextmanager
+def timed(phase):
+    """
+    Add the duration of the block to `phase` of the current request, if it is
+    being instrumented. Blocks nested in a block of the same phase are not
+    counted twice.
+    """
+    timings = _current.get()
+    if timings is None or phase in timings.active:
+        yield
+        return
+    timings.active.add(phase)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.active.discard(phase)
+        timings.add(phase, time.perf_counter() - start)
+
+
+class RollingHistogram:
+    """
+    Latency histogram over the last `windows` x `window_seconds` seconds,
+    kept as a ring of per-window bucket counts so old requests age out
+    without storing individual samples.
+    """
+
+    def __init__(self, window_seconds=60, windows=5):
+        self.window_seconds = window_seconds
+        self.windows = windows
+        self._ring = [(None, [0] * (len(LATENCY_BUCKETS_MS) + 1), [0.0]) for _ in range(windows)]
+        self._lock = threading.Lock()
+
+    def observe(self, milliseconds, now=None):
+        window = int((time.time() if now is None else now) // self.window_seconds)
+        slot = window % self.windows
+        bucket = bisect.bisect_left(LATENCY_BUCKETS_MS, milliseconds)
+        with self._lock:
+            start, counts, total = self._ring[slot]
+            if start != window:
+                counts, total = [0] * (len(LATENCY_BUCKETS_MS) + 1), [0.0]
+                self._ring[slot] = (window, counts, total)
+            counts[bucket] += 1
+            total[0] += milliseconds
+
+    def snapshot(self, now=None):
+        """
+        Return {'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'buckets'}
+        over the live windows. Percentiles are bucket upper bounds (None for
+        the open bucket).
+        """
+        current = int((time.time() if now is None else now) // self.window_seconds)
+        counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        total = 0.0
+        with self._lock:
+            for start, window_counts, window_total in self._ring:
+                if start is not None and current - start < self.windows:
+                    counts = [a + b for a, b in zip(counts, window_counts)]
+                    total += window_total[0]
+        count = sum(counts)
+        snapshot = {'count': count, 'mean_ms': total / count if count else 0.0, 'buckets': counts}
+        for pct in (50, 95, 99):
+            snapshot[f'p{pct}_ms'] = self._percentile(counts, count, pct)
+        return snapshot
+
+    @staticmethod
+    def _percentile(counts, count, pct):
+        if not count:
+            return 0.0
+        rank, seen = pct / 100 * count, 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS_MS + (None,), counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return None
+
+
+class ViewHistograms:
+    """
+    Per-process RollingHistogram per view, keyed by "METHOD view-name".
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, key, milliseconds):
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(
+                    key, RollingHistogram(settings.PERFORMANCE_WINDOW_SECONDS, settings.PERFORMANCE_WINDOWS),
+                )
+        histogram.observe(milliseconds)
+
+    def snapshot(self):
+        return {key: histogram.snapshot() for key, histogram in sorted(self._histograms.items())}
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+view_histograms = ViewHistograms()
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer whose encoding time counts towards the `serialize` phase.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('serialize'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class TimedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    Django's default hasher, with hashing time counted towards the `password`
+    phase and the password hash metric. Stored hashes are unchanged.
+    """
+
+    def encode(self, password, salt, iterations=None):
+        with timed('password'), metrics.PASSWORD_HASH_SECONDS.labels('encode').time():
+            return super().encode(password, salt, iterations)
+
+    def verify(self, password, encoded):
+        with timed('password'), metrics.PASSWORD_HASH_SECONDS.labels('verify').time():
+            return super().verify(password, encoded)
+
+
+class PerformanceMiddleware:
+    """
+    Per-request instrumentation: wall time, database query count and time,
+    and the `auth`, `password` and `serialize` phases recorded with `timed`.
+
+    Every request feeds the per-view rolling histograms and is checked
+    against PERFORMANCE_QUERY_BUDGET and PERFORMANCE_TIME_BUDGET_MS; requests
+    over budget are always logged. The `password` phase does not count
+    against the time budget: password hashing is slow by design, and would
+    put every login and registration over it. Other requests are logged with probability
+    PERFORMANCE_SAMPLE_RATE, as one JSON object per line on the
+    `core.performance` logger. With PERFORMANCE_SERVER_TIMING the phases are
+    also returned in a Server-Timing header. Every request is also recorded in
+    the Prometheus metrics of `core.metrics`.
+
+    Runs natively under both WSGI and ASGI. The per-request cost is a few
+    timer calls, one wrapper call per query and one locked histogram update; only sampled and over-budget requests pay for
+    JSON encoding and log I/O.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not settings.PERFORMANCE_ENABLED:
+            return self.get_response(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if not settings.PERFORMANCE_ENABLED:
+            return await self.get_response(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings, time.perf_counter() - start)
+
+    def finish(self, request, response, timings, total):
+        timings.add('total', total)
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else 'unresolved'
+        view = f'{request.method} {view_name}'
+        view_histograms.observe(view, total * 1000)
+        metrics.observe_request(
+            view_name, request.method, response.status_code, total,
+            timings.queries, timings.phases.get('db', 0.0), timings.connection_states(),
+        )
+
+        over_budget = []
+        if timings.queries > settings.PERFORMANCE_QUERY_BUDGET:
+            over_budget.append('queries')
+        if (total - timings.phases.get('password', 0.0)) * 1000 > settings.PERFORMANCE_TIME_BUDGET_MS:
+            over_budget.append('time')
+        if over_budget or random.random() < settings.PERFORMANCE_SAMPLE_RATE:
+            self.log(request, response, view, timings, over_budget)
+        if settings.PERFORMANCE_SERVER_TIMING:
+            response['Server-Timing'] = self.server_timing(timings)
+        return response
+
+    def log(self, request, response, view, timings, over_budget):
+        record = {
+            'event': 'request',
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'queries': timings.queries,
+            **{f'{phase}_ms': round(seconds * 1000, 3) for phase, seconds in timings.phases.items()},
+            'over_budget': over_budget,
+        }
+        logger.log(logging.WARNING if over_budget else logging.INFO, json.dumps(record))
+
+    @staticmethod
+    def server_timing(timings):
+        metrics = [f'db;dur={timings.phases.get("db", 0.0) * 1000:.1f};desc="{timings.queries} queries"']
+        metrics += [f'{phase};dur={seconds * 1000:.1f}' for phase, seconds in timings.phases.items() if phase != 'db']
+        return ', '.join(metrics)
@@ -0,0 +1,231 @@
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.functional import SimpleLazyObject, empty
+from .metrics import REPLICA_HEALTH_CHECKS
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_KEY_PREFIX = 'primary-pin'
+
+# The request whose reads may go to a replica; None outside safe-method requests.
+_replica_request = ContextVar('replica_request', default=None)
+
+
+def _user(request):
+    # The request's user if it has already been resolved (by DRF authentication
+    # or an evaluated session user). Never triggers a lookup, which would
+    # itself be routed.
+    user = request.__dict__.get('user')
+    if isinstance(user, SimpleLazyObject):
+        user = None if user._wrapped is empty else user._wrapped
+    if user is None or not user.is_authenticated:
+        return None
+    return user
+
+
+def _pin_key(user_pk):
+    return f'{PIN_KEY_PREFIX}:{user_pk}'
+
+
+def pin_to_primary(request):
+    """
+    Read from the primary for the request's user for the next
+    REPLICA_STICKY_SECONDS, so they see their own writes while replicas
+    catch up.
+    """
+    user = _user(request)
+    if user is not None and settings.REPLICA_DATABASES and settings.REPLICA_STICKY_SECONDS > 0:
+        caches[settings.REPLICA_PIN_CACHE_ALIAS].set(_pin_key(user.pk), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def is_pinned(request):
+    user = _user(request)
+    if user is None:
+        return False
+    # Once per request and user: the router runs for every query.
+    memo = request.__dict__.get('_primary_pin')
+    if memo is None or memo[0] != user.pk:
+        memo = (user.pk, caches[settings.REPLICA_PIN_CACHE_ALIAS].get(_pin_key(user.pk), False))
+        request._primary_pin = memo
+    return memo[1]
+
+
+@contextmanager
+def replica_reads(request):
+    """
+    Let reads made inside the block go to a replica, unless the request's user
+    is pinned to the primary.
+    """
+    token = _replica_request.set(request)
+    try:
+        yield
+    finally:
+        _replica_request.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """
+    Read from the primary inside the block.
+    """
+    token = _replica_request.set(None)
+    try:
+        yield
+    finally:
+        _replica_request.reset(token)
+
+
+def check_replica(alias):
+    """
+    Whether `alias` accepts queries and, on PostgreSQL with
+    REPLICA_MAX_LAG_SECONDS set, replays the primary's WAL within that lag.
+    """
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql' and settings.REPLICA_MAX_LAG_SECONDS:
+                # NULL when the server is not a standby.
+                cursor.execute('SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())')
+                (lag,) = cursor.fetchone()
+                if lag is not None and lag > settings.REPLICA_MAX_LAG_SECONDS:
+                    logger.warning('Replica %s is %.1fs behind the primary.', alias, lag)
+                    return False
+            else:
+                cursor.execute('SELECT 1')
+    except DatabaseError:
+        logger.warning('Replica %s failed its health check.', alias, exc_info=True)
+        connection.close_if_unusable_or_obsolete()
+        return False
+    return True
+
+
+class ReplicaSet:
+    """
+    Round-robin over the REPLICA_DATABASES that passed their last health
+    check. Each replica is checked at most once per
+    REPLICA_HEALTH_CHECK_INTERVAL seconds per process, by the first read that
+    needs it after the interval; a failed replica is skipped until its next
+    check.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.turns = itertools.count()
+        self.checked_at = {}
+        self.healthy = {}
+
+    def choose(self):
+        """
+        The replica alias for the next read, or None if none is healthy.
+        """
+        aliases = settings.REPLICA_DATABASES
+        start = next(self.turns)
+        for offset in range(len(aliases)):
+            alias = aliases[(start + offset) % len(aliases)]
+            if self.is_healthy(alias):
+                return alias
+        return None
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        with self.lock:
+            due = now - self.checked_at.get(alias, float('-inf')) >= settings.REPLICA_HEALTH_CHECK_INTERVAL
+            if not due:
+                return self.healthy[alias]
+            # Claimed before checking, so concurrent reads keep the previous verdict meanwhile.
+            self.checked_at[alias] = now
+            previous = self.healthy.setdefault(alias, True)
+        healthy = check_replica(alias)
+        REPLICA_HEALTH_CHECKS.labels(alias, 'healthy' if healthy else 'unhealthy').inc()
+        if healthy != previous:
+            logger.warning('Replica %s is %s.', alias, 'back' if healthy else 'down')
+        self.healthy[alias] = healthy
+        return healthy
+
+    def reset(self):
+        with self.lock:
+            self.turns = itertools.count()
+            self.checked_at.clear()
+            self.healthy.clear()
+
+
+replicas = ReplicaSet()
+
+
+class ReplicaRouter:
+    """
+    Database router sending the reads of safe-method requests (see
+    ReplicaRoutingMiddleware) to a healthy replica, and everything else to
+    the primary (`default`). Reads inside a transaction on the primary, and
+    reads for a user pinned by pin_to_primary, stay on the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        request = _replica_request.get()
+        if request is None or not settings.REPLICA_DATABASES:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block or is_pinned(request):
+            return DEFAULT_DB_ALIAS
+        return replicas.choose() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Explicit, so an instance read from a replica is still saved to the primary.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the primary's data.
+        databases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        return obj1._state.db in databases and obj2._state.db in databases
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Reads of GET/HEAD/OPTIONS requests go to replicas through ReplicaRouter.
+    After a successful write request, its authenticated user is pinned to
+    the primary for REPLICA_STICKY_SECONDS (read-your-writes). Runs natively
+    under both WSGI and ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if request.method in SAFE_METHODS:
+            with replica_reads(request):
+                return self.get_response(request)
+        response = self.get_response(request)
+        if response.status_code < 400:
+            pin_to_primary(request)
+        return response
+
+    async def __acall__(self, request):
+        if request.method in SAFE_METHODS:
+            with replica_reads(request):
+                return await self.get_response(request)
+        response = await self.get_response(request)
+        if response.status_code < 400:
+            await _apin_to_primary(request)
+        return response
+
+
+async def _apin_to_primary(request):
+    user = _user(request)
+    if user is not None and settings.REPLICA_DATABASES and settings.REPLICA_STICKY_SECONDS > 0:
+        await caches[settings.REPLICA_PIN_CACHE_ALIAS].aset(_pin_key(user.pk), True, settings.REPLICA_STICKY_SECONDS)
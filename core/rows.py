@@ -0,0 +1,154 @@
+from operator import itemgetter
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+
+class RowSerializer:
+    """
+    Read-only list serialization from values() rows.
+
+    Produces the same data as `serializer_class(instances, many=True).data`
+    without model instances or per-instance field binding. The serializer's
+    fields are compiled once per list into (name, getter) pairs: a field backed
+    by a model column reads that column, UUIDs and datetimes are converted
+    inline, and any other field type falls back to its own
+    `to_representation`. Fields that are not a column of the model are either
+    read as is from a values() lookup in `lookups` (field name -> lookup), or
+    built from the columns listed in `computed` by `get_<field name>(row)`.
+    """
+    serializer_class = None
+    lookups = {}
+    computed = {}
+
+    def __init__(self, context=None):
+        self.context = context or {}
+        self.serializer = self.serializer_class(context=self.context)
+        self.model = self.serializer.Meta.model
+
+    @property
+    def columns(self):
+        """
+        values() lookups the rows must contain.
+        """
+        columns = []
+        for name, field in self.serializer.fields.items():
+            if field.write_only:
+                continue
+            if name in self.computed:
+                columns.extend(self.computed[name])
+            else:
+                columns.append(self.lookup(name, field))
+        return list(dict.fromkeys(columns))
+
+    def lookup(self, name, field):
+        if name in self.lookups:
+            return self.lookups[name]
+        model_field = self.model._meta.get_field(field.source)
+        # A relation renders its primary key, which is the FK column itself.
+        return model_field.attname
+
+    def compile(self):
+        plan = []
+        for name, field in self.serializer.fields.items():
+            if field.write_only:
+                continue
+            if name in self.computed:
+                plan.append((name, getattr(self, f'get_{name}')))
+                continue
+            column = self.lookup(name, field)
+            convert = None if name in self.lookups else self.converter(field)
+            if convert is None:
+                plan.append((name, itemgetter(column)))
+            else:
+                plan.append((name, lambda row, column=column, convert=convert: None if (value := row[column]) is None else convert(value)))
+        return plan
+
+    def converter(self, field):
+        """
+        Return the function turning a non-null column value into the field's
+        representation, or None when the value is already its representation.
+        """
+        if isinstance(field, serializers.UUIDField) and field.uuid_format == 'hex_verbose':
+            return str
+        if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+            # The pk object is rendered; a UUID is JSON-encoded as str(), so do that here.
+            target = self.model._meta.get_field(field.source).target_field
+            return str if isinstance(target, models.UUIDField) else None
+        if isinstance(field, serializers.RelatedField):
+            raise ImproperlyConfigured(f'{type(self).__name__}: map the {field.field_name!r} relation in `lookups` or `computed`.')
+        if isinstance(field, serializers.DateTimeField):
+            return self.datetime_converter(field)
+        if isinstance(field, (serializers.CharField, serializers.ChoiceField, serializers.IntegerField, serializers.FloatField, serializers.BooleanField)):
+            # Column values are already the str/int/float/bool these fields return.
+            return None
+        return field.to_representation
+
+    def datetime_converter(self, field):
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        tz = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+        if output_format is None or output_format.lower() != ISO_8601 or tz is None:
+            return field.to_representation
+
+        def convert(value):
+            value = value.astimezone(tz).isoformat()
+            if value.endswith('+00:00'):
+                value = value[:-6] + 'Z'
+            return value
+        return convert
+
+    def to_representation(self, rows):
+        """
+        Serialize the rows. UUIDs and datetimes come out as str, so the JSON
+        renderer encodes them without calling back into Python.
+        """
+        plan = self.compile()
+        return [{name: get(row) for name, get in plan} for row in rows]
+
+
+class RowListMixin:
+    """
+    Serve list actions from values() rows through `row_serializer_class`.
+
+    With FAST_LIST_SERIALIZATION enabled, the filtered queryset of every
+    action in `row_actions` is projected to the row serializer's columns (plus
+    the ordering and validator columns pagination and ETags need), and the
+    page is serialized by `RowSerializer.to_representation`. Detail, write and
+    export actions are unchanged.
+    """
+    row_serializer_class = None
+    row_actions = ('list',)
+
+    def uses_rows(self):
+        return (
+            settings.FAST_LIST_SERIALIZATION
+            and self.row_serializer_class is not None
+            and self.action in self.row_actions
+        )
+
+    def get_row_serializer(self):
+        return self.row_serializer_class(context=self.get_serializer_context())
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if not self.uses_rows():
+            return queryset
+        columns = self.get_row_serializer().columns
+        meta = queryset.model._meta
+        columns.extend([meta.pk.name, self.last_modified_field])
+        for ordering in queryset.query.order_by or meta.ordering:
+            if isinstance(ordering, str) and ordering != '?':
+                columns.append(ordering.lstrip('-'))
+        return queryset.values(*dict.fromkeys(column for column in columns if column != 'pk'))
+
+    def serialize_list(self, rows):
+        if rows and isinstance(rows[0], dict):
+            return self.get_row_serializer().to_representation(rows)
+        return super().serialize_list(rows)
+
+    def get_row_validator(self, row):
+        if isinstance(row, dict):
+            return str(row[self.queryset.model._meta.pk.name]), row[self.last_modified_field].isoformat()
+        return super().get_row_validator(row)
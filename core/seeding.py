@@ -0,0 +1,334 @@
+import functools
+import io
+from contextlib import contextmanager
+import math
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+from faker import Faker
+from content.leaderboards import refresh_leaderboards
+from content.models import MediaContent
+from ratings.models import Rating
+from users.models import User
+
+SEED_PASSWORD = 'password123'
+
+# Independent random streams, so each part of the data set can be regenerated
+# on its own (e.g. the user ids in every worker) and does not depend on how
+# the work was split.
+USER_IDS, USER_ACTIVITY, CONTENT_IDS, CONTENT_POPULARITY, BLOCK_USERS, BLOCK_RATINGS = range(6)
+
+# Ratings are drawn in fixed blocks of this many rows, each from its own
+# streams, and shards are cut from the blocks, so the rows do not depend on
+# shard_size either.
+BLOCK_SIZE = 10000
+
+RATING_COLUMNS = ('rating_id', 'user_id', 'media_content_id', 'value', 'created_at', 'updated_at', 'single_vote')
+USER_COLUMNS = (
+    'user_id', 'email', 'username', 'password', 'rating_count', 'is_superuser', 'is_staff', 'is_active',
+    'first_name', 'last_name', 'date_joined', 'created_at',
+)
+
+
+@dataclass(frozen=True)
+class SeedPlan:
+    """
+    Parameters of a synthetic data set. Equal plans always produce the same
+    rows, whatever the number of workers or the shard size.
+
+    - popularity_skew: Zipf exponent of content popularity (1.0 gives a few
+      hits and a long tail).
+    - activity_skew: Pareto shape of user activity; smaller means a heavier
+      tail of very active users.
+    - days: ratings' created_at is spread over this many days before `now`.
+    - shard_size: ratings written per unit of work; it does not change the
+      rows.
+    """
+    users: int
+    contents: int
+    ratings: int
+    seed: int = 42
+    days: int = 365
+    popularity_skew: float = 1.0
+    activity_skew: float = 1.2
+    shard_size: int = 100000
+    now: int = field(default_factory=lambda: int(time.time()))
+
+    @property
+    def shards(self):
+        return range(math.ceil(self.ratings / self.shard_size))
+
+    def shard_length(self, shard):
+        return min(self.shard_size, self.ratings - shard * self.shard_size)
+
+    def rng(self, *stream):
+        return np.random.default_rng([self.seed, *stream])
+
+
+def _ids(plan, stream, count):
+    raw = plan.rng(stream).bytes(16 * count).hex()
+    return [raw[i:i + 32] for i in range(0, 32 * count, 32)]
+
+
+def _cdf(weights):
+    cdf = np.cumsum(weights)
+    return cdf / cdf[-1]
+
+
+def _sample(cdf, rng, count):
+    return np.minimum(np.searchsorted(cdf, rng.random(count), side='right'), len(cdf) - 1)
+
+
+@functools.lru_cache(maxsize=1)
+def _model(plan):
+    """
+    Per-plan lookup tables: user and content ids, the sampling distributions
+    and each content's underlying quality.
+    """
+    user_activity = _cdf(plan.rng(USER_ACTIVITY).pareto(plan.activity_skew, plan.users) + 1)
+    rng = plan.rng(CONTENT_POPULARITY)
+    # Popularity ranks are shuffled so the hits are not the first rows created.
+    content_order = rng.permutation(plan.contents)
+    content_popularity = _cdf(1.0 / np.arange(1, plan.contents + 1) ** plan.popularity_skew)
+    quality = rng.uniform(2.5, 4.7, plan.contents)
+    return {
+        'user_ids': _ids(plan, USER_IDS, plan.users),
+        'content_ids': _ids(plan, CONTENT_IDS, plan.contents),
+        'user_activity': user_activity,
+        'content_order': content_order,
+        'content_popularity': content_popularity,
+        'quality': quality,
+    }
+
+
+def _shard_blocks(plan, shard, generate):
+    """
+    Arrays of one shard, cut from the arrays generate(plan, block, count)
+    returns for the blocks the shard overlaps.
+    """
+    start = shard * plan.shard_size
+    end = start + plan.shard_length(shard)
+    parts = []
+    for block in range(start // BLOCK_SIZE, math.ceil(end / BLOCK_SIZE)):
+        offset = block * BLOCK_SIZE
+        arrays = generate(plan, block, min(BLOCK_SIZE, plan.ratings - offset))
+        parts.append([array[max(start - offset, 0):end - offset] for array in arrays])
+    return [np.concatenate(columns) for columns in zip(*parts)]
+
+
+def _block_users(plan, block, count):
+    return (_sample(_model(plan)['user_activity'], plan.rng(BLOCK_USERS, block), count),)
+
+
+def shard_users(plan, shard):
+    """
+    Index of the user behind each rating of a shard.
+    """
+    return _shard_blocks(plan, shard, _block_users)[0]
+
+
+def user_rating_counts(plan):
+    """
+    Number of ratings each user will get, so User.rating_count can be written
+    with the users instead of being backfilled.
+    """
+    counts = np.zeros(plan.users, dtype=np.int64)
+    for shard in plan.shards:
+        counts += np.bincount(shard_users(plan, shard), minlength=plan.users)
+    return counts
+
+
+def create_users(plan, batch_size=10000):
+    """
+    Insert the plan's users with their final rating_count, with COPY on
+    PostgreSQL. The password is hashed once and shared, since hashing is by
+    design the slowest part of creating a user.
+    """
+    password = make_password(SEED_PASSWORD)
+    user_ids = _model(plan)['user_ids']
+    counts = user_rating_counts(plan).tolist()
+    now = timezone.now()
+    for start in range(0, plan.users, batch_size):
+        batch = range(start, min(start + batch_size, plan.users))
+        if connection.vendor == 'postgresql':
+            joined = now.isoformat()
+            rows = [
+                (user_ids[i], f'user{i}@example.com', f'user{i}', password, str(counts[i]), 'f', 'f', 't', '', '', joined, joined)
+                for i in batch
+            ]
+            with transaction.atomic(), connection.cursor() as cursor:
+                _copy(cursor, User._meta.db_table, USER_COLUMNS, rows)
+            continue
+        User.objects.bulk_create(
+            [
+                User(
+                    user_id=uuid.UUID(user_ids[i]), email=f'user{i}@example.com', username=f'user{i}',
+                    password=password, rating_count=counts[i], date_joined=now,
+                )
+                for i in batch
+            ],
+            batch_size=batch_size,
+        )
+
+
+def _block_ratings(plan, block, count):
+    model = _model(plan)
+    rng = plan.rng(BLOCK_RATINGS, block)
+    contents = model['content_order'][_sample(model['content_popularity'], rng, count)]
+    values = np.clip(np.rint(model['quality'][contents] + rng.normal(0, 1, count)), 1, 5).astype(np.int64)
+    created = plan.now - (rng.random(count) * plan.days * 86400).astype(np.int64)
+    return contents, values, created, np.frombuffer(rng.bytes(16 * count), dtype=np.uint8).reshape(count, 16)
+
+
+def _shard_arrays(plan, shard):
+    """
+    Content index, value and created_at (seconds since the epoch) of each
+    rating of a shard, plus the 16 random bytes of each primary key. Values
+    scatter around each content's quality and created_at is uniform over the
+    plan's time window.
+    """
+    return _shard_blocks(plan, shard, _block_ratings)
+
+
+def content_aggregates(plan):
+    """
+    MediaContent rating aggregates and trending scores the plan's ratings add
+    up to, computed from the generated arrays so contents can be written with
+    them instead of being rebuilt from the Rating table afterwards.
+    """
+    aggregates = {
+        'rating_count': np.zeros(plan.contents, dtype=np.int64),
+        'rating_sum': np.zeros(plan.contents, dtype=np.int64),
+        'trending_score': np.full(plan.contents, -np.inf),
+        **{field: np.zeros(plan.contents, dtype=np.int64) for field in MediaContent.HISTOGRAM_FIELDS.values()},
+    }
+    landmark = datetime.fromisoformat(settings.TRENDING_LANDMARK).timestamp()
+    for shard in plan.shards:
+        contents, values, created, _ = _shard_arrays(plan, shard)
+        aggregates['rating_count'] += np.bincount(contents, minlength=plan.contents)
+        aggregates['rating_sum'] += np.bincount(contents, weights=values, minlength=plan.contents).astype(np.int64)
+        # Vectorized content.leaderboards.trending_weight and trending_sum.
+        weights = (created - landmark) / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+        np.logaddexp2.at(aggregates['trending_score'], contents, weights)
+        for value, field in MediaContent.HISTOGRAM_FIELDS.items():
+            aggregates[field] += np.bincount(contents[values == value], minlength=plan.contents)
+    aggregates['trending_score'][np.isneginf(aggregates['trending_score'])] = MediaContent.NO_TRENDING_SCORE
+    return aggregates
+
+
+def create_contents(plan, batch_size=10000):
+    """
+    Insert the plan's contents with their final rating aggregates and
+    trending scores. Bayesian ratings are then set by refresh_leaderboards.
+    """
+    fake = Faker()
+    fake.seed_instance(plan.seed)
+    content_ids = _model(plan)['content_ids']
+    aggregates = {name: values.tolist() for name, values in content_aggregates(plan).items()}
+    categories = [choice[0] for choice in MediaContent.CATEGORY_CHOICES]
+    for start in range(0, plan.contents, batch_size):
+        contents = []
+        for i in range(start, min(start + batch_size, plan.contents)):
+            content = MediaContent(
+                media_id=uuid.UUID(content_ids[i]),
+                title=fake.sentence(nb_words=4)[:-1],
+                description=fake.paragraph(nb_sentences=3),
+                category=categories[i % len(categories)],
+                thumbnail_url=fake.image_url(),
+                content_url=fake.url(),
+                **{name: values[i] for name, values in aggregates.items()},
+            )
+            content.avg_rating = content.rating_sum / content.rating_count if content.rating_count else 0.0
+            contents.append(content)
+        MediaContent.objects.bulk_create(contents, batch_size=batch_size)
+    refresh_leaderboards()
+
+
+def shard_ratings(plan, shard):
+    """
+    Rating rows of one shard as tuples of strings in RATING_COLUMNS order.
+    Users may rate a content more than once, so none is a single vote.
+    """
+    model = _model(plan)
+    contents, values, created, raw_ids = _shard_arrays(plan, shard)
+    timestamps = np.datetime_as_string(created.astype('datetime64[s]'), timezone='UTC')
+    raw_ids = raw_ids.tobytes().hex()
+    user_ids, content_ids = model['user_ids'], model['content_ids']
+    users = shard_users(plan, shard)
+    return [
+        (raw_ids[32 * i:32 * i + 32], user_ids[user], content_ids[content], str(value), timestamp, timestamp, 'f')
+        for i, (user, content, value, timestamp) in enumerate(zip(users.tolist(), contents.tolist(), values.tolist(), timestamps.tolist()))
+    ]
+
+
+def _copy(cursor, table, columns, rows):
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    data = ''.join('\t'.join(row) + '\n' for row in rows)
+    raw = cursor.cursor
+    if hasattr(raw, 'copy_expert'):
+        # psycopg2
+        raw.copy_expert(sql, io.StringIO(data))
+    else:
+        # psycopg 3
+        with raw.copy(sql) as copy:
+            copy.write(data)
+
+
+def write_ratings(plan, shard):
+    """
+    Insert one shard of ratings in its own transaction, with PostgreSQL COPY
+    when available and batched executemany INSERTs otherwise. Returns the
+    number of rows written.
+    """
+    rows = shard_ratings(plan, shard)
+    table = Rating._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            _copy(cursor, table, RATING_COLUMNS, rows)
+        else:
+            # Timestamps are stored as naive UTC text and booleans as integers outside PostgreSQL.
+            rows = [(*row[:4], row[4].rstrip('Z').replace('T', ' '), row[5].rstrip('Z').replace('T', ' '), 0) for row in rows]
+            cursor.executemany(
+                f"INSERT INTO {table} ({', '.join(RATING_COLUMNS)}) VALUES ({', '.join(['%s'] * len(RATING_COLUMNS))})",
+                rows,
+            )
+    return len(rows)
+
+
+@contextmanager
+def deferred_indexes(model):
+    """
+    On PostgreSQL, drop the model's Meta indexes for the duration of a bulk
+    load and rebuild them afterwards: one sorted index build is much cheaper
+    than maintaining every index row by row.
+    """
+    if connection.vendor != 'postgresql':
+        yield
+        return
+    with connection.schema_editor() as editor:
+        for index in model._meta.indexes:
+            editor.remove_index(model, index)
+    try:
+        yield
+    finally:
+        # Inside an outer transaction the rows' deferred foreign key checks are
+        # still pending, and PostgreSQL cannot build an index until they run.
+        connection.check_constraints()
+        with connection.schema_editor() as editor:
+            for index in model._meta.indexes:
+                editor.add_index(model, index)
+
+
+def init_worker():
+    """
+    Process pool initializer: set Django up in spawned workers. Forked
+    workers inherit the parent's state and open their own connections.
+    """
+    import django
+    django.setup()
@@ -1,3 +1,1096 @@
-from django.test import TestCase
+import json
+import os
+import random
+import unittest
+import uuid
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from urllib.parse import parse_qs, urlsplit
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, F, Max, Min, Sum
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from rest_framework import status
+from rest_framework.test import APIClient
+from users.models import User
+from content.models import MediaContent
+from content.views import MediaContentViewSet
+from ratings.models import Rating
+from ratings.views import RatingViewSet
+from users.serializers import LoginSerializer
+from django.core.management.base import CommandError
+from core.benchmarks import benchmark_database, compare, run_benchmarks, run_serializer_benchmark
+from core import jobs
+from core.cache import cache_stats, get_cache, invalidate, namespace_versions
+from core.jobs import enqueue, run_pending
+from core.metrics import REGISTRY
+from core.models import Job
+from core import routing
+from core.performance import PerformanceMiddleware, RequestTimings, RollingHistogram, view_histograms
+from core.routing import ReplicaRouter, ReplicaRoutingMiddleware, is_pinned, replica_reads, use_primary
+from core.seeding import SeedPlan, shard_ratings, user_rating_counts
 
-# Create your tests here.
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.content_list_url = reverse('mediacontent-list')
+        self.rating_list_url = reverse('rating-list')
+        self.user = User.objects.create_user(email='pager@example.com', username='pager', password='password123')
+
+        # Pairs of items share a created_at so the primary key tie-breaker is exercised.
+        now = timezone.now()
+        contents = MediaContent.objects.bulk_create([
+            MediaContent(title=f'Item {i:02d}', description='Desc', category='game', content_url='http://example.com/item.zip')
+            for i in range(25)
+        ])
+        for i, content in enumerate(contents):
+            content.created_at = now - timedelta(minutes=i // 2)
+        MediaContent.objects.bulk_update(contents, ['created_at'])
+        Rating.objects.bulk_create([
+            Rating(user=self.user, media_content=content, value=(i % 5) + 1) for i, content in enumerate(contents)
+        ])
+
+    def walk(self, url, params):
+        """
+        Follow next links from the first page and return every page response.
+        """
+        pages = []
+        response = self.client.get(url, params, format='json')
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response)
+            if not response.data['next']:
+                return pages
+            response = self.client.get(response.data['next'], format='json')
+
+    def test_cursor_walk_matches_default_ordering(self):
+        """
+        Ensure walking cursor pages yields every item once, in -created_at order.
+        """
+        pages = self.walk(self.content_list_url, {'pagination': 'cursor', 'page_size': 10})
+        self.assertEqual([len(page.data['results']) for page in pages], [10, 10, 5])
+        ids = [item['media_id'] for page in pages for item in page.data['results']]
+        expected = [str(pk) for pk in MediaContent.objects.order_by('-created_at', '-media_id').values_list('pk', flat=True)]
+        self.assertEqual(ids, expected)
+        self.assertIsNone(pages[0].data['previous'])
+        self.assertIsNone(pages[0].data['count'])
+
+    def test_cursor_previous_link_returns_prior_page(self):
+        """
+        Ensure the previous link of the second page returns the first page.
+        """
+        first = self.client.get(self.content_list_url, {'pagination': 'cursor', 'page_size': 10}, format='json')
+        second = self.client.get(first.data['next'], format='json')
+        back = self.client.get(second.data['previous'], format='json')
+        self.assertEqual(back.data['results'], first.data['results'])
+        self.assertIsNone(back.data['previous'])
+
+    def test_cursor_respects_ordering_filter(self):
+        """
+        Ensure the keyset follows the OrderingFilter field chosen by the client.
+        """
+        self.client.force_authenticate(user=self.user)
+        pages = self.walk(self.rating_list_url, {'pagination': 'cursor', 'ordering': 'value', 'page_size': 7})
+        values = [item['value'] for page in pages for item in page.data['results']]
+        self.assertEqual(len(values), 25)
+        self.assertEqual(values, sorted(values))
+
+        pages = self.walk(self.content_list_url, {'pagination': 'cursor', 'ordering': '-title', 'page_size': 10})
+        titles = [item['title'] for page in pages for item in page.data['results']]
+        self.assertEqual(titles, sorted(titles, reverse=True))
+
+    def test_tampered_or_mismatched_cursor_is_rejected(self):
+        """
+        Ensure forged cursors and cursors issued for another ordering are rejected.
+        """
+        first = self.client.get(self.content_list_url, {'pagination': 'cursor'}, format='json')
+        response = self.client.get(self.content_list_url, {'cursor': 'not-a-cursor'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        next_cursor = parse_qs(urlsplit(first.data['next']).query)['cursor'][0]
+        self.assertEqual(self.client.get(self.content_list_url, {'cursor': next_cursor}, format='json').status_code, status.HTTP_200_OK)
+        response = self.client.get(self.content_list_url, {'cursor': next_cursor[:-2] + 'xx'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(self.content_list_url, {'cursor': next_cursor, 'ordering': 'title'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_optional_count_modes(self):
+        """
+        Ensure the total count is only computed on request.
+        """
+        response = self.client.get(self.content_list_url, {'pagination': 'cursor', 'count': 'exact'}, format='json')
+        self.assertEqual(response.data['count'], 25)
+        response = self.client.get(self.content_list_url, {'pagination': 'cursor', 'count': 'estimate', 'category': 'game'}, format='json')
+        self.assertIsInstance(response.data['count'], int)
+        with self.assertNumQueries(1):
+            self.client.get(self.content_list_url, {'pagination': 'cursor'}, format='json')
+
+    def test_aggregate_ordering_and_filter_cost_one_query(self):
+        """
+        Ensure rating_count ordering and the min_avg_rating filter keep a cursor page to one query.
+        """
+        for params in ({'ordering': '-rating_count'}, {'min_avg_rating': 4}, {'min_avg_rating': 4, 'ordering': '-avg_rating'}):
+            with self.subTest(params=params):
+                with self.assertNumQueries(1):
+                    response = self.client.get(self.content_list_url, {'pagination': 'cursor', **params}, format='json')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_page_number_mode_remains_default(self):
+        """
+        Ensure requests without a pagination choice keep the page-number response.
+        """
+        response = self.client.get(self.content_list_url, {'page': 2}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertIn('page=3', response.data['next'])
+
+
+@override_settings(
+    RESPONSE_CACHE_ENABLED=True,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'response-cache-tests'}},
+)
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.content_list_url = reverse('mediacontent-list')
+        self.user = User.objects.create_user(email='cache@example.com', username='cache', password='password123')
+        self.game = MediaContent.objects.create(title='Cached Game', description='Desc', category='game', content_url='http://example.com/game.zip')
+        self.song = MediaContent.objects.create(title='Cached Song', description='Desc', category='music', content_url='http://example.com/song.mp3')
+        self.game_url = reverse('mediacontent-detail', args=[self.game.pk])
+        self.song_url = reverse('mediacontent-detail', args=[self.song.pk])
+
+    def test_repeated_reads_are_served_from_cache(self):
+        """
+        Ensure a repeated list request is a cache hit that runs no queries.
+        """
+        first = self.client.get(self.content_list_url, {'category': 'game', 'ordering': 'title'})
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.client.get(self.content_list_url, {'ordering': 'title', 'category': 'game'})
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(self.client.get(self.content_list_url, {'category': 'music'})['X-Cache'], 'MISS')
+        self.assertEqual(cache_stats(), {'hit': 1, 'miss': 2, 'stale': 0})
+
+        out = StringIO()
+        call_command('cache_stats', '--reset', stdout=out)
+        self.assertIn('hits=1 stale=0 misses=2', out.getvalue())
+        self.assertEqual(cache_stats(), {'hit': 0, 'miss': 0, 'stale': 0})
+
+    def test_content_writes_invalidate_only_affected_entries(self):
+        """
+        Ensure saving content invalidates the list and its own detail, but not other details.
+        """
+        for url in (self.content_list_url, self.game_url, self.song_url):
+            self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        self.game.title = 'Renamed Game'
+        self.game.save()
+
+        response = self.client.get(self.game_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['title'], 'Renamed Game')
+        self.assertEqual(self.client.get(self.content_list_url)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(self.song_url)['X-Cache'], 'HIT')
+
+    def test_rating_writes_invalidate_rating_and_content_entries(self):
+        """
+        Ensure rating writes, including bulk ones, refresh ratings and the aggregates of rated content.
+        """
+        self.client.force_authenticate(user=self.user)
+        rating_list_url = reverse('rating-list')
+        for url in (rating_list_url, self.game_url, self.song_url):
+            self.client.get(url)
+
+        self.client.post(rating_list_url, {'media_content': str(self.game.pk), 'value': 4}, format='json')
+        response = self.client.get(self.game_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['rating_count'], 1)
+        self.assertEqual(self.client.get(self.song_url)['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get(rating_list_url).json()['count'], 1)
+
+        self.client.post(reverse('rating-bulk'), [{'media_content': str(self.song.pk), 'value': 2}], format='json')
+        response = self.client.get(rating_list_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual(self.client.get(self.song_url).json()['rating_count'], 1)
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=60, RESPONSE_CACHE_STALE_TIMEOUT=300)
+    def test_namespace_versions_expire_and_creates_only_bump_the_collection(self):
+        """
+        Ensure namespace versions are renewed with each entry written under them instead of kept forever,
+        and that creating an object leaves detail namespaces alone.
+        """
+        cache = get_cache()
+        with mock.patch.object(cache, 'touch', wraps=cache.touch) as touch:
+            self.assertEqual(self.client.get(self.game_url)['X-Cache'], 'MISS')
+        renewed = {call.args[0].rsplit(':ns:', 1)[1]: call.args[1] for call in touch.call_args_list}
+        self.assertEqual(renewed, {'content:*': 360, f'content:{self.game.pk}': 360})
+
+        media_id = uuid.uuid4()
+        namespaces = ['content', 'content:*', f'content:{media_id}']
+        before = namespace_versions(namespaces)
+        MediaContent.objects.create(media_id=media_id, title='New', description='Desc', category='game', content_url='http://example.com/new.zip')
+        after = namespace_versions(namespaces)
+        self.assertGreater(after[0], before[0])
+        self.assertEqual(after[1:], before[1:])
+        self.assertEqual(self.client.get(self.game_url)['X-Cache'], 'HIT')
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=0)
+    def test_stale_entries_are_served_while_another_request_refreshes(self):
+        """
+        Ensure an expired entry is served stale while the refresh lock is held, and refreshed otherwise.
+        """
+        self.assertEqual(self.client.get(self.content_list_url)['X-Cache'], 'MISS')
+        cache = get_cache()
+        add = cache.add
+        # Simulate another request holding the refresh lock.
+        holding_lock = lambda key, *args, **kwargs: False if key.endswith(':lock') else add(key, *args, **kwargs)
+        with mock.patch.object(cache, 'add', side_effect=holding_lock):
+            with self.assertNumQueries(0):
+                response = self.client.get(self.content_list_url)
+        self.assertEqual(response['X-Cache'], 'STALE')
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertEqual(self.client.get(self.content_list_url)['X-Cache'], 'MISS')
+
+    def test_cache_is_bypassed_when_disabled(self):
+        """
+        Ensure responses are not cached unless the response cache is enabled.
+        """
+        with self.settings(RESPONSE_CACHE_ENABLED=False):
+            response = self.client.get(self.content_list_url)
+        self.assertNotIn('X-Cache', response)
+        self.assertEqual(cache_stats(), {'hit': 0, 'miss': 0, 'stale': 0})
+
+
+class ConditionalRequestTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='etag@example.com', username='etag', password='password123')
+        self.content = MediaContent.objects.create(title='Tagged Game', description='Desc', category='game', content_url='http://example.com/game.zip')
+        self.content_url = reverse('mediacontent-detail', args=[self.content.pk])
+        self.content_list_url = reverse('mediacontent-list')
+
+    def test_detail_conditional_get_returns_not_modified(self):
+        """
+        Ensure detail responses carry validators and fresh conditional GETs get 304 without serialization.
+        """
+        response = self.client.get(self.content_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.content_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+        response = self.client.get(self.content_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.force_authenticate(user=self.user)
+        self.client.post(reverse('rating-list'), {'media_content': str(self.content.pk), 'value': 5}, format='json')
+        response = self.client.get(self.content_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['rating_count'], 1)
+
+    def test_list_conditional_get_tracks_page_contents(self):
+        """
+        Ensure list ETags change when a row is added and otherwise answer 304.
+        """
+        etag = self.client.get(self.content_list_url, {'category': 'game'})['ETag']
+        response = self.client.get(self.content_list_url, {'category': 'game'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        MediaContent.objects.create(title='Another Game', description='Desc', category='game', content_url='http://example.com/other.zip')
+        response = self.client.get(self.content_list_url, {'category': 'game'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertNotIn('Last-Modified', response)
+
+    def test_update_honors_if_match(self):
+        """
+        Ensure updates with a stale If-Match are rejected with 412 and current ones succeed.
+        """
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(reverse('rating-list'), {'media_content': str(self.content.pk), 'value': 3}, format='json')
+        rating_url = reverse('rating-detail', args=[response.data['rating_id']])
+        etag = self.client.get(rating_url)['ETag']
+
+        response = self.client.patch(rating_url, {'value': 4}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        response = self.client.patch(rating_url, {'value': 1}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(response.data['status_code'], 412)
+        self.assertEqual(Rating.objects.get().value, 4)
+        # Updates without If-Match are unconditional.
+        self.assertEqual(self.client.patch(rating_url, {'value': 2}, format='json').status_code, status.HTTP_200_OK)
+
+    @override_settings(
+        RESPONSE_CACHE_ENABLED=True,
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'conditional-tests'}},
+    )
+    def test_cached_responses_answer_conditional_gets(self):
+        """
+        Ensure cached responses keep their validators and still answer 304.
+        """
+        get_cache().clear()
+        etag = self.client.get(self.content_url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.content_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get(self.content_url)['ETag'], etag)
+
+
+class SeedCommandTests(TestCase):
+    def seed(self, **options):
+        options = {'users': 60, 'contents': 30, 'ratings': 3000, 'batch_size': 700, **options}
+        call_command('seed', stdout=StringIO(), **options)
+
+    def test_seed_creates_consistent_data(self):
+        self.seed()
+        self.assertEqual(User.objects.filter(is_superuser=False).count(), 60)
+        self.assertEqual(MediaContent.objects.count(), 30)
+        self.assertEqual(Rating.objects.count(), 3000)
+        # Counters are written with the rows, not drifting from them.
+        self.assertFalse(User.objects.annotate(actual=Count('ratings')).exclude(rating_count=F('actual')).exists())
+        self.assertEqual(MediaContent.objects.aggregate(total=Sum('rating_count'))['total'], 3000)
+        self.assertTrue(User.objects.get(email='user0@example.com').check_password('password123'))
+
+        span = Rating.objects.aggregate(first=Min('created_at'), last=Max('created_at'))
+        self.assertGreater(span['last'] - span['first'], timedelta(days=300))
+
+        # Precomputed content aggregates and scores match a rebuild from the Rating table.
+        fields = ('pk', 'rating_count', 'rating_sum', 'avg_rating', 'bayesian_rating', 'trending_score', *MediaContent.HISTOGRAM_FIELDS.values())
+        seeded = list(MediaContent.objects.order_by('pk').values_list(*fields))
+        call_command('rebuild_rating_aggregates', stdout=StringIO())
+        rebuilt = list(MediaContent.objects.order_by('pk').values_list(*fields))
+        for before, after in zip(seeded, rebuilt):
+            self.assertEqual(before[:3] + before[6:], after[:3] + after[6:])
+            for seeded_score, rebuilt_score in zip(before[3:6], after[3:6]):
+                self.assertAlmostEqual(seeded_score, rebuilt_score, delta=1e-6 * max(abs(rebuilt_score), 1))
+
+    def test_seed_is_skewed(self):
+        self.seed()
+        contents = sorted(MediaContent.objects.values_list('rating_count', flat=True), reverse=True)
+        users = sorted(User.objects.filter(is_superuser=False).values_list('rating_count', flat=True), reverse=True)
+        # The most popular content and the most active user far exceed the median.
+        self.assertGreater(contents[0], 5 * contents[len(contents) // 2])
+        self.assertGreater(users[0], 5 * users[len(users) // 2])
+
+    def test_seed_is_deterministic(self):
+        self.seed(seed=7)
+        first = set(Rating.objects.values_list('rating_id', 'user__email', 'value'))
+        self.seed(seed=7)
+        self.assertEqual(set(Rating.objects.values_list('rating_id', 'user__email', 'value')), first)
+        self.seed(seed=8)
+        self.assertNotEqual(set(Rating.objects.values_list('rating_id', 'user__email', 'value')), first)
+
+    def test_plan_rows_are_reproducible(self):
+        plan = SeedPlan(users=50, contents=10, ratings=500, shard_size=100, now=0)
+        rows = [row for shard in plan.shards for row in shard_ratings(plan, shard)]
+        self.assertEqual(len(rows), 500)
+        self.assertEqual(len({row[0] for row in rows}), 500)
+        self.assertEqual(user_rating_counts(plan).sum(), 500)
+        self.assertEqual(shard_ratings(SeedPlan(users=50, contents=10, ratings=500, shard_size=100, now=0), 3), rows[300:400])
+
+    @mock.patch('core.seeding.BLOCK_SIZE', 64)
+    def test_plan_rows_do_not_depend_on_shard_size(self):
+        def rows(shard_size):
+            plan = SeedPlan(users=50, contents=10, ratings=500, shard_size=shard_size, now=0)
+            return [row for shard in plan.shards for row in shard_ratings(plan, shard)], user_rating_counts(plan).tolist()
+
+        expected = rows(64)
+        for shard_size in (1, 30, 100, 500, 1000):
+            self.assertEqual(rows(shard_size), expected)
+
+
+class BenchmarkSuiteTests(TestCase):
+    def test_report_has_metrics_per_size_and_scenario(self):
+        scenarios = ['content_list', 'content_search', 'rating_create', 'rating_delete']
+        report = run_benchmarks([200], scenarios, requests=4, warmup=1)
+        self.assertEqual(report['environment']['database'], connection.vendor)
+        results = report['results']['200']
+        self.assertEqual(list(results), scenarios)
+        for result in results.values():
+            self.assertEqual(result['requests'], 4)
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+            self.assertLessEqual(result['p95_ms'], result['p99_ms'])
+            self.assertGreater(result['throughput_rps'], 0)
+            self.assertGreater(result['queries'], 0)
+            self.assertGreater(result['alloc_peak_kib'], 0)
+
+    def test_compare_flags_latency_and_query_regressions(self):
+        baseline = {'results': {'1000': {
+            'content_list': {'p95_ms': 10.0, 'queries': 2.0},
+            'login': {'p95_ms': 100.0, 'queries': 2.0},
+        }}}
+        report = {'results': {
+            '1000': {
+                'content_list': {'p95_ms': 12.0, 'queries': 3.0},
+                'login': {'p95_ms': 140.0, 'queries': 2.0},
+                'register': {'p95_ms': 500.0, 'queries': 3.0},
+            },
+            '5000': {'content_list': {'p95_ms': 99.0, 'queries': 9.0}},
+        }}
+        regressions = compare(report, baseline, latency_threshold=0.25, query_threshold=0)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('content_list @ 1000: 3.0 queries'))
+        self.assertTrue(regressions[1].startswith('login @ 1000: p95 140.0 ms'))
+        self.assertEqual(compare(report, baseline, latency_threshold=0.5, query_threshold=1), [])
+
+    def test_serializer_benchmark_reports_both_modes(self):
+        report = run_serializer_benchmark(200, page_size=20, pages=2)
+        for target in ('content', 'ratings'):
+            results = report['results'][target]
+            self.assertGreater(results['serializer']['rows_per_second'], 0)
+            self.assertGreater(results['rows']['rows_per_second'], 0)
+            self.assertGreater(results['speedup'], 0)
+
+    def test_unknown_scenario_is_rejected(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark', scenarios='content_list,nope', stdout=StringIO())
+
+    @override_settings(REPLICA_DATABASES=['replica_0'])
+    def test_benchmark_database_disables_replica_reads(self):
+        # Only `default` gets a test database; replicas would still be the real ones.
+        with mock.patch.object(connection.creation, 'create_test_db', return_value='pixelcore') as create, \
+                mock.patch.object(connection.creation, 'destroy_test_db') as destroy, \
+                mock.patch('core.benchmarks.setup_test_environment'), \
+                mock.patch('core.benchmarks.teardown_test_environment'):
+            with benchmark_database():
+                self.assertEqual(settings.REPLICA_DATABASES, [])
+        create.assert_called_once()
+        destroy.assert_called_once_with('pixelcore', verbosity=0, keepdb=False)
+        self.assertEqual(settings.REPLICA_DATABASES, ['replica_0'])
+
+
+@override_settings(PERFORMANCE_SERVER_TIMING=True, PERFORMANCE_SAMPLE_RATE=0)
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='perf@example.com', username='perf', password='password123')
+        MediaContent.objects.create(title='Timed', description='Desc', category='game', content_url='http://example.com/t.zip')
+        view_histograms.clear()
+
+    def server_timing(self, response):
+        metrics = {}
+        for metric in response['Server-Timing'].split(', '):
+            name, *params = metric.split(';')
+            metrics[name] = dict(param.split('=', 1) for param in params)
+        return metrics
+
+    def test_server_timing_reports_phases(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('mediacontent-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        metrics = self.server_timing(response)
+        self.assertIn('serialize', metrics)
+        self.assertRegex(metrics['db']['desc'], r'^"[1-9]\d* queries"$')
+        self.assertGreaterEqual(float(metrics['total']['dur']), float(metrics['db']['dur']))
+
+        response = self.client.post(reverse('token_obtain_pair'), {'email': self.user.email, 'password': 'password123'}, format='json')
+        self.assertIn('password', self.server_timing(response))
+
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + response.data['access'])
+        self.assertIn('auth', self.server_timing(self.client.get(reverse('mediacontent-list'))))
+
+    def test_over_budget_requests_are_logged(self):
+        self.client.force_authenticate(self.user)
+        with self.assertNoLogs('core.performance'):
+            self.client.get(reverse('mediacontent-list'))
+        with override_settings(PERFORMANCE_QUERY_BUDGET=0), self.assertLogs('core.performance', 'WARNING') as logs:
+            self.client.get(reverse('mediacontent-list'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'GET mediacontent-list')
+        self.assertEqual(record['over_budget'], ['queries'])
+        self.assertGreater(record['queries'], 0)
+        self.assertIn('total_ms', record)
+
+    @override_settings(PERFORMANCE_TIME_BUDGET_MS=500)
+    def test_password_hashing_is_outside_the_time_budget(self):
+        middleware = PerformanceMiddleware(lambda request: HttpResponse())
+        request = RequestFactory().post('/api/users/login/')
+        timings = RequestTimings()
+        timings.add('password', 0.9)
+        with self.assertNoLogs('core.performance'):
+            middleware.finish(request, HttpResponse(), timings, 1.0)
+        with self.assertLogs('core.performance', 'WARNING') as logs:
+            middleware.finish(request, HttpResponse(), RequestTimings(), 1.0)
+        self.assertEqual(json.loads(logs.records[0].getMessage())['over_budget'], ['time'])
+
+    def test_histograms_per_view(self):
+        self.client.force_authenticate(self.user)
+        for _ in range(3):
+            self.client.get(reverse('mediacontent-list'))
+        self.client.get(reverse('rating-list'))
+        snapshot = view_histograms.snapshot()
+        self.assertEqual(snapshot['GET mediacontent-list']['count'], 3)
+        self.assertEqual(snapshot['GET rating-list']['count'], 1)
+
+    @override_settings(PERFORMANCE_ENABLED=False)
+    def test_disabled(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('mediacontent-list'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(view_histograms.snapshot(), {})
+
+    def test_rolling_histogram_windows(self):
+        histogram = RollingHistogram(window_seconds=60, windows=2)
+        for ms in (1, 7, 30, 30, 9000):
+            histogram.observe(ms, now=0)
+        snapshot = histogram.snapshot(now=0)
+        self.assertEqual(snapshot['count'], 5)
+        self.assertEqual(snapshot['p50_ms'], 50)
+        self.assertIsNone(snapshot['p99_ms'])
+        histogram.observe(3, now=60)
+        self.assertEqual(histogram.snapshot(now=60)['count'], 6)
+        # The first window has aged out.
+        self.assertEqual(histogram.snapshot(now=120)['count'], 1)
+
+
+class AsyncReadTests(TestCase):
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='async@example.com', username='async', password='password123')
+        self.contents = [
+            MediaContent.objects.create(title=f'Async {i}', description='Desc', category='game', content_url=f'http://example.com/{i}.zip')
+            for i in range(5)
+        ]
+        Rating.objects.create(user=self.user, media_content=self.contents[0], value=4)
+        token = str(LoginSerializer.get_token(self.user).access_token)
+        self.headers = {'authorization': f'Bearer {token}'}
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_as_view_follows_setting(self):
+        self.assertFalse(iscoroutinefunction(MediaContentViewSet.as_view({'get': 'list'})))
+        with self.settings(ASYNC_READS=True):
+            self.assertTrue(iscoroutinefunction(MediaContentViewSet.as_view({'get': 'list', 'post': 'create'})))
+            self.assertTrue(iscoroutinefunction(RatingViewSet.as_view({'get': 'retrieve', 'delete': 'destroy'})))
+            self.assertFalse(iscoroutinefunction(MediaContentViewSet.as_view({'get': 'top'})))
+
+    async def test_list_matches_sync_view(self):
+        view = MediaContentViewSet.as_async_view({'get': 'list'})
+        for params in ({'page_size': 2, 'page': 2}, {'pagination': 'cursor', 'page_size': 2, 'count': 'exact'}, {'ordering': 'title'}):
+            response = await view(self.factory.get(reverse('mediacontent-list'), params))
+            expected = await sync_to_async(self.client.get)(reverse('mediacontent-list'), params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(json.loads(response.content), expected.json())
+            self.assertEqual(response['ETag'], expected['ETag'])
+
+        response = await view(self.factory.get(reverse('mediacontent-list'), {'page': 9}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_retrieve(self):
+        view = MediaContentViewSet.as_async_view({'get': 'retrieve'})
+        content = self.contents[0]
+        response = await view(self.factory.get('/'), pk=str(content.pk))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content)['media_id'], str(content.pk))
+        response = await view(self.factory.get('/', headers={'if-none-match': response['ETag']}), pk=str(content.pk))
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        for pk in (str(uuid.uuid4()), 'not-a-uuid'):
+            self.assertEqual((await view(self.factory.get('/'), pk=pk)).status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_ratings_authenticate(self):
+        view = RatingViewSet.as_async_view({'get': 'list'})
+        response = await view(self.factory.get(reverse('rating-list')))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        for mode in ('cache', 'claims', 'database'):
+            with self.settings(JWT_PRINCIPAL=mode):
+                # Filtering by a related object validates it against the database.
+                request = self.factory.get(reverse('rating-list'), {'media_content': str(self.contents[0].pk)}, headers=self.headers)
+                response = await view(request)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = json.loads(response.content)
+            self.assertEqual(data['count'], 1)
+            self.assertEqual(data['results'][0]['user'], self.user.email)
+
+    async def test_writes_use_sync_view(self):
+        view = RatingViewSet.as_async_view({'get': 'list', 'post': 'create'})
+        request = self.factory.post(
+            reverse('rating-list'), {'media_content': str(self.contents[1].pk), 'value': 5},
+            content_type='application/json', headers=self.headers,
+        )
+        response = await view(request)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(await Rating.objects.filter(media_content=self.contents[1]).acount(), 1)
+
+
+class RowSerializationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='rows@example.com', username='rows', password='password123')
+        self.other = User.objects.create_user(email='other-rows@example.com', username='other-rows', password='password123')
+        self.contents = [
+            MediaContent.objects.create(title='Café \u2028 №1', description='Ünïcode "quoted"', category='music', content_url='http://example.com/1.mp3'),
+            MediaContent.objects.create(title='Plain', description='Desc', category='game', content_url='http://example.com/2.zip', thumbnail_url='http://example.com/2.png'),
+        ]
+        MediaContent.objects.filter(pk=self.contents[0].pk).update(rating_count=3, rating_sum=11, avg_rating=11 / 3, rating_4_count=2, rating_3_count=1, bayesian_rating=3.1234567)
+        for content in self.contents:
+            Rating.objects.create(user=self.user, media_content=content, value=5)
+            Rating.objects.create(user=self.other, media_content=content, value=2)
+        self.client.force_authenticate(self.user)
+
+    def get_both(self, url, params=None):
+        with self.settings(FAST_LIST_SERIALIZATION=False):
+            expected = self.client.get(url, params)
+        with self.settings(FAST_LIST_SERIALIZATION=True):
+            response = self.client.get(url, params)
+        return expected, response
+
+    def test_list_responses_are_byte_identical(self):
+        cases = [
+            (reverse('mediacontent-list'), None),
+            (reverse('mediacontent-list'), {'ordering': '-avg_rating', 'page_size': 1, 'page': 2}),
+            (reverse('mediacontent-list'), {'pagination': 'cursor', 'page_size': 1}),
+            (reverse('mediacontent-top'), None),
+            (reverse('mediacontent-trending'), None),
+            (reverse('rating-list'), None),
+            (reverse('rating-list'), {'media_content_id': str(self.contents[0].pk), 'ordering': 'value'}),
+            (reverse('rating-list'), {'pagination': 'cursor', 'page_size': 3}),
+        ]
+        for url, params in cases:
+            with self.subTest(url=url, params=params):
+                expected, response = self.get_both(url, params)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response.content, expected.content)
+                self.assertEqual(response['ETag'], expected['ETag'])
+
+    def test_list_skips_model_serializer(self):
+        with mock.patch('rest_framework.serializers.Serializer.to_representation', side_effect=AssertionError('serializer used')):
+            self.assertEqual(self.client.get(reverse('mediacontent-list')).status_code, status.HTTP_200_OK)
+            self.assertEqual(self.client.get(reverse('rating-list')).status_code, status.HTTP_200_OK)
+
+    def test_detail_and_export_are_unchanged(self):
+        content = self.contents[0]
+        expected, response = self.get_both(reverse('mediacontent-detail', args=[content.pk]))
+        self.assertEqual(response.content, expected.content)
+        expected, response = self.get_both(reverse('rating-export'))
+        self.assertEqual(b''.join(response.streaming_content), b''.join(expected.streaming_content))
+
+    def test_conditional_list_request(self):
+        response = self.client.get(reverse('rating-list'))
+        response = self.client.get(reverse('rating-list'), headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+@override_settings(METRICS_TOKEN='scrape-secret')
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='metrics@example.com', username='metrics', password='password123')
+        MediaContent.objects.create(title='Counted', description='Desc', category='game', content_url='http://example.com/c.zip')
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0.0
+
+    def scrape(self):
+        return self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-secret')
+
+    def test_request_metrics(self):
+        labels = {'view': 'mediacontent-list', 'method': 'GET'}
+        requests = self.sample('pixelcore_http_requests_total', status='200', **labels)
+        observed = self.sample('pixelcore_db_queries_per_request_count', **labels)
+        self.client.force_authenticate(self.user)
+        self.client.get(reverse('mediacontent-list'))
+        self.assertEqual(self.sample('pixelcore_http_requests_total', status='200', **labels), requests + 1)
+        self.assertEqual(self.sample('pixelcore_db_queries_per_request_count', **labels), observed + 1)
+        self.assertGreater(self.sample('pixelcore_db_connections_total', alias='default', state='reused'), 0)
+
+        response = self.scrape()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('pixelcore_http_requests_total{method="GET",status="200",view="mediacontent-list"}', body)
+        self.assertIn('# TYPE pixelcore_http_request_duration_seconds histogram', body)
+
+    def test_login_metrics(self):
+        successes = self.sample('pixelcore_login_duration_seconds_count', outcome='success')
+        failures = self.sample('pixelcore_login_duration_seconds_count', outcome='failure')
+        verifies = self.sample('pixelcore_password_hash_duration_seconds_count', operation='verify')
+        url = reverse('token_obtain_pair')
+        self.client.post(url, {'email': self.user.email, 'password': 'password123'}, format='json')
+        response = self.client.post(url, {'email': self.user.email, 'password': 'wrong'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.sample('pixelcore_login_duration_seconds_count', outcome='success'), successes + 1)
+        self.assertEqual(self.sample('pixelcore_login_duration_seconds_count', outcome='failure'), failures + 1)
+        self.assertEqual(self.sample('pixelcore_password_hash_duration_seconds_count', operation='verify'), verifies + 2)
+
+    def test_pool_metrics(self):
+        stats = {
+            'pool_max': 20, 'pool_size': 5, 'pool_available': 2, 'requests_waiting': 3,
+            'requests_queued': 7, 'requests_errors': 1, 'requests_wait_ms': 1500, 'connections_num': 5,
+        }
+        pool = mock.Mock(**{'get_stats.return_value': stats})
+        waits = self.sample('pixelcore_db_pool_waits_total', alias='default', outcome='served')
+        opened = self.sample('pixelcore_db_pool_connections_opened_total', alias='default')
+        databases = {'default': {'OPTIONS': {'pool': {'max_size': 20}}}}
+        with mock.patch('core.metrics.settings', SimpleNamespace(DATABASES=databases, METRICS_TOKEN='scrape-secret', BACKGROUND_JOBS=False)), \
+                mock.patch('core.metrics.connections', {'default': SimpleNamespace(pool=pool)}):
+            body = self.scrape().content.decode()
+            # Counters only advance by what the pool counted since the last observation.
+            self.scrape()
+        self.assertIn('pixelcore_db_pool_connections{alias="default",state="in_use"} 3.0', body)
+        self.assertIn('pixelcore_db_pool_waiting{alias="default"} 3.0', body)
+        self.assertEqual(self.sample('pixelcore_db_pool_waits_total', alias='default', outcome='served'), waits + 6)
+        self.assertEqual(self.sample('pixelcore_db_pool_connections_opened_total', alias='default'), opened + 5)
+
+    @override_settings(BACKGROUND_JOBS=True)
+    def test_job_queue_metrics(self):
+        enqueue('tests.noop', delay=-60)
+        enqueue('tests.noop', delay=3600)
+        body = self.scrape().content.decode()
+        self.assertIn('pixelcore_job_queue_depth{state="pending"} 2.0', body)
+        self.assertIn('pixelcore_job_queue_depth{state="failed"} 0.0', body)
+        # Only the job that is already due counts towards the age.
+        self.assertGreaterEqual(self.sample('pixelcore_job_queue_age_seconds'), 60)
+
+    def test_token_required(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.scrape().status_code, status.HTTP_200_OK)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_without_token_only_served_in_debug(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        with self.settings(DEBUG=True):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_200_OK)
+
+
+@override_settings(JOB_RETRY_DELAY=60, JOB_MAX_ATTEMPTS=2)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        handlers = mock.patch.dict(jobs._handlers, {'tests.record': self.record})
+        handlers.start()
+        self.addCleanup(handlers.stop)
+
+    def record(self, payloads):
+        self.calls.append(payloads)
+        if any(payload.get('fail') for payload in payloads):
+            raise ValueError('bad payload')
+
+    def test_jobs_run_in_one_call_per_name_and_are_deleted(self):
+        for number in range(3):
+            enqueue('tests.record', {'number': number})
+        self.assertEqual(run_pending(), 3)
+        self.assertEqual(self.calls, [[{'number': 0}, {'number': 1}, {'number': 2}]])
+        self.assertFalse(Job.objects.exists())
+
+    def test_dedup_key_replaces_the_pending_payload(self):
+        enqueue('tests.record', {'version': 1}, dedup_key='same')
+        enqueue('tests.record', {'version': 2}, dedup_key='same')
+        self.assertEqual(list(Job.objects.values_list('payload', flat=True)), [{'version': 2}])
+        # Once claimed, the key can be queued again for the next run.
+        claimed = jobs.claim()
+        enqueue('tests.record', {'version': 3}, dedup_key='same')
+        self.assertEqual(Job.objects.filter(state=Job.PENDING).count(), 1)
+        jobs.run(claimed)
+        run_pending()
+        self.assertEqual(self.calls, [[{'version': 2}], [{'version': 3}]])
+
+    def test_failed_job_is_retried_alone_then_kept_as_failed(self):
+        enqueue('tests.record', {'fail': True})
+        enqueue('tests.record', {'number': 1})
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(self.calls[-1], [{'number': 1}])
+        job = Job.objects.get()
+        self.assertEqual((job.state, job.attempts, job.last_error), (Job.PENDING, 1, 'ValueError: bad payload'))
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=50))
+
+        Job.objects.update(run_after=timezone.now())
+        self.assertEqual(run_pending(), 0)
+        job.refresh_from_db()
+        self.assertEqual((job.state, job.attempts), (Job.FAILED, 2))
+        # Failed jobs are never claimed again.
+        self.assertEqual(jobs.claim(), [])
+
+    def test_stale_claims_are_requeued(self):
+        enqueue('tests.record', {'number': 1})
+        (job,) = jobs.claim()
+        Job.objects.update(claimed_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        # The worker that lost the claim no longer runs the job.
+        self.assertEqual(jobs.run([job]), 0)
+        self.assertEqual(self.calls, [])
+        Job.objects.update(run_after=timezone.now())
+        self.assertEqual(run_pending(), 1)
+
+    @override_settings(BACKGROUND_JOBS=True)
+    def test_invalidation_is_queued_and_coalesced(self):
+        invalidate('content', 'abc')
+        invalidate('content', 'abc')
+        self.assertEqual(Job.objects.filter(name='core.bump_namespaces').count(), 1)
+        before = namespace_versions(['content', 'content:abc'])
+        run_pending()
+        after = namespace_versions(['content', 'content:abc'])
+        self.assertTrue(all(new > old for old, new in zip(before, after)))
+
+    def test_run_workers_burst(self):
+        enqueue('tests.record', {'number': 1})
+        out = StringIO()
+        call_command('run_workers', burst=True, stdout=out)
+        self.assertIn('Ran 1 jobs.', out.getvalue())
+        self.assertEqual(self.calls, [[{'number': 1}]])
+
+
+@override_settings(REPLICA_DATABASES=['replica_a', 'replica_b'], REPLICA_STICKY_SECONDS=5, REPLICA_HEALTH_CHECK_INTERVAL=60)
+class ReplicaRoutingTests(SimpleTestCase):
+    """
+    ReplicaRouter decisions, with the replica health check mocked out.
+    """
+
+    def setUp(self):
+        routing.replicas.reset()
+        get_cache().clear()
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+        self.user = SimpleNamespace(pk=uuid.uuid4(), is_authenticated=True)
+        patcher = mock.patch('core.routing.check_replica', return_value=True)
+        self.check = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(routing.replicas.reset)
+
+    def get(self, user=None):
+        request = self.factory.get('/api/ratings/')
+        if user is not None:
+            request.user = user
+        return request
+
+    def test_safe_requests_read_from_replicas_round_robin(self):
+        with replica_reads(self.get()):
+            reads = [self.router.db_for_read(Rating) for _ in range(4)]
+            self.assertEqual(self.router.db_for_write(Rating), 'default')
+            with use_primary():
+                self.assertEqual(self.router.db_for_read(Rating), 'default')
+        self.assertEqual(reads, ['replica_a', 'replica_b', 'replica_a', 'replica_b'])
+        self.assertEqual(self.router.db_for_read(Rating), 'default')
+        # Checked once each within the interval.
+        self.assertEqual(sorted(call.args[0] for call in self.check.call_args_list), ['replica_a', 'replica_b'])
+
+    def test_unhealthy_replicas_are_skipped(self):
+        self.check.side_effect = lambda alias: alias == 'replica_b'
+        with replica_reads(self.get()):
+            self.assertEqual({self.router.db_for_read(Rating) for _ in range(4)}, {'replica_b'})
+        routing.replicas.reset()
+        self.check.side_effect = None
+        self.check.return_value = False
+        with replica_reads(self.get()):
+            self.assertEqual(self.router.db_for_read(Rating), 'default')
+
+    def test_no_replicas_configured(self):
+        with self.settings(REPLICA_DATABASES=[]), replica_reads(self.get()):
+            self.assertEqual(self.router.db_for_read(Rating), 'default')
+        self.check.assert_not_called()
+
+    def test_successful_write_pins_user_to_primary(self):
+        middleware = ReplicaRoutingMiddleware(lambda request: HttpResponse(status=400))
+        request = self.factory.post('/api/ratings/')
+        request.user = self.user
+        middleware(request)
+        self.assertFalse(is_pinned(self.get(self.user)))
+
+        middleware = ReplicaRoutingMiddleware(lambda request: HttpResponse(status=201))
+        middleware(request)
+        with replica_reads(self.get(self.user)):
+            self.assertEqual(self.router.db_for_read(Rating), 'default')
+        other = SimpleNamespace(pk=uuid.uuid4(), is_authenticated=True)
+        with replica_reads(self.get(other)):
+            self.assertEqual(self.router.db_for_read(Rating), 'replica_a')
+        with self.settings(REPLICA_STICKY_SECONDS=0):
+            get_cache().clear()
+            middleware(request)
+            self.assertFalse(is_pinned(self.get(self.user)))
+
+    def test_unresolved_session_user_is_not_evaluated(self):
+        request = self.get()
+        request.user = SimpleLazyObject(mock.Mock(side_effect=AssertionError('user lookup')))
+        with replica_reads(request):
+            self.assertEqual(self.router.db_for_read(Rating), 'replica_a')
+
+
+@unittest.skipUnless(len(settings.REPLICA_DATABASES) == 1, 'Set DATABASE_REPLICA_URLS to one database standing in for a replica.')
+class ReplicaDatabaseTests(TransactionTestCase):
+    """
+    Routing against a real second database. It is not replicated, so reads
+    that reach it do not see what the test wrote to the primary.
+    """
+    databases = '__all__'
+
+    def setUp(self):
+        routing.replicas.reset()
+        get_cache().clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='sticky@example.com', username='sticky', password='password123')
+        replica = settings.REPLICA_DATABASES[0]
+        User.objects.using(replica).bulk_create([User(user_id=self.user.pk, email=self.user.email, username=self.user.username)])
+        self.media = MediaContent.objects.create(title='Primary', description='Desc', category='game', content_url='http://example.com/p.zip')
+        self.client.force_authenticate(self.user)
+
+    def test_reads_follow_writes_then_return_to_replica(self):
+        self.assertEqual(self.client.get(reverse('mediacontent-list')).data['count'], 0)
+        response = self.client.post(reverse('rating-list'), {'media_content': self.media.pk, 'value': 4}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.get(reverse('rating-list')).data['count'], 1)
+
+        get_cache().clear()  # the pin expires
+        self.assertEqual(self.client.get(reverse('rating-list')).data['count'], 0)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Query plans are only checked on PostgreSQL.')
+class QueryPlanTests(TestCase):
+    """
+    Query-plan regression suite for the supported list queries.
+
+    Seeds PIXELCORE_QUERY_PLAN_ROWS ratings (default 20000), runs each list
+    request through the API and EXPLAINs the page query it issued. A plan that
+    sequentially scans a table, or sorts more than PIXELCORE_QUERY_PLAN_SORT_ROWS
+    rows (default 1000) instead of reading an index in order, fails the test.
+    Small sorts are allowed: for a selective filter, sorting a handful of
+    matches is the planner's best choice. COUNT queries are not checked:
+    page-number mode counts by design, and keyset mode exists to avoid them.
+    """
+    tables = ('content_mediacontent', 'ratings_rating', 'users_user')
+    content_cases = [
+        {},
+        {'category': 'game'},
+        {'ordering': 'title'},
+        {'ordering': '-title'},
+        {'category': 'music', 'ordering': 'title'},
+        {'ordering': '-avg_rating'},
+        {'ordering': 'rating_count'},
+        {'ordering': '-rating_count'},
+        {'min_avg_rating': 4.5},
+        {'min_avg_rating': 4, 'ordering': '-avg_rating'},
+        {'pagination': 'cursor'},
+        {'pagination': 'cursor', 'ordering': '-rating_count'},
+        {'pagination': 'cursor', 'category': 'video'},
+        {'pagination': 'cursor', 'ordering': 'title'},
+    ]
+    rating_cases = [
+        {},
+        {'ordering': '-created_at'},
+        {'ordering': 'value'},
+        {'value': 5},
+        {'media_content': None},
+        {'user': None},
+        {'pagination': 'cursor'},
+        {'pagination': 'cursor', 'media_content': None},
+        {'pagination': 'cursor', 'user': None},
+    ]
+    leaderboard_cases = [
+        {},
+        {'category': 'game'},
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        rows = int(os.getenv('PIXELCORE_QUERY_PLAN_ROWS', '20000'))
+        cls.max_sort_rows = int(os.getenv('PIXELCORE_QUERY_PLAN_SORT_ROWS', '1000'))
+        rng = random.Random(4)
+        categories = [choice[0] for choice in MediaContent.CATEGORY_CHOICES]
+        users = User.objects.bulk_create(
+            [User(email=f'plan{i}@example.com', username=f'plan{i}') for i in range(max(rows // 4, 10))],
+            batch_size=1000,
+        )
+        contents = MediaContent.objects.bulk_create(
+            [
+                MediaContent(title=f'Title {rng.random():.8f}', description='Desc', category=rng.choice(categories), content_url='http://example.com/c')
+                for _ in range(max(rows // 4, 10))
+            ],
+            batch_size=1000,
+        )
+        Rating.objects.bulk_create(
+            [Rating(user=rng.choice(users), media_content=rng.choice(contents), value=rng.randint(1, 5)) for _ in range(rows)],
+            batch_size=1000,
+        )
+        cls.user = users[0]
+        cls.media = contents[0]
+        with connection.cursor() as cursor:
+            # bulk_create stamps every row with the same created_at; spread them out.
+            for table in ('content_mediacontent', 'ratings_rating'):
+                cursor.execute(f"UPDATE {table} SET created_at = now() - random() * interval '365 days'")
+        # Fill in the aggregates and leaderboard scores bulk_create skipped.
+        call_command('rebuild_rating_aggregates', stdout=StringIO())
+        with connection.cursor() as cursor:
+            for table in cls.tables:
+                cursor.execute(f'ANALYZE {table}')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def plan_problems(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        problems = []
+        nodes = [plan[0]['Plan']]
+        while nodes:
+            node = nodes.pop()
+            if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') in self.tables:
+                problems.append(f"Seq Scan on {node['Relation Name']}")
+            # Incremental Sort only orders ties within an index-ordered prefix.
+            if node['Node Type'] == 'Sort':
+                sorted_rows = sum(child['Plan Rows'] for child in node.get('Plans', []))
+                if sorted_rows > self.max_sort_rows:
+                    problems.append(f"Sort of {sorted_rows} rows on {node.get('Sort Key')}")
+            nodes.extend(node.get('Plans', []))
+        return problems
+
+    def assert_index_only_plans(self, url, params):
+        pages = [params]
+        for page_params in pages:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, page_params, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK, page_params)
+            page_queries = [
+                query['sql'] for query in queries
+                if query['sql'].startswith('SELECT') and 'COUNT(' not in query['sql']
+            ]
+            self.assertTrue(page_queries)
+            for sql in page_queries:
+                self.assertEqual(self.plan_problems(sql), [], f'{url} {page_params}: {sql}')
+            # Also check the seek query of the second cursor page.
+            next_params = parse_qs(urlsplit(response.data.get('next') or '').query)
+            if page_params is params and 'cursor' in next_params:
+                pages.append(next_params)
+
+    def test_content_list_queries_use_indexes(self):
+        for params in self.content_cases:
+            with self.subTest(params=params):
+                self.assert_index_only_plans(reverse('mediacontent-list'), params)
+
+    def test_rating_list_queries_use_indexes(self):
+        for params in self.rating_cases:
+            params = {
+                key: (value if value is not None else str(self.user.pk if key == 'user' else self.media.pk))
+                for key, value in params.items()
+            }
+            with self.subTest(params=params):
+                self.assert_index_only_plans(reverse('rating-list'), params)
+
+    def test_leaderboard_queries_use_indexes(self):
+        for name in ('mediacontent-top', 'mediacontent-trending'):
+            for params in self.leaderboard_cases:
+                with self.subTest(leaderboard=name, params=params):
+                    self.assert_index_only_plans(reverse(name), params)
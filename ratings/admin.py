@@ -1,12 +1,40 @@
 from django.contrib import admin
+from django.db import transaction
 from .models import Rating
+from . import services
 
 @admin.register(Rating)
 class RatingAdmin(admin.ModelAdmin):
     """
     Admin configuration for the Rating model.
+    Writes go through ratings.services so content aggregates and user rating counts stay in sync.
     """
     list_display = ('user', 'media_content', 'value', 'created_at')
     list_filter = ('value', 'created_at')
     search_fields = ('user__email', 'media_content__title')
-    ordering = ('-created_at',)
\ No newline at end of file
+    ordering = ('-created_at',)
+    list_select_related = ('user', 'media_content')
+
+    def get_queryset(self, request):
+        # list_display renders str(user) and str(media_content); load only those columns.
+        return super().get_queryset(request).for_display()
+
+    @transaction.atomic
+    def save_model(self, request, obj, form, change):
+        if change:
+            previous = Rating.objects.only('media_content', 'value').get(pk=obj.pk)
+            super().save_model(request, obj, form, change)
+            services.record_rating_changed(previous.media_content_id, previous.value, obj)
+        else:
+            super().save_model(request, obj, form, change)
+            services.record_ratings_added([obj])
+
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        services.record_ratings_removed([obj])
+        super().delete_model(request, obj)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        services.record_ratings_removed(list(queryset.select_related(None).only('user', 'media_content', 'value', 'created_at')))
+        super().delete_queryset(request, queryset)
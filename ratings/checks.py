@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+from django.db import DEFAULT_DB_ALIAS
+from .partitions import SINGLE_VOTE_ERROR, is_partitioned
+
+
+@register(Tags.database)
+def check_single_vote_table(app_configs, databases=None, **kwargs):
+    # Database checks run with migrate and `check --database default`.
+    if not settings.RATINGS_SINGLE_VOTE or DEFAULT_DB_ALIAS not in (databases or ()):
+        return []
+    if not is_partitioned():
+        return []
+    return [Error(SINGLE_VOTE_ERROR, hint='Disable RATINGS_SINGLE_VOTE.', id='ratings.E001')]
@@ -0,0 +1,16 @@
+from django_filters import rest_framework as filters
+from .models import Rating
+
+class RatingFilter(filters.FilterSet):
+    """
+    Filters for the Rating list endpoint.
+    `created_after` (inclusive) and `created_before` (exclusive) bound
+    created_at, which lets PostgreSQL skip the monthly partitions outside the
+    range when the table is partitioned (see ratings.partitions).
+    """
+    created_after = filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte')
+    created_before = filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='lt')
+
+    class Meta:
+        model = Rating
+        fields = ['user', 'media_content', 'value']
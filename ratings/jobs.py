@@ -0,0 +1,13 @@
+from collections import defaultdict
+from core.jobs import handler
+from .services import apply_rating_count_deltas
+
+
+@handler('ratings.rating_counts')
+def fold_rating_counts(payloads):
+    # Queued by every rating write; one UPDATE per distinct total delta, however many writes were queued.
+    deltas = defaultdict(int)
+    for payload in payloads:
+        for user_id, delta in payload['deltas'].items():
+            deltas[user_id] += delta
+    apply_rating_count_deltas(deltas)
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-17 14:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from core.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently on PostgreSQL, which cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ('content', '0003_list_indexes'),
+        ('ratings', '0002_alter_rating_unique_together'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='rating',
+            index=models.Index(fields=['-created_at', '-rating_id'], name='rating_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='rating',
+            index=models.Index(fields=['media_content', '-created_at', '-rating_id'], name='rating_content_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='rating',
+            index=models.Index(fields=['user', '-created_at', '-rating_id'], name='rating_user_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='rating',
+            index=models.Index(fields=['value', '-created_at', '-rating_id'], name='rating_value_created_idx'),
+        ),
+        migrations.AlterField(
+            model_name='rating',
+            name='media_content',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='ratings', to='content.mediacontent'),
+        ),
+        migrations.AlterField(
+            model_name='rating',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='ratings', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content', '0006_leaderboards'),
+        ('ratings', '0004_rating_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentNeighbor',
+            fields=[
+                ('pk', models.CompositePrimaryKey('media_content', 'neighbor', blank=True, editable=False, primary_key=True, serialize=False)),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+                ('media_content', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='content.mediacontent')),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbor_of', to='content.mediacontent')),
+            ],
+            options={
+                'verbose_name': 'Content Neighbor',
+                'verbose_name_plural': 'Content Neighbors',
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:40
+
+from django.db import migrations, models
+
+CREATE_INDEX = (
+    'CREATE UNIQUE INDEX {concurrently}IF NOT EXISTS rating_single_vote_uniq '
+    'ON ratings_rating (user_id, media_content_id) WHERE single_vote'
+)
+
+
+def create_single_vote_index(apps, schema_editor):
+    # Built concurrently on PostgreSQL so ratings_rating keeps accepting writes.
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(CREATE_INDEX.format(concurrently=concurrently))
+
+
+def drop_single_vote_index(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(f'DROP INDEX {concurrently}IF EXISTS rating_single_vote_uniq')
+
+
+class Migration(migrations.Migration):
+    # The index is built concurrently on PostgreSQL, which cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ('ratings', '0005_contentneighbor'),
+    ]
+
+    operations = [
+        # A constant default is a catalog-only change on PostgreSQL 11+; no table rewrite.
+        migrations.AddField(
+            model_name='rating',
+            name='single_vote',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='rating',
+                    constraint=models.UniqueConstraint(
+                        condition=models.Q(single_vote=True), fields=('user', 'media_content'), name='rating_single_vote_uniq',
+                    ),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_single_vote_index, drop_single_vote_index),
+            ],
+        ),
+    ]
@@ -3,6 +3,24 @@ import uuid
 from users.models import User
 from content.models import MediaContent
 
+class RatingQuerySet(models.QuerySet):
+    """
+    QuerySet with column projections sized for each consumer of Rating rows.
+
+    Every projection joins the related rows it reads with select_related, so
+    listing N ratings costs a fixed number of queries instead of N + 1.
+    """
+    # Columns read by RatingSerializer (user is rendered as user.email).
+    SERIALIZER_FIELDS = ('rating_id', 'value', 'created_at', 'updated_at', 'media_content', 'user__email')
+    # Columns read by Rating.__str__ and the admin changelist.
+    DISPLAY_FIELDS = ('rating_id', 'value', 'created_at', 'user__email', 'media_content__title')
+
+    def for_serializer(self):
+        return self.select_related('user').only(*self.SERIALIZER_FIELDS)
+
+    def for_display(self):
+        return self.select_related('user', 'media_content').only(*self.DISPLAY_FIELDS)
+
 class Rating(models.Model):
     """
     Rating model to store user ratings for media content.
@@ -13,6 +31,9 @@ class Rating(models.Model):
     - media_content: Foreign key to the MediaContent model, indicating what was rated.
     - value: Integer value of the rating (1 to 5).
     - created_at: Timestamp when the rating was created.
+    - updated_at: Timestamp when the rating was last changed.
+    - single_vote: Whether the rating is the user's one vote for the content. At most one
+      such rating exists per (user, media_content); see ratings.services.upsert_rating.
     """
     RATING_CHOICES = [
         (1, '1 - Poor'),
@@ -23,16 +44,64 @@ class Rating(models.Model):
     ]
 
     rating_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ratings')
-    media_content = models.ForeignKey(MediaContent, on_delete=models.CASCADE, related_name='ratings')
+    # The composite indexes in Meta lead with these columns, so the implicit
+    # single-column FK indexes would only add write cost.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ratings', db_index=False)
+    media_content = models.ForeignKey(MediaContent, on_delete=models.CASCADE, related_name='ratings', db_index=False)
     value = models.IntegerField(choices=RATING_CHOICES)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Written by single-vote mode (settings.RATINGS_SINGLE_VOTE) and collapse_duplicate_ratings.
+    single_vote = models.BooleanField(default=False, editable=False)
+
+    objects = RatingQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Rating"
         verbose_name_plural = "Ratings"
-        # Ensure a user can only rate a specific media content once
         ordering = ["-created_at"]
+        # Composite indexes follow RatingViewSet's filter/ordering combinations,
+        # with the primary key as the keyset pagination tie-breaker.
+        indexes = [
+            models.Index(fields=['-created_at', '-rating_id'], name='rating_created_idx'),
+            models.Index(fields=['media_content', '-created_at', '-rating_id'], name='rating_content_created_idx'),
+            models.Index(fields=['user', '-created_at', '-rating_id'], name='rating_user_created_idx'),
+            models.Index(fields=['value', '-created_at', '-rating_id'], name='rating_value_created_idx'),
+        ]
+        # Partial, so ratings written before single-vote mode (which may repeat a
+        # pair) coexist with it until collapse_duplicate_ratings has run.
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'media_content'], condition=models.Q(single_vote=True), name='rating_single_vote_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.email} rated {self.media_content.title} as {self.value}"
+
+class ContentNeighbor(models.Model):
+    """
+    Precomputed item-item similarity between two pieces of media content.
+
+    Fields:
+    - media_content: The content the neighbour list belongs to.
+    - neighbor: One of its most similar contents.
+    - score: Shrunk cosine similarity of the two contents' rating vectors.
+    - computed_at: Start of the build that wrote the row.
+
+    Holds at most RECOMMENDATION_NEIGHBORS rows per content and is written
+    only by ratings.recommendations (the `build_recommendations` command).
+    """
+    pk = models.CompositePrimaryKey('media_content', 'neighbor')
+    # The primary key index leads with media_content.
+    media_content = models.ForeignKey(MediaContent, on_delete=models.CASCADE, related_name='neighbors', db_index=False)
+    neighbor = models.ForeignKey(MediaContent, on_delete=models.CASCADE, related_name='neighbor_of')
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Content Neighbor"
+        verbose_name_plural = "Content Neighbors"
 
     def __str__(self):
-        return f"{self.user.email} rated {self.media_content.title} as {self.value}"
\ No newline at end of file
+        return f"{self.media_content_id} ~ {self.neighbor_id} ({self.score:.3f})"
@@ -0,0 +1,276 @@
+"""
+Monthly range partitioning of ratings_rating by created_at (PostgreSQL only).
+
+`partition_ratings_table` converts the table in place: the existing heap is
+attached, without copying or scanning it under lock, as the partition
+`ratings_rating_history` for everything before a bound, and monthly
+partitions named `ratings_rating_pYYYY_MM` follow it. `ensure_partitions`
+keeps creating months ahead of time (there is no default partition, so an
+insert past the last month fails), and `archive_partition` detaches a cold
+partition, writes it to a gzip-compressed CSV file and drops it.
+
+The model is unchanged. PostgreSQL requires every unique index of a
+partitioned table to contain created_at, so the parent's primary key is
+(rating_id, created_at) and the rating_single_vote_uniq index cannot exist
+on it: single-vote mode (settings.RATINGS_SINGLE_VOTE) needs the
+unpartitioned table: `require_unpartitioned_table` refuses its writes with a 503,
+and the ratings.E001 system check reports it.
+"""
+import datetime
+import functools
+import gzip
+import os
+import re
+from dataclasses import dataclass
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from .models import Rating
+
+TABLE = Rating._meta.db_table
+HISTORY = f'{TABLE}_history'
+BOUND_CONSTRAINT = f'{HISTORY}_bound'
+# Never convert closer than this to the history bound: inserts after it fail until the conversion commits.
+BOUND_MARGIN = datetime.timedelta(hours=1)
+
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+    lower: datetime.datetime | None  # None for MINVALUE
+    upper: datetime.datetime
+
+
+def month_start(value, months=0):
+    """
+    Midnight UTC on the first day of the month `months` after `value`'s.
+    """
+    value = value.astimezone(datetime.timezone.utc)
+    index = value.year * 12 + value.month - 1 + months
+    return datetime.datetime(index // 12, index % 12 + 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def partition_name(lower):
+    return f'{TABLE}_p{lower:%Y_%m}'
+
+
+def _literal(value):
+    # Bounds are datetimes built here, never request input.
+    return f"'{value.isoformat()}'"
+
+
+def _require_postgresql():
+    if connection.vendor != 'postgresql':
+        raise RuntimeError('Rating partitioning requires PostgreSQL.')
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)', [TABLE])
+        row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+SINGLE_VOTE_ERROR = (
+    'RATINGS_SINGLE_VOTE is enabled, but ratings_rating is partitioned: the partitioned table cannot have '
+    'the rating_single_vote_uniq index single-vote mode relies on.'
+)
+
+
+class SingleVoteUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = SINGLE_VOTE_ERROR
+    default_code = 'single_vote_unavailable'
+
+
+@functools.lru_cache(maxsize=1)
+def _partitioned_at_startup():
+    # Once per process: the table is only converted by partition_ratings,
+    # which refuses to run in single-vote mode, and settings need a restart.
+    return is_partitioned()
+
+
+def require_unpartitioned_table():
+    """
+    Raise SingleVoteUnavailable (503) if ratings_rating is partitioned. Called by
+    every single-vote write, which would otherwise fail on the ON CONFLICT
+    target or silently accept duplicate votes in new partitions.
+    """
+    if _partitioned_at_startup():
+        raise SingleVoteUnavailable()
+
+
+def partitions():
+    """
+    The partitions of ratings_rating, oldest first.
+    """
+    _require_postgresql()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(%s)',
+            [TABLE],
+        )
+        rows = cursor.fetchall()
+    result = []
+    for name, bound in rows:
+        # e.g. FOR VALUES FROM ('2026-10-01 00:00:00+00') TO ('2026-11-01 00:00:00+00')
+        lower, upper = re.match(r"FOR VALUES FROM \((.+)\) TO \((.+)\)", bound).groups()
+        result.append(Partition(
+            name, None if lower == 'MINVALUE' else parse_datetime(lower.strip("'")), parse_datetime(upper.strip("'")),
+        ))
+    return sorted(result, key=lambda partition: partition.upper)
+
+
+def ensure_partitions(months_ahead=3):
+    """
+    Create the monthly partitions missing between the newest existing one and
+    `months_ahead` months after the current month. Returns their names.
+    """
+    _require_postgresql()
+    existing = partitions()
+    lower = existing[-1].upper if existing else month_start(timezone.now())
+    until = month_start(timezone.now(), months_ahead + 1)
+    created = []
+    with connection.cursor() as cursor:
+        while lower < until:
+            upper = month_start(lower, 1)
+            name = partition_name(lower)
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE} '
+                f'FOR VALUES FROM ({_literal(lower)}) TO ({_literal(upper)})'
+            )
+            created.append(name)
+            lower = upper
+    return created
+
+
+def partition_ratings_table(history_before=None, months_ahead=3):
+    """
+    Convert ratings_rating into a table partitioned by created_at month.
+
+    Every existing row must be older than `history_before` (default: the
+    start of next month), which becomes the upper bound of the history
+    partition. The bound is checked by a CHECK constraint validated while
+    reads and writes continue, and the (rating_id, created_at) key is built
+    concurrently, so the exclusive lock is only held for catalog changes.
+    Must run outside a transaction. Returns False if the table was already
+    partitioned, in which case only missing future partitions are created.
+    """
+    _require_postgresql()
+    if is_partitioned():
+        ensure_partitions(months_ahead)
+        return False
+    if history_before is None:
+        history_before = month_start(timezone.now(), 1)
+        if history_before - timezone.now() < BOUND_MARGIN:
+            raise ValueError('Too close to the end of the month; run the conversion after midnight UTC.')
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'ALTER TABLE {TABLE} ADD CONSTRAINT {BOUND_CONSTRAINT} '
+            f'CHECK (created_at < {_literal(history_before)}) NOT VALID'
+        )
+        cursor.execute(f'ALTER TABLE {TABLE} VALIDATE CONSTRAINT {BOUND_CONSTRAINT}')
+        cursor.execute(f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {HISTORY}_key ON {TABLE} (rating_id, created_at)')
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p'", [TABLE])
+        (primary_key,) = cursor.fetchone()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+        # The Meta indexes. Unique ones stay on the history partition only: the
+        # parent cannot have a unique index without created_at.
+        cursor.execute(
+            'SELECT c.relname, pg_get_indexdef(c.oid) FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+            'WHERE i.indrelid = to_regclass(%s) AND NOT i.indisunique',
+            [TABLE],
+        )
+        indexes = cursor.fetchall()
+
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {HISTORY}')
+        cursor.execute(f'ALTER TABLE {HISTORY} RENAME CONSTRAINT {primary_key} TO {HISTORY}_pkey')
+        for name, _ in indexes:
+            cursor.execute(f'ALTER INDEX {name} RENAME TO {name}_history')
+        cursor.execute(f'CREATE TABLE {TABLE} (LIKE {HISTORY} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)')
+        # No scan: the validated CHECK constraint proves the bound.
+        cursor.execute(f'ALTER TABLE {TABLE} ATTACH PARTITION {HISTORY} FOR VALUES FROM (MINVALUE) TO ({_literal(history_before)})')
+        cursor.execute(f'ALTER TABLE {HISTORY} DROP CONSTRAINT {BOUND_CONSTRAINT}')
+        # Keys and indexes added to the parent adopt the history partition's
+        # equivalent ones instead of building or validating new ones.
+        cursor.execute(f'ALTER TABLE {TABLE} ADD PRIMARY KEY (rating_id, created_at)')
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}')
+        for _, definition in indexes:
+            # Read before the renames, so it names the parent and the original index.
+            cursor.execute(definition)
+        ensure_partitions(months_ahead)
+    return True
+
+
+def archive_partition(partition, directory):
+    """
+    Detach `partition`, write its rows to `<directory>/<name>.csv.gz` (CSV
+    with a header row, as COPY produces) and drop it. The file is complete
+    and synced to disk before the table is dropped. Returns the path and
+    the number of rows archived.
+
+    Must run outside a transaction. Content aggregates and
+    User.rating_count keep the archived ratings' contributions; the
+    rebuild_rating_aggregates and reconcile_rating_counts commands only
+    count ratings that are still in the table.
+    """
+    _require_postgresql()
+    path = os.path.join(directory, f'{partition.name}.csv.gz')
+    concurrently = ' CONCURRENTLY' if connection.pg_version >= 140000 else ''
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {partition.name}{concurrently}')
+        cursor.execute(f'SELECT count(*) FROM {partition.name}')
+        (rows,) = cursor.fetchone()
+        written = _copy_to(cursor, partition.name, f'{path}.tmp')
+        # COPY writes one line per row (no rating column can contain a newline), plus the header.
+        if written != rows + 1:
+            os.remove(f'{path}.tmp')
+            raise RuntimeError(f'{partition.name}: wrote {written - 1} of {rows} rows; the detached table is kept.')
+        os.replace(f'{path}.tmp', path)
+        cursor.execute(f'DROP TABLE {partition.name}')
+    return path, rows
+
+
+def _copy_to(cursor, table, path):
+    sql = f'COPY {table} TO STDOUT WITH (FORMAT csv, HEADER)'
+    with open(path, 'wb') as raw_file:
+        with gzip.GzipFile(fileobj=raw_file, mode='wb') as handle:
+            counter = _LineCounter(handle)
+            raw = cursor.cursor
+            if hasattr(raw, 'copy_expert'):
+                # psycopg2
+                raw.copy_expert(sql, counter)
+            else:
+                # psycopg 3
+                with raw.copy(sql) as copy:
+                    for data in copy:
+                        counter.write(data)
+        raw_file.flush()
+        os.fsync(raw_file.fileno())
+    return counter.lines
+
+
+class _LineCounter:
+    # Binary file wrapper counting the lines written through it.
+    def __init__(self, handle):
+        self.handle = handle
+        self.lines = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self.lines += data.count(b'\n')
+        return self.handle.write(data)
@@ -12,4 +12,5 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
             return True
 
         # Write permissions are only allowed to the owner of the snippet.
-        return obj.user == request.user
+        # Compare keys so the owner row never has to be fetched.
+        return obj.user_id == request.user.pk
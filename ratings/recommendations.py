@@ -0,0 +1,212 @@
+from array import array
+from collections import defaultdict
+import numpy as np
+from scipy import sparse
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, F, Max, Sum
+from django.utils import timezone
+from content.models import MediaContent
+from .models import ContentNeighbor, Rating
+
+
+class RatingMatrix:
+    """
+    Sparse user x content matrix of rating values.
+
+    Rows and columns are dense integer codes; `users` and `items` map them
+    back to primary keys. A user who rated the same content more than once
+    contributes the mean of their ratings.
+    """
+
+    def __init__(self, users, items, matrix):
+        self.users = users
+        self.items = items
+        self.matrix = matrix
+
+    @classmethod
+    def from_queryset(cls, ratings, batch_size=10000):
+        """
+        Stream (user, media_content, value) triples from `ratings` into compact
+        arrays, without instantiating model rows.
+        """
+        users, items = {}, {}
+        rows, cols, values = array('i'), array('i'), array('f')
+        triples = ratings.order_by().values_list('user', 'media_content', 'value')
+        for user_id, media_content_id, value in triples.iterator(chunk_size=batch_size):
+            rows.append(users.setdefault(user_id, len(users)))
+            cols.append(items.setdefault(media_content_id, len(items)))
+            values.append(value)
+        return cls.from_arrays(
+            list(users), list(items),
+            np.frombuffer(rows, dtype=np.int32), np.frombuffer(cols, dtype=np.int32), np.frombuffer(values, dtype=np.float32),
+        )
+
+    @classmethod
+    def from_arrays(cls, users, items, rows, cols, values):
+        shape = (len(users), len(items))
+        totals = sparse.csr_matrix((values, (rows, cols)), shape=shape, dtype=np.float32)
+        counts = sparse.csr_matrix((np.ones_like(values), (rows, cols)), shape=shape, dtype=np.float32)
+        # Both matrices share one sparsity pattern, so their data arrays line up.
+        totals.sum_duplicates()
+        counts.sum_duplicates()
+        totals.data /= counts.data
+        return cls(users, items, totals)
+
+
+def item_norms(items, batch_size=1000):
+    """
+    Euclidean norm of each content's RatingMatrix column over all of its
+    raters, for incremental builds, whose matrix only holds some of them.
+    Repeated ratings are averaged per user like in the matrix, so the norms
+    match the dot products they divide and a full build.
+    """
+    squares = defaultdict(float)
+    for start in range(0, len(items), batch_size):
+        means = (
+            Rating.objects.filter(media_content__in=items[start:start + batch_size])
+            .order_by().values('media_content', 'user').annotate(mean=Avg('value'))
+            .values_list('media_content', 'mean')
+        )
+        for item, mean in means.iterator(chunk_size=10000):
+            squares[item] += mean * mean
+    return np.sqrt(np.array([squares[item] for item in items], dtype=np.float32))
+
+
+def top_k_neighbors(matrix, norms=None, k=None, shrinkage=None, columns=None, block_size=256):
+    """
+    Top-k most similar columns for each of `columns` (default: all) of a
+    users x items CSR matrix.
+
+    Similarity is the cosine of two columns damped by n / (n + shrinkage),
+    where n is the number of users who rated both, so pairs backed by a
+    single co-rater do not dominate. Columns are processed in blocks of
+    `block_size` with two sparse products each (dot products and co-rater
+    counts); peak memory is about 2 x block_size x n_items floats.
+
+    Returns (columns, neighbours, scores) arrays; only positive scores are kept.
+    """
+    k = settings.RECOMMENDATION_NEIGHBORS if k is None else k
+    shrinkage = settings.RECOMMENDATION_SHRINKAGE if shrinkage is None else shrinkage
+    n_items = matrix.shape[1]
+    if norms is None:
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0), dtype=np.float32).ravel())
+    columns = np.arange(n_items) if columns is None else np.asarray(columns, dtype=np.int64)
+    k = min(k, n_items - 1)
+    empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    if k <= 0 or not len(columns):
+        return empty
+
+    matrix = matrix.tocsr().astype(np.float32)
+    raters = matrix.copy()
+    raters.data = np.ones_like(raters.data)
+    by_column, raters_by_column = matrix.tocsc(), raters.tocsc()
+    inverse_norms = np.divide(1.0, norms, out=np.zeros_like(norms, dtype=np.float32), where=norms > 0)
+
+    found = []
+    for start in range(0, len(columns), block_size):
+        block = columns[start:start + block_size]
+        dots = (by_column[:, block].T @ matrix).toarray()
+        common = (raters_by_column[:, block].T @ raters).toarray()
+        scores = dots * inverse_norms[block, None] * inverse_norms[None, :] * (common / (common + shrinkage))
+        scores[np.arange(len(block)), block] = 0
+        best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, best, axis=1)
+        keep = best_scores > 0
+        found.append((np.repeat(block, k).reshape(len(block), k)[keep], best[keep], best_scores[keep]))
+
+    return tuple(np.concatenate(parts) for parts in zip(*found))
+
+
+def _write_neighbors(rating_matrix, columns, neighbors, scores, computed_at, batch_size):
+    items = rating_matrix.items
+    ContentNeighbor.objects.bulk_create(
+        (
+            ContentNeighbor(media_content_id=items[column], neighbor_id=items[neighbor], score=float(score), computed_at=computed_at)
+            for column, neighbor, score in zip(columns.tolist(), neighbors.tolist(), scores.tolist())
+        ),
+        batch_size=batch_size,
+    )
+    return len(columns)
+
+
+def build_content_neighbors(block_size=256, batch_size=5000):
+    """
+    Rebuild the whole ContentNeighbor table from the Rating table. Returns the
+    number of rows written.
+    """
+    computed_at = timezone.now()
+    rating_matrix = RatingMatrix.from_queryset(Rating.objects.all())
+    # The matrix holds every rater, so the norms are taken from its columns.
+    columns, neighbors, scores = top_k_neighbors(rating_matrix.matrix, block_size=block_size)
+    with transaction.atomic():
+        ContentNeighbor.objects.all().delete()
+        return _write_neighbors(rating_matrix, columns, neighbors, scores, computed_at, batch_size)
+
+
+def update_content_neighbors(since=None, block_size=256, batch_size=5000):
+    """
+    Recompute the neighbour lists of contents that received ratings since
+    `since` (default: the latest ContentNeighbor.computed_at). Returns the
+    number of rows written, or None when there is no previous build to start
+    from.
+
+    Only the ratings of users who rated a changed content are loaded: those
+    are the only users that contribute to its similarities, so the result
+    equals a full rebuild for the changed contents. Other contents' lists
+    are refreshed when they are next rated. Edited and deleted ratings are
+    picked up by the next full rebuild.
+    """
+    if since is None:
+        since = ContentNeighbor.objects.aggregate(latest=Max('computed_at'))['latest']
+        if since is None:
+            return None
+    computed_at = timezone.now()
+    changed = set(Rating.objects.filter(created_at__gte=since).values_list('media_content', flat=True).distinct())
+    if not changed:
+        return 0
+    raters = Rating.objects.filter(media_content__in=changed).values('user')
+    rating_matrix = RatingMatrix.from_queryset(Rating.objects.filter(user__in=raters))
+    columns = [code for code, item in enumerate(rating_matrix.items) if item in changed]
+    norms = item_norms(rating_matrix.items)
+    columns, neighbors, scores = top_k_neighbors(rating_matrix.matrix, norms, columns=columns, block_size=block_size)
+    with transaction.atomic():
+        ContentNeighbor.objects.filter(media_content__in=changed).delete()
+        return _write_neighbors(rating_matrix, columns, neighbors, scores, computed_at, batch_size)
+
+
+def similar_contents(media_content_id, limit=None):
+    """
+    The precomputed neighbours of a content, most similar first, each with a
+    `score` attribute.
+    """
+    limit = settings.RECOMMENDATION_NEIGHBORS if limit is None else limit
+    return list(
+        MediaContent.objects.filter(neighbor_of__media_content=media_content_id)
+        .annotate(score=F('neighbor_of__score'))
+        .order_by('-score', 'media_id')[:limit]
+    )
+
+
+def recommended_contents(user_id, limit=None):
+    """
+    Contents for a user, scored by summing the neighbour similarities of their
+    RECOMMENDATION_HISTORY most recent ratings weighted by (value - 3), so
+    contents similar to ones they disliked are pushed down. Already rated
+    contents are excluded. Each result has a `score` attribute.
+    """
+    limit = settings.RECOMMENDATION_NEIGHBORS if limit is None else limit
+    recent = Rating.objects.filter(user=user_id).order_by('-created_at').values('pk')[:settings.RECOMMENDATION_HISTORY]
+    scores = (
+        ContentNeighbor.objects.filter(media_content__ratings__in=recent)
+        .exclude(neighbor__in=Rating.objects.filter(user=user_id).values('media_content'))
+        .values('neighbor')
+        .annotate(score=Sum(F('score') * (F('media_content__ratings__value') - 3)))
+        .filter(score__gt=0)
+        .order_by('-score', 'neighbor')[:limit]
+    )
+    scores = {row['neighbor']: row['score'] for row in scores}
+    contents = MediaContent.objects.in_bulk(scores)
+    for pk, content in contents.items():
+        content.score = scores[pk]
+    return sorted(contents.values(), key=lambda content: (-content.score, str(content.pk)))
@@ -1,13 +1,122 @@
+import uuid
 from rest_framework import serializers
+from content.models import MediaContent
+from content.serializers import MediaContentSerializer
+from core.rows import RowSerializer
 from .models import Rating
 
+class MediaContentField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key field for Rating.media_content.
+    Resolves ids from the `media_contents` map in the serializer context when a
+    list serializer has prefetched them, instead of one query per item.
+    """
+
+    def to_internal_value(self, data):
+        prefetched = self.context.get('media_contents')
+        if prefetched is None:
+            return super().to_internal_value(data)
+        try:
+            key = uuid.UUID(str(data))
+        except (TypeError, ValueError, AttributeError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return prefetched[key]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+
+class UserEmailField(serializers.ReadOnlyField):
+    """
+    Read-only email of the rating's user.
+    A rating owned by the requesting user is rendered from request.user, so
+    freshly created ratings need no user lookup, and a token-claims principal
+    (users.authentication.UserPrincipal) works in place of a User row.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(source='*', **kwargs)
+
+    def to_representation(self, rating):
+        if not Rating.user.is_cached(rating):
+            request = self.context.get('request')
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated and user.pk == rating.user_id:
+                return user.email
+        return rating.user.email
+
+
+class RatingListSerializer(serializers.ListSerializer):
+    """
+    List serializer for RatingSerializer.
+    Resolves every referenced MediaContent with a single query before the
+    items are validated.
+    """
+
+    def prefetch_media_contents(self, data):
+        ids = set()
+        for item in data:
+            try:
+                ids.add(uuid.UUID(str(item['media_content'])))
+            except (TypeError, ValueError, KeyError, AttributeError):
+                continue
+        self._context['media_contents'] = MediaContent.objects.in_bulk(ids) if ids else {}
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.prefetch_media_contents(data)
+        return super().to_internal_value(data)
+
+    def validate_items(self, data):
+        """
+        Validate each item independently, for partial-success bulk writes.
+        Returns a list of (validated_data, errors) pairs in input order, with
+        exactly one of the two set.
+        """
+        self.prefetch_media_contents(data)
+        outcomes = []
+        for item in data:
+            try:
+                outcomes.append((self.child.run_validation(item), None))
+            except serializers.ValidationError as exc:
+                outcomes.append((None, exc.detail))
+        return outcomes
+
+
 class RatingSerializer(serializers.ModelSerializer):
     """
     Serializer for the Rating model.
     """
-    user = serializers.ReadOnlyField(source='user.email')
+    user = UserEmailField()
+    media_content = MediaContentField(queryset=MediaContent.objects.all())
+
+    class Meta:
+        model = Rating
+        fields = ('rating_id', 'user', 'media_content', 'value', 'created_at', 'updated_at')
+        read_only_fields = ('rating_id', 'created_at', 'updated_at')
+        list_serializer_class = RatingListSerializer
+
+
+class RatingVoteSerializer(serializers.ModelSerializer):
+    """
+    Body of a single-vote upsert; the user and content come from the request.
+    """
 
     class Meta:
         model = Rating
-        fields = ('rating_id', 'user', 'media_content', 'value', 'created_at')
-        read_only_fields = ('rating_id', 'created_at')
+        fields = ('value',)
+
+
+class RatingRowSerializer(RowSerializer):
+    """
+    RatingSerializer for list pages, built from values() rows.
+    """
+    serializer_class = RatingSerializer
+    lookups = {'user': 'user__email'}
+
+
+class RecommendedContentSerializer(MediaContentSerializer):
+    """
+    Media content with the recommendation `score` it was ranked by.
+    """
+    score = serializers.FloatField(read_only=True)
@@ -0,0 +1,369 @@
+import uuid
+from collections import defaultdict
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, F, FloatField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce, Greatest, NullIf, Now
+from django.utils import timezone
+from content.leaderboards import bayesian_rating, shift_trending_score, trending_difference, trending_sum, trending_weight
+from content.models import MediaContent
+from core.cache import invalidate
+from core.jobs import enqueue
+from users.models import User
+from .models import Rating
+
+
+def record_ratings_added(ratings):
+    """
+    Fold newly created ratings into the aggregates of the rated content and
+    the raters' User.rating_count. Must run inside the transaction that
+    inserted the ratings. Returns the number of content rows updated.
+    """
+    updated = _apply_rating_changes(added=[_contribution(r) for r in ratings])
+    _adjust_rating_counts([r.user_id for r in ratings], 1)
+    return updated
+
+
+def record_ratings_removed(ratings):
+    """
+    Remove deleted ratings from the aggregates of the rated content and the
+    raters' User.rating_count. Must run inside the transaction that deleted
+    the ratings.
+    """
+    _apply_rating_changes(removed=[_contribution(r) for r in ratings])
+    _adjust_rating_counts([r.user_id for r in ratings], -1)
+
+
+def record_rating_changed(previous_media_content_id, previous_value, rating):
+    """
+    Move a rating's contribution after its value or target content changed.
+    """
+    if previous_media_content_id == rating.media_content_id and previous_value == rating.value:
+        return
+    weight = trending_weight(rating.created_at)
+    _apply_rating_changes(
+        added=[(rating.media_content_id, rating.value, weight)],
+        removed=[(previous_media_content_id, previous_value, weight)],
+    )
+
+
+# Single-vote upserts target the partial unique index rating_single_vote_uniq.
+UPSERT_RATING = """
+INSERT INTO ratings_rating (rating_id, user_id, media_content_id, value, created_at, updated_at, single_vote)
+VALUES (%s, %s, %s, %s, %s, %s, TRUE)
+ON CONFLICT (user_id, media_content_id) WHERE single_vote
+DO UPDATE SET value = EXCLUDED.value, updated_at = EXCLUDED.updated_at
+"""
+
+# PostgreSQL variant that also returns the previous value, in the same round
+# trip. Every part of the statement sees the same snapshot, so `previous` is
+# the locked pre-update row. The conflict update only applies when `previous`
+# found the row: a vote inserted concurrently after the snapshot returns no
+# row at all, and upsert_rating falls back to a locking read.
+UPSERT_RATING_RETURNING_PREVIOUS = """
+WITH previous AS (
+    SELECT value FROM ratings_rating
+    WHERE user_id = %s AND media_content_id = %s AND single_vote
+    FOR UPDATE
+)
+INSERT INTO ratings_rating (rating_id, user_id, media_content_id, value, created_at, updated_at, single_vote)
+VALUES (%s, %s, %s, %s, %s, %s, TRUE)
+ON CONFLICT (user_id, media_content_id) WHERE single_vote
+DO UPDATE SET value = EXCLUDED.value, updated_at = EXCLUDED.updated_at
+WHERE EXISTS (SELECT 1 FROM previous)
+RETURNING rating_id, created_at, (SELECT value FROM previous)
+"""
+
+
+def upsert_rating(user_id, media_content_id, value):
+    """
+    Record a user's single vote for a content: insert it, or change the value
+    of their existing vote. On PostgreSQL this is one INSERT ... ON CONFLICT
+    DO UPDATE round trip. The change is folded into the content aggregates,
+    and User.rating_count only grows when a row was actually inserted. Must
+    run inside a transaction. Returns (rating, created), and raises
+    MediaContent.DoesNotExist for unknown content (foreign keys are only
+    checked at commit).
+    """
+    now = timezone.now()
+    rating = Rating(
+        rating_id=uuid.uuid4(), user_id=user_id, media_content_id=media_content_id, value=value,
+        created_at=now, updated_at=now, single_vote=True,
+    )
+    connection = connections[Rating.objects.db]
+    params = [
+        Rating._meta.get_field(name).get_db_prep_save(getattr(rating, Rating._meta.get_field(name).attname), connection)
+        for name in ('rating_id', 'user', 'media_content', 'value', 'created_at', 'updated_at')
+    ]
+
+    row = None
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(UPSERT_RATING_RETURNING_PREVIOUS, [params[1], params[2], *params])
+            row = cursor.fetchone()
+    if row is None:
+        existing = (
+            Rating.objects.select_for_update()
+            .filter(user_id=user_id, media_content_id=media_content_id, single_vote=True)
+            .values_list('rating_id', 'created_at', 'value').first()
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(UPSERT_RATING, params)
+        row = existing or (rating.rating_id, now, None)
+
+    rating_id, rating.created_at, previous_value = row
+    rating.rating_id = uuid.UUID(str(rating_id))
+    created = previous_value is None
+    if created:
+        if not record_ratings_added([rating]):
+            raise MediaContent.DoesNotExist(f'No MediaContent with pk {media_content_id}.')
+    else:
+        record_rating_changed(media_content_id, previous_value, rating)
+    # Raw SQL sends no post_save signal.
+    invalidate('ratings', rating.pk, created=created)
+    return rating, created
+
+
+def collapse_duplicate_ratings(batch_size=1000):
+    """
+    Collapse each user's ratings of a content into a single vote.
+
+    Walks users in primary-key batches, each in its own short transaction
+    that only locks that batch's ratings, so the table stays writable. Per
+    (user, content) pair the most recently updated rating is kept and marked
+    `single_vote`; the others are deleted and removed from the content
+    aggregates and User.rating_count. Returns the number of ratings deleted.
+    """
+    deleted = 0
+    last_pk = None
+    while True:
+        users = User.objects.order_by('pk')
+        if last_pk is not None:
+            users = users.filter(pk__gt=last_pk)
+        batch = list(users.values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return deleted
+        last_pk = batch[-1]
+        with transaction.atomic():
+            ratings = (
+                Rating.objects.select_for_update().filter(user__in=batch)
+                .order_by('user', 'media_content', '-updated_at', '-created_at', '-rating_id')
+                .only('rating_id', 'user', 'media_content', 'value', 'created_at', 'single_vote')
+            )
+            kept, duplicates, seen = [], [], set()
+            for rating in ratings:
+                pair = (rating.user_id, rating.media_content_id)
+                if pair in seen:
+                    duplicates.append(rating)
+                    continue
+                seen.add(pair)
+                if not rating.single_vote:
+                    kept.append(rating.pk)
+            if duplicates:
+                # Deleted first, so marking the kept row cannot collide with a duplicate that is already a vote.
+                Rating.objects.filter(pk__in=[rating.pk for rating in duplicates]).delete()
+                record_ratings_removed(duplicates)
+            if kept:
+                Rating.objects.filter(pk__in=kept).update(single_vote=True)
+        deleted += len(duplicates)
+
+
+def _contribution(rating):
+    return rating.media_content_id, rating.value, trending_weight(rating.created_at)
+
+
+def _apply_rating_changes(added=(), removed=()):
+    """
+    Apply (media_content_id, value, trending weight) additions and removals
+    to MediaContent aggregates and leaderboard scores with one UPDATE per
+    affected content. Counters are updated with F() expressions so concurrent
+    writers never lose an increment. Returns the number of content rows
+    updated.
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    # Trending weights are log2 (see content.leaderboards), so they are summed per side first.
+    trending = defaultdict(lambda: ([], []))
+    for media_content_id, value, weight in added:
+        deltas[media_content_id][value] += 1
+        trending[media_content_id][0].append(weight)
+    for media_content_id, value, weight in removed:
+        deltas[media_content_id][value] -= 1
+        trending[media_content_id][1].append(weight)
+
+    updated = 0
+    # Rows are locked in a fixed order so concurrent batches cannot deadlock.
+    for media_content_id, histogram in sorted(deltas.items(), key=lambda item: str(item[0])):
+        count_delta = sum(histogram.values())
+        sum_delta = sum(value * delta for value, delta in histogram.items())
+        updates = {
+            field: _shift(field, histogram[value])
+            for value, field in MediaContent.HISTOGRAM_FIELDS.items() if histogram.get(value)
+        }
+        if not updates:
+            continue
+        # avg_rating is derived from the post-update totals within the same statement.
+        rating_count = _shift('rating_count', count_delta)
+        rating_sum = _shift('rating_sum', sum_delta)
+        updates.update(
+            rating_count=rating_count,
+            rating_sum=rating_sum,
+            avg_rating=Coalesce(
+                Cast(rating_sum, FloatField()) / NullIf(rating_count, 0),
+                0.0,
+                output_field=FloatField(),
+            ),
+            bayesian_rating=bayesian_rating(rating_count, rating_sum),
+            # update() skips auto_now; the aggregates are part of the content's representation.
+            updated_at=Now(),
+        )
+        shift = _trending_shift(*trending[media_content_id])
+        if shift is not None:
+            updates['trending_score'] = shift
+        updated += MediaContent.objects.filter(pk=media_content_id).update(**updates)
+        invalidate('content', media_content_id)
+    return updated
+
+
+def _adjust_rating_counts(user_ids, step):
+    """
+    Add step to User.rating_count once per occurrence of each user id. With
+    BACKGROUND_JOBS the deltas are queued instead, and workers fold the
+    queued deltas of many writes into few UPDATEs (see ratings/jobs.py), so
+    rating writes no longer lock the raters' user rows.
+    """
+    deltas = defaultdict(int)
+    for user_id in user_ids:
+        deltas[user_id] += step
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    if settings.BACKGROUND_JOBS:
+        enqueue('ratings.rating_counts', {'deltas': {str(user_id): delta for user_id, delta in deltas.items()}})
+        return
+    apply_rating_count_deltas(deltas)
+
+
+def apply_rating_count_deltas(deltas):
+    """
+    Add each user's delta to their User.rating_count, as a single
+    database-side UPDATE per distinct delta. The read-modify-write never
+    leaves the database, so concurrent requests cannot lose updates.
+    """
+    by_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(user_id)
+    for delta, ids in sorted(by_delta.items()):
+        User.objects.filter(pk__in=sorted(ids, key=str)).update(rating_count=_shift('rating_count', delta))
+
+
+def _trending_shift(added, removed):
+    """
+    trending_score expression for the net of added and removed log2 weights,
+    or None when they cancel out (e.g. a rating whose value changed).
+    """
+    added, removed = trending_sum(*added), trending_sum(*removed)
+    if added > removed:
+        weight, remove = trending_difference(added, removed), False
+    else:
+        weight, remove = trending_difference(removed, added), True
+    if weight == MediaContent.NO_TRENDING_SCORE:
+        return None
+    return shift_trending_score(weight, remove=remove)
+
+
+def _shift(field, delta):
+    """
+    F() expression adding delta to a counter. Decrements are clamped at zero so
+    ratings written outside these services (e.g. raw ORM calls) cannot push a
+    counter negative; `rebuild_rating_aggregates` repairs any such drift.
+    """
+    if delta >= 0:
+        return F(field) + delta
+    return Greatest(F(field) + delta, 0.0 if isinstance(delta, float) else 0)
+
+
+def rebuild_rating_aggregates(media_model=None, rating_model=None, batch_size=1000):
+    """
+    Recompute every MediaContent aggregate from the Rating table.
+
+    Runs one grouped aggregate query over ratings and writes the results with
+    bulk_update in batches. Models can be passed in so data migrations can use
+    their historical versions. Returns the number of content rows written.
+    """
+    if media_model is None:
+        media_model = MediaContent
+    if rating_model is None:
+        rating_model = Rating
+
+    histogram_fields = MediaContent.HISTOGRAM_FIELDS
+    rows = rating_model.objects.order_by().values('media_content').annotate(
+        count=Count('pk'),
+        total=Sum('value'),
+        **{field: Count('pk', filter=Q(value=value)) for value, field in histogram_fields.items()},
+    )
+    stats = {row['media_content']: row for row in rows.iterator(chunk_size=batch_size)}
+
+    fields = ['rating_count', 'rating_sum', 'avg_rating', *histogram_fields.values()]
+    # Historical models used by data migrations may predate updated_at.
+    track_updates = any(field.name == 'updated_at' for field in media_model._meta.concrete_fields)
+    if track_updates:
+        fields.append('updated_at')
+    now = timezone.now()
+    written = 0
+    batch = []
+    for content in media_model.objects.order_by().only('pk').iterator(chunk_size=batch_size):
+        row = stats.get(content.pk)
+        content.rating_count = row['count'] if row else 0
+        content.rating_sum = row['total'] if row else 0
+        content.avg_rating = content.rating_sum / content.rating_count if content.rating_count else 0.0
+        for field in histogram_fields.values():
+            setattr(content, field, row[field] if row else 0)
+        if track_updates:
+            content.updated_at = now
+        batch.append(content)
+        if len(batch) >= batch_size:
+            media_model.objects.bulk_update(batch, fields)
+            written += len(batch)
+            batch = []
+    if batch:
+        media_model.objects.bulk_update(batch, fields)
+        written += len(batch)
+    return written
+
+
+def reconcile_rating_counts(batch_size=1000):
+    """
+    Repair drift between User.rating_count and the Rating table.
+
+    Walks users in primary-key batches, each in its own short transaction, and
+    rewrites only the counters that disagree with a COUNT of their ratings.
+    With BACKGROUND_JOBS, run it while no ratings.rating_counts job is
+    queued: queued deltas would be applied on top of the repaired counters.
+    Returns the number of users repaired.
+    """
+    actual = Coalesce(
+        Subquery(
+            Rating.objects.filter(user=OuterRef('pk')).order_by()
+            .values('user').annotate(count=Count('pk')).values('count')
+        ),
+        0,
+    )
+    repaired = 0
+    last_pk = None
+    while True:
+        users = User.objects.order_by('pk')
+        if last_pk is not None:
+            users = users.filter(pk__gt=last_pk)
+        batch = list(users.values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return repaired
+        last_pk = batch[-1]
+        with transaction.atomic():
+            stale = list(
+                User.objects.filter(pk__in=batch).annotate(actual=actual)
+                .exclude(rating_count=F('actual')).values_list('pk', flat=True)
+            )
+            if stale:
+                User.objects.filter(pk__in=stale).update(rating_count=actual)
+        repaired += len(stale)
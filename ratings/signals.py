@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from core.cache import invalidate
+from .models import Rating
+
+
+@receiver([post_save, post_delete], sender=Rating)
+def invalidate_rating_cache(sender, instance, **kwargs):
+    # Content responses embed rating aggregates; ratings.services invalidates
+    # the content it updates, including for bulk writes that send no signals.
+    invalidate('ratings', instance.pk, created=kwargs.get('created', False))
@@ -1,10 +1,38 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+import unittest
+import uuid
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+import numpy as np
+from scipy import sparse
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
 from users.models import User
 from content.models import MediaContent
-from ratings.models import Rating
+from core.benchmarks import run_partition_benchmark
+from core.jobs import run_pending
+from core.models import Job
+from ratings import services
+from ratings.models import ContentNeighbor, Rating
+from ratings.checks import check_single_vote_table
+from ratings.partitions import SINGLE_VOTE_ERROR, is_partitioned, month_start, partition_name, partitions
+from ratings.recommendations import RatingMatrix, build_content_neighbors, item_norms, top_k_neighbors, update_content_neighbors
 
 class RatingTests(TestCase):
     def setUp(self):
@@ -61,6 +89,7 @@ class RatingTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
         self.assertEqual(Rating.objects.count(), 0)
 
+    @override_settings(RATINGS_SINGLE_VOTE=True)
     def test_user_cannot_rate_same_content_twice(self):
         """
         Ensure a user cannot rate the same media content more than once.
@@ -147,4 +176,672 @@ class RatingTests(TestCase):
         self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token2) # User2 tries to delete User1's rating
         response = self.client.delete(detail_url, format='json')
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
-        self.assertEqual(Rating.objects.count(), 1) # Rating should still exist
\ No newline at end of file
+        self.assertEqual(Rating.objects.count(), 1) # Rating should still exist
+
+    def test_rating_writes_maintain_content_aggregates(self):
+        """
+        Ensure creating, updating and deleting ratings keeps MediaContent aggregates in sync.
+        """
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token1)
+        response = self.client.post(self.rating_list_url, {'media_content': str(self.media1.media_id), 'value': 5}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token2)
+        self.client.post(self.rating_list_url, {'media_content': str(self.media1.media_id), 'value': 2}, format='json')
+
+        self.media1.refresh_from_db()
+        self.assertEqual(self.media1.rating_count, 2)
+        self.assertEqual(self.media1.rating_sum, 7)
+        self.assertEqual(self.media1.avg_rating, 3.5)
+        self.assertEqual(self.media1.rating_histogram, {'1': 0, '2': 1, '3': 0, '4': 0, '5': 1})
+
+        # Moving user2's rating to another item updates both items.
+        rating = Rating.objects.get(user=self.user2)
+        detail_url = reverse('rating-detail', kwargs={'pk': rating.rating_id})
+        self.client.patch(detail_url, {'media_content': str(self.media2.media_id), 'value': 4}, format='json')
+        self.media1.refresh_from_db()
+        self.media2.refresh_from_db()
+        self.assertEqual((self.media1.rating_count, self.media1.avg_rating), (1, 5.0))
+        self.assertEqual((self.media2.rating_count, self.media2.avg_rating), (1, 4.0))
+        self.assertEqual(self.media2.rating_4_count, 1)
+
+        response = self.client.delete(detail_url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.media2.refresh_from_db()
+        self.assertEqual((self.media2.rating_count, self.media2.rating_sum, self.media2.avg_rating), (0, 0, 0))
+        self.assertEqual(self.media2.rating_4_count, 0)
+
+
+    def test_rating_count_tracks_creates_and_deletes(self):
+        """
+        Ensure User.rating_count follows creates and deletes made through the API.
+        """
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token1)
+        for media in (self.media1, self.media2):
+            self.client.post(self.rating_list_url, {'media_content': str(media.media_id), 'value': 4}, format='json')
+        self.user1.refresh_from_db()
+        self.assertEqual(self.user1.rating_count, 2)
+
+        rating = Rating.objects.filter(user=self.user1).first()
+        self.client.delete(reverse('rating-detail', kwargs={'pk': rating.rating_id}), format='json')
+        self.user1.refresh_from_db()
+        self.assertEqual(self.user1.rating_count, 1)
+
+    @override_settings(BACKGROUND_JOBS=True)
+    def test_background_jobs_fold_rating_counts(self):
+        """
+        Ensure that with BACKGROUND_JOBS, rating writes queue User.rating_count deltas that workers fold into one UPDATE.
+        """
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.access_token1)
+        for media in (self.media1, self.media2):
+            self.client.post(self.rating_list_url, {'media_content': str(media.media_id), 'value': 4}, format='json')
+        rating = Rating.objects.filter(user=self.user1).first()
+        self.client.delete(reverse('rating-detail', kwargs={'pk': rating.rating_id}), format='json')
+        self.user1.refresh_from_db()
+        self.assertEqual(self.user1.rating_count, 0)
+        self.assertEqual(Job.objects.filter(name='ratings.rating_counts').count(), 3)
+
+        with CaptureQueriesContext(connection) as queries:
+            run_pending()
+        self.assertEqual(sum(query['sql'].startswith('UPDATE "users_user"') for query in queries.captured_queries), 1)
+        self.user1.refresh_from_db()
+        self.assertEqual(self.user1.rating_count, 1)
+
+    def test_reconcile_rating_counts_command(self):
+        """
+        Ensure the reconcile command repairs counters that drifted from the Rating table.
+        """
+        Rating.objects.create(user=self.user1, media_content=self.media1, value=5)
+        Rating.objects.create(user=self.user1, media_content=self.media2, value=3)
+        User.objects.filter(pk=self.user2.pk).update(rating_count=7)
+
+        out = StringIO()
+        call_command('reconcile_rating_counts', batch_size=1, stdout=out)
+        self.assertIn('Repaired rating_count for 2 users.', out.getvalue())
+        self.user1.refresh_from_db()
+        self.user2.refresh_from_db()
+        self.assertEqual((self.user1.rating_count, self.user2.rating_count), (2, 0))
+
+@override_settings(JWT_PRINCIPAL='database')
+class RatingQueryBudgetTests(TestCase):
+    """
+    Query counts must not grow with the number of ratings on a page.
+    Authentication looks the user up on every request here, so budgets do not
+    depend on the state of the per-process user cache.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.rating_list_url = reverse('rating-list')
+        self.admin_user = User.objects.create_superuser(email='admin@example.com', username='admin', password='adminpassword')
+        self.media = MediaContent.objects.create(
+            title='Test Game', description='A test game', category='game', content_url='http://test.com/game.zip'
+        )
+        response = self.client.post(reverse('token_obtain_pair'), {'email': 'admin@example.com', 'password': 'adminpassword'}, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + response.data['access'])
+
+    def create_ratings(self, count):
+        users = [
+            User(email=f'rater{i}@example.com', username=f'rater{i}')
+            for i in range(User.objects.count(), User.objects.count() + count)
+        ]
+        User.objects.bulk_create(users)
+        Rating.objects.bulk_create([Rating(user=user, media_content=self.media, value=(i % 5) + 1) for i, user in enumerate(users)])
+
+    def test_list_query_count_is_constant(self):
+        """
+        Ensure a page of ratings costs auth + count + page queries regardless of page size.
+        """
+        self.create_ratings(5)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.rating_list_url, {'page_size': 5}, format='json')
+        self.assertEqual(len(response.data['results']), 5)
+
+        self.create_ratings(95)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.rating_list_url, {'page_size': 100}, format='json')
+        self.assertEqual(len(response.data['results']), 100)
+        self.assertTrue(all('@example.com' in rating['user'] for rating in response.data['results']))
+
+    def test_retrieve_query_count(self):
+        """
+        Ensure a detail read never fetches the owner row separately.
+        """
+        self.create_ratings(1)
+        rating = Rating.objects.get()
+        detail_url = reverse('rating-detail', kwargs={'pk': rating.rating_id})
+        with self.assertNumQueries(2):
+            response = self.client.get(detail_url, format='json')
+        self.assertEqual(response.data['user'], rating.user.email)
+
+    def test_admin_changelist_query_count_is_constant(self):
+        """
+        Ensure the Rating admin changelist joins users and media content instead of querying per row.
+        """
+        self.client.force_login(self.admin_user)
+        changelist_url = reverse('admin:ratings_rating_changelist')
+        self.create_ratings(5)
+        with CaptureQueriesContext(connection) as small_page:
+            self.assertEqual(self.client.get(changelist_url).status_code, status.HTTP_200_OK)
+        self.create_ratings(45)
+        with CaptureQueriesContext(connection) as large_page:
+            response = self.client.get(changelist_url)
+        self.assertContains(response, 'rated Test Game', count=50)
+        self.assertEqual(len(large_page), len(small_page))
+
+
+class RatingBulkTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.bulk_url = reverse('rating-bulk')
+        self.user = User.objects.create_user(email='bulk@example.com', username='bulk', password='password123')
+        self.contents = MediaContent.objects.bulk_create([
+            MediaContent(title=f'Bulk {i}', description='Desc', category='game', content_url='http://example.com/bulk.zip')
+            for i in range(3)
+        ])
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_create_updates_aggregates_and_counts(self):
+        """
+        Ensure a bulk request creates every rating and keeps aggregates in sync.
+        """
+        items = [{'media_content': str(content.pk), 'value': value} for content in self.contents for value in (2, 4)]
+        response = self.client.post(self.bulk_url, items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['created'], response.data['failed']), (6, 0))
+        self.assertEqual([result['index'] for result in response.data['results']], list(range(6)))
+        self.assertTrue(all(result['rating']['user'] == 'bulk@example.com' for result in response.data['results']))
+        self.assertEqual(Rating.objects.filter(user=self.user).count(), 6)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.rating_count, 6)
+        content = MediaContent.objects.get(pk=self.contents[0].pk)
+        self.assertEqual((content.rating_count, content.rating_sum, content.avg_rating), (2, 6, 3.0))
+
+    def test_bulk_create_reports_per_item_errors(self):
+        """
+        Ensure invalid items are reported by index while valid ones are stored.
+        """
+        items = [
+            {'media_content': str(self.contents[0].pk), 'value': 5},
+            {'media_content': '00000000-0000-0000-0000-000000000000', 'value': 5},
+            {'media_content': str(self.contents[1].pk), 'value': 9},
+            'not-an-object',
+        ]
+        response = self.client.post(self.bulk_url, items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual((response.data['created'], response.data['failed']), (1, 3))
+        statuses = [result['status'] for result in response.data['results']]
+        self.assertEqual(statuses, [201, 400, 400, 400])
+        self.assertIn('media_content', response.data['results'][1]['errors'])
+        self.assertIn('value', response.data['results'][2]['errors'])
+        self.assertEqual(Rating.objects.count(), 1)
+
+        response = self.client.post(self.bulk_url, items[1:], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.bulk_url, {'media_content': str(self.contents[0].pk), 'value': 5}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_resolves_content_in_one_query(self):
+        """
+        Ensure media content lookups do not grow with the number of items.
+        """
+        items = [{'media_content': str(content.pk), 'value': 3} for content in self.contents] * 20
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.bulk_url, items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        content_selects = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT') and 'content_mediacontent' in query['sql']
+        ]
+        self.assertEqual(len(content_selects), 1)
+
+    def test_bulk_create_requires_authentication(self):
+        """
+        Ensure anonymous clients cannot bulk create ratings.
+        """
+        self.client.force_authenticate(user=None)
+        response = self.client.post(self.bulk_url, [{'media_content': str(self.contents[0].pk), 'value': 5}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(RATINGS_SINGLE_VOTE=True)
+class SingleVoteTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='voter@example.com', username='voter', password='password123')
+        self.media = MediaContent.objects.create(title='Vote', description='Desc', category='game', content_url='http://example.com/v.zip')
+        self.client.force_authenticate(self.user)
+        self.url = reverse('rating-by-content', kwargs={'media_id': self.media.pk})
+
+    def test_upsert_creates_then_updates(self):
+        response = self.client.put(self.url, {'value': 2}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['user'], self.user.email)
+        self.assertEqual(response.data['media_content'], self.media.pk)
+        rating_id = response.data['rating_id']
+
+        for value in (5, 5):
+            response = self.client.put(self.url, {'value': value}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['rating_id'], rating_id)
+            self.assertEqual(response.data['value'], 5)
+
+        rating = Rating.objects.get()
+        self.assertEqual((rating.value, rating.single_vote), (5, True))
+        self.user.refresh_from_db()
+        self.media.refresh_from_db()
+        self.assertEqual(self.user.rating_count, 1)
+        self.assertEqual((self.media.rating_count, self.media.rating_sum), (1, 5))
+        self.assertEqual((self.media.rating_2_count, self.media.rating_5_count), (0, 1))
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'The single-statement upsert is PostgreSQL only.')
+    def test_upsert_is_one_statement_on_postgresql(self):
+        """
+        Ensure changing a vote reads the previous value in the upsert itself, without the locking read fallback.
+        """
+        self.client.put(self.url, {'value': 2}, format='json')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(self.url, {'value': 4}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statements = [query['sql'] for query in queries.captured_queries if 'ratings_rating' in query['sql']]
+        self.assertEqual(sum('ON CONFLICT' in sql for sql in statements), 1)
+        self.assertFalse(any(sql.startswith('SELECT') and 'FOR UPDATE' in sql for sql in statements))
+
+    def test_upsert_validates_value_and_content(self):
+        response = self.client.put(self.url, {'value': 9}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        for media_id in (uuid.uuid4(), 'not-a-uuid'):
+            response = self.client.put(reverse('rating-by-content', kwargs={'media_id': media_id}), {'value': 3}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Rating.objects.exists())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.rating_count, 0)
+
+    def test_upsert_requires_single_vote_mode(self):
+        with self.settings(RATINGS_SINGLE_VOTE=False):
+            response = self.client.put(self.url, {'value': 3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_skips_content_already_rated(self):
+        self.client.put(self.url, {'value': 3}, format='json')
+        other = MediaContent.objects.create(title='Other', description='Desc', category='game', content_url='http://example.com/o.zip')
+        items = [{'media_content': str(self.media.pk), 'value': 4}, {'media_content': str(other.pk), 'value': 4}, {'media_content': str(other.pk), 'value': 1}]
+        response = self.client.post(reverse('rating-bulk'), items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([result['status'] for result in response.data['results']], [400, 201, 400])
+        self.assertEqual(Rating.objects.count(), 2)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.rating_count, 2)
+
+    def test_collapse_duplicate_ratings(self):
+        other = User.objects.create_user(email='other-voter@example.com', username='other-voter', password='password123')
+        legacy = []
+        with self.settings(RATINGS_SINGLE_VOTE=False):
+            for user, value in ((self.user, 1), (self.user, 2), (self.user, 4), (other, 3)):
+                rating = Rating.objects.create(user=user, media_content=self.media, value=value)
+                services.record_ratings_added([rating])
+                legacy.append(rating)
+        # The most recently updated duplicate is kept, whatever the creation order.
+        Rating.objects.filter(pk=legacy[1].pk).update(updated_at=timezone.now() + timedelta(minutes=1))
+
+        out = StringIO()
+        call_command('collapse_duplicate_ratings', batch_size=1, stdout=out)
+        self.assertIn('Deleted 2 duplicate ratings.', out.getvalue())
+        self.assertEqual(set(Rating.objects.values_list('pk', 'single_vote')), {(legacy[1].pk, True), (legacy[3].pk, True)})
+        self.user.refresh_from_db()
+        self.media.refresh_from_db()
+        self.assertEqual(self.user.rating_count, 1)
+        self.assertEqual((self.media.rating_count, self.media.rating_sum), (2, 5))
+
+        # The kept rating is now the user's vote.
+        response = self.client.put(self.url, {'value': 5}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['rating_id'], str(legacy[1].pk))
+        self.assertEqual(Rating.objects.count(), 2)
+
+
+class RatingPartitionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='history@example.com', username='history', password='password123')
+        self.media = MediaContent.objects.create(title='Old', description='Desc', category='game', content_url='http://example.com/o.zip')
+        self.client.force_authenticate(self.user)
+        self.old = Rating.objects.create(user=self.user, media_content=self.media, value=2)
+        self.new = Rating.objects.create(user=self.user, media_content=self.media, value=4)
+        Rating.objects.filter(pk=self.old.pk).update(created_at=timezone.now() - timedelta(days=90))
+
+    def test_list_filters_by_created_range(self):
+        bound = (timezone.now() - timedelta(days=30)).isoformat()
+        response = self.client.get(reverse('rating-list'), {'created_after': bound})
+        self.assertEqual([item['rating_id'] for item in response.data['results']], [str(self.new.pk)])
+        response = self.client.get(reverse('rating-list'), {'created_before': bound})
+        self.assertEqual([item['rating_id'] for item in response.data['results']], [str(self.old.pk)])
+        response = self.client.get(reverse('rating-list'), {'created_after': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_month_boundaries(self):
+        value = datetime(2026, 12, 17, 23, 30, tzinfo=timezone.get_fixed_timezone(-120))
+        self.assertEqual(month_start(value), datetime(2026, 12, 1, tzinfo=dt_timezone.utc))
+        # 23:30 at UTC-2 is already January in UTC.
+        self.assertEqual(month_start(value.replace(day=31)), datetime(2027, 1, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(month_start(value, 1), datetime(2027, 1, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(month_start(value, -12), datetime(2025, 12, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual(partition_name(month_start(value, -12)), 'ratings_rating_p2025_12')
+
+    @unittest.skipIf(connection.vendor == 'postgresql', 'Partitioning is supported on PostgreSQL.')
+    def test_commands_require_postgresql(self):
+        for command in ('partition_ratings', 'benchmark_partitions'):
+            with self.assertRaises(CommandError):
+                call_command(command, stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('archive_rating_partitions', before='2025-01', directory='.', stdout=StringIO())
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Partitioning is only supported on PostgreSQL.')
+    @override_settings(RATINGS_SINGLE_VOTE=True)
+    def test_conversion_refuses_single_vote_mode(self):
+        with self.assertRaises(CommandError):
+            call_command('partition_ratings', stdout=StringIO())
+
+    @override_settings(RATINGS_SINGLE_VOTE=True)
+    def test_single_vote_mode_is_refused_on_a_partitioned_table(self):
+        with mock.patch('ratings.partitions._partitioned_at_startup', return_value=True):
+            responses = [
+                self.client.put(reverse('rating-by-content', kwargs={'media_id': self.media.pk}), {'value': 3}, format='json'),
+                self.client.post(reverse('rating-list'), {'media_content': str(self.media.pk), 'value': 3}, format='json'),
+                self.client.post(reverse('rating-bulk'), [{'media_content': str(self.media.pk), 'value': 3}], format='json'),
+            ]
+        for response in responses:
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertEqual(response.data['detail'], SINGLE_VOTE_ERROR)
+        with mock.patch('ratings.checks.is_partitioned', return_value=True):
+            errors = check_single_vote_table(None, databases=['default'])
+        self.assertEqual([error.id for error in errors], ['ratings.E001'])
+        self.assertEqual(check_single_vote_table(None), [])
+        self.assertEqual(Rating.objects.count(), 2)
+
+
+class RatingExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.export_url = reverse('rating-export')
+        self.user = User.objects.create_user(email='export@example.com', username='export', password='password123')
+        self.other = User.objects.create_user(email='other@example.com', username='other', password='password123')
+        self.media1 = MediaContent.objects.create(title='Game', description='Desc', category='game', content_url='http://test.com/game.zip')
+        self.media2 = MediaContent.objects.create(title='Video', description='Desc', category='video', content_url='http://test.com/video.mp4')
+        now = timezone.now()
+        self.ratings = []
+        for days, user, media, value in ((3, self.user, self.media1, 5), (2, self.other, self.media1, 2), (1, self.user, self.media2, 4)):
+            rating = Rating.objects.create(user=user, media_content=media, value=value)
+            Rating.objects.filter(pk=rating.pk).update(created_at=now - timedelta(days=days))
+            rating.refresh_from_db()
+            self.ratings.append(rating)
+        self.client.force_authenticate(user=self.user)
+
+    def export(self, params=None, **extra):
+        response = self.client.get(self.export_url, params, **extra)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson_export(self):
+        response, body = self.export()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['rating_id'] for row in rows], [str(rating.pk) for rating in self.ratings])
+        self.assertEqual(rows[0], {
+            'rating_id': str(self.ratings[0].pk),
+            'user_id': str(self.user.pk),
+            'media_content_id': str(self.media1.pk),
+            'value': 5,
+            'created_at': self.ratings[0].created_at.isoformat(),
+            'updated_at': self.ratings[0].updated_at.isoformat(),
+        })
+
+    def test_csv_export(self):
+        for kwargs in ({'params': {'format': 'csv'}}, {'HTTP_ACCEPT': 'text/csv'}):
+            response, body = self.export(**kwargs)
+            self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+            rows = list(csv.reader(body.splitlines()))
+            self.assertEqual(rows[0], ['rating_id', 'user_id', 'media_content_id', 'value', 'created_at', 'updated_at'])
+            self.assertEqual([row[0] for row in rows[1:]], [str(rating.pk) for rating in self.ratings])
+
+    def test_filters_and_created_at_range(self):
+        _, body = self.export({'user': str(self.user.pk)})
+        self.assertEqual(len(body.splitlines()), 2)
+        _, body = self.export({'media_content_id': str(self.media1.pk), 'value': 2})
+        self.assertEqual([json.loads(line)['rating_id'] for line in body.splitlines()], [str(self.ratings[1].pk)])
+        _, body = self.export({
+            'created_after': self.ratings[1].created_at.isoformat(),
+            'created_before': self.ratings[2].created_at.isoformat(),
+        })
+        self.assertEqual([json.loads(line)['rating_id'] for line in body.splitlines()], [str(self.ratings[1].pk)])
+
+        response = self.client.get(self.export_url, {'created_after': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_created_at_range_is_applied_once(self):
+        """
+        Ensure the range comes from RatingFilter alone, as on the list endpoint.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            _, body = self.export({'created_after': self.ratings[1].created_at.isoformat()})
+        self.assertEqual(len(body.splitlines()), 2)
+        (select,) = [query['sql'] for query in queries.captured_queries if 'FROM "ratings_rating"' in query['sql']]
+        self.assertEqual(select.count('"created_at" >='), 1)
+
+    def test_streams_in_chunks(self):
+        with mock.patch('ratings.views.RatingViewSet.export_chunk_size', 2), CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.export_url)
+            chunks = [chunk for chunk in response.streaming_content if chunk]
+        self.assertEqual(len(chunks), 2)
+        self.assertFalse(any('users_user' in query['sql'] for query in queries))
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(self.export_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Concurrent writes are only exercised on PostgreSQL.')
+class RatingCountConcurrencyTests(TransactionTestCase):
+    """
+    Parallel rating creates from one user must all be counted.
+    """
+    creates = 200
+    workers = 20
+
+    def test_parallel_creates_keep_exact_counts(self):
+        user = User.objects.create_user(email='busy@example.com', username='busy', password='password123')
+        # Distinct items, so only the user's counter row is shared between requests.
+        contents = MediaContent.objects.bulk_create([
+            MediaContent(title=f'Item {i}', description='Desc', category='game', content_url='http://test.com/item.zip')
+            for i in range(self.creates)
+        ])
+
+        def create_rating(media):
+            try:
+                client = APIClient()
+                client.force_authenticate(user=user)
+                response = client.post(reverse('rating-list'), {'media_content': str(media.media_id), 'value': 4}, format='json')
+                return response.status_code
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            statuses = list(pool.map(create_rating, contents))
+
+        self.assertEqual(statuses, [status.HTTP_201_CREATED] * self.creates)
+        user.refresh_from_db()
+        self.assertEqual(Rating.objects.filter(user=user).count(), self.creates)
+        self.assertEqual(user.rating_count, self.creates)
+        self.assertEqual(MediaContent.objects.filter(rating_count=1, rating_sum=4).count(), self.creates)
+
+
+class RecommendationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.users = [User.objects.create_user(email=f'rec{i}@example.com', username=f'rec{i}', password='password123') for i in range(6)]
+        self.contents = {
+            title: MediaContent.objects.create(title=title, description='Desc', category='game', content_url='http://example.com/c')
+            for title in ('Racer', 'Racer 2', 'Kart', 'Puzzle', 'Chess')
+        }
+        # Racing fans and puzzle fans; users 0-2 like racing, 3-5 puzzles.
+        self.rate(0, {'Racer': 5, 'Racer 2': 5, 'Kart': 4})
+        self.rate(1, {'Racer': 5, 'Racer 2': 4, 'Kart': 5, 'Puzzle': 1})
+        self.rate(2, {'Racer': 4, 'Racer 2': 5})
+        self.rate(3, {'Puzzle': 5, 'Chess': 5})
+        self.rate(4, {'Puzzle': 4, 'Chess': 5, 'Racer': 1})
+        self.rate(5, {'Puzzle': 5})
+
+    def rate(self, user, values):
+        ratings = [
+            Rating.objects.create(user=self.users[user], media_content=self.contents[title], value=value)
+            for title, value in values.items()
+        ]
+        services.record_ratings_added(ratings)
+
+    def neighbor_rows(self, contents=None):
+        rows = ContentNeighbor.objects.all()
+        if contents is not None:
+            rows = rows.filter(media_content__in=contents)
+        return {(row.media_content_id, row.neighbor_id): round(row.score, 5) for row in rows}
+
+    def test_similar_contents_follow_co_ratings(self):
+        call_command('build_recommendations', stdout=StringIO())
+        response = self.client.get(reverse('mediacontent-similar', args=[self.contents['Racer'].pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        titles = [item['title'] for item in response.data]
+        self.assertEqual(titles[:2], ['Racer 2', 'Kart'])
+        self.assertGreater(response.data[0]['score'], response.data[-1]['score'])
+
+        response = self.client.get(reverse('mediacontent-similar', args=[self.contents['Chess'].pk]))
+        self.assertEqual(response.data[0]['title'], 'Puzzle')
+
+    def test_recommendations_exclude_rated_content(self):
+        build_content_neighbors()
+        self.client.force_authenticate(user=self.users[5])
+        response = self.client.get(reverse('recommendations'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['title'], 'Chess')
+        self.assertNotIn('Puzzle', [item['title'] for item in response.data])
+
+        self.client.force_authenticate(user=self.users[2])
+        titles = [item['title'] for item in self.client.get(reverse('recommendations')).data]
+        self.assertEqual(titles[0], 'Kart')
+        self.assertNotIn('Racer', titles)
+
+    def test_recommendations_require_authentication(self):
+        response = self.client.get(reverse('recommendations'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_incremental_update_matches_full_build(self):
+        build_content_neighbors()
+        # Ratings created after the build are picked up by the next update.
+        ContentNeighbor.objects.update(computed_at=timezone.now() - timedelta(minutes=5))
+        self.rate(5, {'Chess': 4, 'Kart': 2})
+        self.rate(2, {'Chess': 2})
+        changed = [self.contents['Chess'], self.contents['Kart']]
+
+        self.assertGreater(update_content_neighbors(), 0)
+        incremental = self.neighbor_rows(changed)
+        build_content_neighbors()
+        self.assertEqual(incremental, self.neighbor_rows(changed))
+        self.assertEqual(update_content_neighbors(), 0)
+
+    def test_vectorized_scores_match_pairwise_cosine(self):
+        rng = np.random.default_rng(3)
+        dense = np.where(rng.random((40, 12)) < 0.4, rng.integers(1, 6, (40, 12)), 0).astype(np.float32)
+        columns, neighbors, scores = top_k_neighbors(sparse.csr_matrix(dense), k=3, shrinkage=2, block_size=5)
+        self.assertEqual(len(columns), 12 * 3)
+        for column, neighbor, score in zip(columns, neighbors, scores):
+            a, b = dense[:, column], dense[:, neighbor]
+            common = np.count_nonzero(a * b)
+            expected = a @ b / (np.linalg.norm(a) * np.linalg.norm(b)) * common / (common + 2)
+            self.assertAlmostEqual(float(score), float(expected), places=5)
+
+    def test_norms_average_repeated_ratings(self):
+        # User 0 rates Racer a second time: both the dot products and the norms use their mean, 3.
+        self.rate(0, {'Racer': 1})
+        rating_matrix = RatingMatrix.from_queryset(Rating.objects.all())
+        column_norms = np.sqrt(np.asarray(rating_matrix.matrix.multiply(rating_matrix.matrix).sum(axis=0)).ravel())
+        np.testing.assert_allclose(item_norms(rating_matrix.items), column_norms, rtol=1e-6)
+
+        build_content_neighbors()
+        racer, racer2 = self.contents['Racer'], self.contents['Racer 2']
+        score = ContentNeighbor.objects.get(media_content=racer, neighbor=racer2).score
+        # Racer is rated (3, 5, 4, 1) by users 0, 1, 2 and 4; Racer 2 (5, 4, 5) by users 0-2.
+        shrinkage = settings.RECOMMENDATION_SHRINKAGE
+        self.assertAlmostEqual(score, 55 / np.sqrt(51 * 66) * 3 / (3 + shrinkage), places=5)
+
+        ContentNeighbor.objects.update(computed_at=timezone.now() - timedelta(minutes=5))
+        self.rate(2, {'Racer 2': 1})
+        update_content_neighbors()
+        incremental = self.neighbor_rows([racer2])
+        build_content_neighbors()
+        self.assertEqual(incremental, self.neighbor_rows([racer2]))
+
+    def test_repeated_ratings_are_averaged(self):
+        matrix = RatingMatrix.from_arrays(
+            ['u'], ['a', 'b'], np.array([0, 0, 0]), np.array([0, 0, 1]), np.array([2, 4, 5], dtype=np.float32),
+        )
+        self.assertEqual(matrix.matrix.toarray().tolist(), [[3.0, 5.0]])
+
+
+@unittest.skipUnless(os.getenv('PIXELCORE_BENCHMARKS'), 'Set PIXELCORE_BENCHMARKS=1 to run benchmarks.')
+class RecommendationBuildBenchmark(TestCase):
+    """
+    Build time and peak memory of the vectorized neighbour computation for
+    PIXELCORE_RECOMMENDATION_BENCHMARK_RATINGS synthetic ratings (default
+    10,000,000) with Zipf-distributed content popularity, on CPU only.
+    Database I/O is excluded: this measures RatingMatrix and top_k_neighbors.
+    """
+
+    def test_build(self):
+        ratings = int(os.getenv('PIXELCORE_RECOMMENDATION_BENCHMARK_RATINGS', '10000000'))
+        n_users, n_items = max(ratings // 20, 1), max(ratings // 200, 2)
+        rng = np.random.default_rng(7)
+        rows = rng.integers(0, n_users, ratings, dtype=np.int32)
+        cols = ((rng.zipf(1.3, ratings) - 1) % n_items).astype(np.int32)
+        values = rng.integers(1, 6, ratings).astype(np.float32)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        matrix = RatingMatrix.from_arrays(range(n_users), range(n_items), rows, cols, values).matrix
+        loaded = time.perf_counter()
+        columns, _, _ = top_k_neighbors(matrix, k=20, shrinkage=10)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(
+            f'\n{ratings} ratings, {n_users} users, {n_items} contents: matrix {loaded - start:.1f}s, '
+            f'total {elapsed:.1f}s, peak {peak / 2 ** 20:.0f} MiB, {len(columns)} neighbour rows'
+        )
+        self.assertTrue(len(columns))
+
+
+@unittest.skipUnless(os.getenv('PIXELCORE_BENCHMARKS'), 'Set PIXELCORE_BENCHMARKS=1 to run benchmarks.')
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Partitioning is only supported on PostgreSQL.')
+class RatingPartitionBenchmark(TransactionTestCase):
+    """
+    Insert and newest-page latency as history grows, on the monolithic and
+    the partitioned table, then pruning and archival of the partitioned one.
+    Converts the test database's ratings table, so it is a benchmark.
+    """
+
+    def test_partitioning(self):
+        report = run_partition_benchmark(months=3, ratings_per_month=2000, inserts=20, pages=20)
+        for mode in ('monolithic', 'partitioned'):
+            steps = report['results'][mode]
+            self.assertEqual([step['months'] for step in steps], [1, 2, 3])
+            print(f"\n{mode}: " + ', '.join(f"{step['rows']} rows insert p50 {step['insert_p50_ms']:.2f} ms page p50 {step['page_p50_ms']:.2f} ms" for step in steps))
+        self.assertTrue(is_partitioned())
+
+        oldest = partitions()[1]  # after the empty history partition
+        plan = Rating.objects.filter(created_at__gte=timezone.now() - timedelta(days=7)).explain()
+        self.assertNotIn(oldest.name, plan)
+        plan = Rating.objects.order_by('-created_at', '-rating_id')[:10].explain(analyze=True)
+        self.assertRegex(plan, rf'{oldest.name}.*never executed')
+
+        rows = Rating.objects.filter(created_at__lt=oldest.upper).count()
+        with tempfile.TemporaryDirectory() as directory:
+            call_command('archive_rating_partitions', before=f'{oldest.upper:%Y-%m}', directory=directory, stdout=StringIO())
+            with gzip.open(os.path.join(directory, f'{oldest.name}.csv.gz'), 'rt') as handle:
+                self.assertEqual(len(list(csv.reader(handle))), rows + 1)
+        self.assertFalse(Rating.objects.filter(created_at__lt=oldest.upper).exists())
+        self.assertNotIn(oldest.name, [partition.name for partition in partitions()])
@@ -1,36 +1,94 @@
+import uuid
 import rest_framework
-from django.db import IntegrityError
-from rest_framework import viewsets, status
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from rest_framework import viewsets, status, serializers
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
+from content.models import MediaContent
 from rest_framework.permissions import IsAuthenticated
+from .filters import RatingFilter
 from .models import Rating
-from .serializers import RatingSerializer
+from .partitions import require_unpartitioned_table
+from .serializers import RatingRowSerializer, RatingSerializer, RatingVoteSerializer
 from .permissions import IsOwnerOrReadOnly # Import custom permission
+from . import services
+from core.asyncviews import AsyncReadMixin
+from core.cache import CachedReadMixin, invalidate
+from core.conditional import ConditionalRequestMixin
+from core.exports import ExportMixin
+from core.rows import RowListMixin
 from rest_framework.decorators import action
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 
-class RatingViewSet(viewsets.ModelViewSet):
+ALREADY_RATED = 'You have already rated this media content.'
+
+
+class RatingViewSet(ExportMixin, CachedReadMixin, RowListMixin, ConditionalRequestMixin, AsyncReadMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows ratings to be viewed, created, updated or deleted.
     """
     queryset = Rating.objects.all()
     serializer_class = RatingSerializer
+    row_serializer_class = RatingRowSerializer
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly] # Add custom permission
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    filterset_fields = ['user', 'media_content', 'value']
+    filterset_class = RatingFilter
     ordering_fields = ['created_at', 'value']
+    cache_label = 'ratings'
+    export_fields = ('rating_id', 'user_id', 'media_content_id', 'value', 'created_at', 'updated_at')
+    # Bulk ingestion limits: items accepted per request, and items per transaction.
+    bulk_max_items = 10000
+    bulk_chunk_size = 1000
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('destroy', 'export'):
+            # Nothing is serialized: deletes only need the row's own columns, and exports project their own.
+            return queryset
+        # Every other action renders RatingSerializer, which reads user.email.
+        return queryset.for_serializer()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        media_content_id = self.request.query_params.get('media_content_id')
+        if self.action in ('list', 'export') and media_content_id:
+            queryset = queryset.filter(media_content__media_id=media_content_id)
+        return queryset
+
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
-        self.request.user.rating_count += 1
-        self.request.user.save(update_fields=['rating_count'])
+        # The insert and the counter updates commit together; counters are
+        # incremented database-side so concurrent creates never lose a count.
+        if settings.RATINGS_SINGLE_VOTE:
+            require_unpartitioned_table()
+        rating = self.save_rating(serializer, user_id=self.request.user.pk, single_vote=settings.RATINGS_SINGLE_VOTE)
+        services.record_ratings_added([rating])
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        previous_media_content_id = serializer.instance.media_content_id
+        previous_value = serializer.instance.value
+        rating = self.save_rating(serializer)
+        services.record_rating_changed(previous_media_content_id, previous_value, rating)
+
+    def save_rating(self, serializer, **kwargs):
+        """
+        serializer.save(), reporting a second single vote for the same content
+        (the rating_single_vote_uniq index) as a validation error.
+        """
+        try:
+            with transaction.atomic():
+                return serializer.save(**kwargs)
+        except IntegrityError:
+            raise serializers.ValidationError({'detail': ALREADY_RATED})
 
+    @transaction.atomic
     def perform_destroy(self, instance):
-        instance.user.rating_count -= 1
-        instance.user.save(update_fields=['rating_count'])
+        services.record_ratings_removed([instance])
         instance.delete()
 
     @extend_schema(
@@ -49,18 +107,7 @@ class RatingViewSet(viewsets.ModelViewSet):
         }
     )
     def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        media_content_id = request.query_params.get('media_content_id')
-        if media_content_id:
-            queryset = queryset.filter(media_content__media_id=media_content_id)
-
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return super().list(request, *args, **kwargs)
 
     @extend_schema(
         summary="Retrieve a specific rating",
@@ -155,4 +202,120 @@ class RatingViewSet(viewsets.ModelViewSet):
         }
     )
     def destroy(self, request, *args, **kwargs):
-        return super().destroy(request, *args, **kwargs)
\ No newline at end of file
+        return super().destroy(request, *args, **kwargs)
+
+    @extend_schema(
+        summary="Set the requesting user's vote for a media content (single-vote mode)",
+        request=RatingVoteSerializer,
+        responses={200: RatingSerializer, 201: RatingSerializer},
+    )
+    @action(detail=False, methods=['put'], url_path=r'by-content/(?P<media_id>[^/.]+)', url_name='by-content')
+    def by_content(self, request, media_id=None, *args, **kwargs):
+        """
+        Create the requesting user's rating of a media content, or change the
+        value of the one they have, in a single INSERT ... ON CONFLICT DO
+        UPDATE. Retries and double submits never add rows. Responds 201 when
+        the rating was created and 200 when it was updated. Only available
+        with RATINGS_SINGLE_VOTE.
+        """
+        if not settings.RATINGS_SINGLE_VOTE:
+            raise NotFound('Single-vote mode is not enabled.')
+        require_unpartitioned_table()
+        try:
+            media_content_id = uuid.UUID(media_id)
+        except ValueError:
+            raise NotFound('No MediaContent matches the given query.')
+        vote = RatingVoteSerializer(data=request.data)
+        vote.is_valid(raise_exception=True)
+        try:
+            with transaction.atomic():
+                rating, created = services.upsert_rating(request.user.pk, media_content_id, vote.validated_data['value'])
+        except MediaContent.DoesNotExist:
+            raise NotFound('No MediaContent matches the given query.')
+        return Response(self.get_serializer(rating).data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    @extend_schema(
+        summary="Create many ratings in one request",
+        request=RatingSerializer(many=True),
+        responses={
+            201: OpenApiExample(
+                'All Created',
+                value={'created': 1, 'failed': 0, 'results': [{'index': 0, 'status': 201, 'rating': {'rating_id': 'uuid', 'user': 'test@example.com', 'media_content': 'uuid', 'value': 5, 'created_at': '2025-01-01T00:00:00Z'}}]},
+                response_only=True,
+                media_type='application/json',
+            ),
+            207: OpenApiExample(
+                'Partially Created',
+                value={'created': 1, 'failed': 1, 'results': [{'index': 0, 'status': 201, 'rating': {}}, {'index': 1, 'status': 400, 'errors': {'value': ['"9" is not a valid choice.']}}]},
+                response_only=True,
+                media_type='application/json',
+            ),
+        }
+    )
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request, *args, **kwargs):
+        """
+        Create ratings for the requesting user from a list of {media_content, value} items.
+
+        Items are validated individually, with all referenced media content
+        resolved in one query, then inserted with bulk_create in chunks of
+        `bulk_chunk_size`. Each chunk is one transaction that also folds the
+        chunk into content aggregates and User.rating_count. The response
+        reports an outcome per input item. In single-vote mode, items for
+        content the user has already rated are skipped with a 400 outcome.
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise serializers.ValidationError({'detail': 'Expected a non-empty list of ratings.'})
+        if len(items) > self.bulk_max_items:
+            raise serializers.ValidationError({'detail': f'At most {self.bulk_max_items} ratings can be submitted at once.'})
+
+        single_vote = settings.RATINGS_SINGLE_VOTE
+        if single_vote:
+            require_unpartitioned_table()
+        results = [None] * len(items)
+        pending = []
+        for index, (validated_data, errors) in enumerate(self.get_serializer(data=items, many=True).validate_items(items)):
+            if errors:
+                results[index] = {'index': index, 'status': status.HTTP_400_BAD_REQUEST, 'errors': errors}
+            else:
+                pending.append((index, Rating(user_id=request.user.pk, single_vote=single_vote, **validated_data)))
+
+        for start in range(0, len(pending), self.bulk_chunk_size):
+            chunk = pending[start:start + self.bulk_chunk_size]
+            try:
+                with transaction.atomic():
+                    if single_vote:
+                        # ON CONFLICT DO NOTHING; primary keys are generated here, so the stored rows can be read back.
+                        Rating.objects.bulk_create([rating for _, rating in chunk], ignore_conflicts=True)
+                        stored = set(Rating.objects.filter(pk__in=[rating.pk for _, rating in chunk]).values_list('pk', flat=True))
+                        for index, rating in chunk:
+                            if rating.pk not in stored:
+                                results[index] = {'index': index, 'status': status.HTTP_400_BAD_REQUEST, 'errors': {'detail': ALREADY_RATED}}
+                        chunk = [(index, rating) for index, rating in chunk if rating.pk in stored]
+                        created = [rating for _, rating in chunk]
+                    else:
+                        created = Rating.objects.bulk_create([rating for _, rating in chunk])
+                    services.record_ratings_added(created)
+                    # bulk_create sends no post_save signals.
+                    if created:
+                        invalidate('ratings', *(rating.pk for rating in created), created=True)
+            except IntegrityError:
+                # e.g. a referenced item was deleted after validation; the whole chunk rolled back.
+                for index, _ in chunk:
+                    results[index] = {'index': index, 'status': status.HTTP_409_CONFLICT, 'errors': {'detail': 'This chunk could not be stored.'}}
+                continue
+            for (index, _), data in zip(chunk, self.get_serializer(created, many=True).data):
+                results[index] = {'index': index, 'status': status.HTTP_201_CREATED, 'rating': data}
+
+        created_count = sum(1 for result in results if result['status'] == status.HTTP_201_CREATED)
+        if created_count == len(results):
+            response_status = status.HTTP_201_CREATED
+        elif created_count:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response(
+            {'created': created_count, 'failed': len(results) - created_count, 'results': results},
+            status=response_status,
+        )
@@ -0,0 +1,190 @@
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from core.metrics import USER_CACHE_LOOKUPS
+from core.performance import timed
+
+# Claims added to every issued token (see users.serializers.LoginSerializer).
+PRINCIPAL_CLAIMS = ('email', 'is_staff', 'is_active')
+
+
+class UserPrincipal(TokenUser):
+    """
+    Lightweight request.user built from signed token claims, without a
+    database lookup. The primary key is a UUID like User.pk, so ownership
+    checks such as `obj.user_id == request.user.pk` behave the same.
+    """
+
+    @cached_property
+    def id(self):
+        return uuid.UUID(str(self.token[api_settings.USER_ID_CLAIM]))
+
+    @cached_property
+    def pk(self):
+        return self.id
+
+    @cached_property
+    def user_id(self):
+        return self.id
+
+    @cached_property
+    def email(self):
+        return self.token.get('email', '')
+
+    @cached_property
+    def is_active(self):
+        return self.token.get('is_active', True)
+
+    def __str__(self):
+        return self.email
+
+
+class UserCache:
+    """
+    Bounded, thread-safe LRU cache of User rows with a per-entry TTL.
+
+    The cache is per process: signals evict entries in the process that saved
+    the user, and the TTL bounds how long other processes may serve a stale
+    row.
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+        # Callers get their own copy, so per-request changes never leak into the cache.
+        return copy.copy(user)
+
+    def set(self, user_id, user):
+        with self._lock:
+            self._entries[user_id] = (copy.copy(user), time.monotonic() + self.timeout)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def evict(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(settings.JWT_USER_CACHE_SIZE, settings.JWT_USER_CACHE_TIMEOUT)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that avoids the per-request users_user SELECT.
+
+    settings.JWT_PRINCIPAL selects how request.user is built:
+    - 'cache' (default): a User instance from `user_cache`, loaded from the
+      database at most once per JWT_USER_CACHE_TIMEOUT seconds per process.
+    - 'claims': a UserPrincipal read from the token's signed claims with no
+      database access. Changes to a user (e.g. deactivation) take effect when
+      their current access token expires.
+    - 'database': simplejwt's default lookup on every request.
+
+    `aauthenticate` is the same for async views, with any database lookup
+    made through the async ORM.
+    """
+
+    def authenticate(self, request):
+        with timed('auth'):
+            return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        mode = settings.JWT_PRINCIPAL
+        if mode == 'claims':
+            return self.get_principal(validated_token)
+        if mode == 'cache':
+            return self.get_cached_user(validated_token)
+        return super().get_user(validated_token)
+
+    def get_principal(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken('Token contained no recognizable user identification')
+        principal = UserPrincipal(validated_token)
+        if not principal.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return principal
+
+    def get_cached_user(self, validated_token):
+        user = self.lookup_cached_user(validated_token)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(str(user.pk), user)
+        return user
+
+    def lookup_cached_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = user_cache.get(str(user_id)) if user_id else None
+        USER_CACHE_LOOKUPS.labels('miss' if user is None else 'hit').inc()
+        return user
+
+    async def aauthenticate(self, request):
+        """
+        authenticate() for async views. Token validation is CPU-only; a user
+        row that is not cached is loaded with the async ORM.
+        """
+        with timed('auth'):
+            header = self.get_header(request)
+            if header is None:
+                return None
+            raw_token = self.get_raw_token(header)
+            if raw_token is None:
+                return None
+            validated_token = self.get_validated_token(raw_token)
+            return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        mode = settings.JWT_PRINCIPAL
+        if mode == 'claims':
+            return self.get_principal(validated_token)
+        if mode == 'cache':
+            user = self.lookup_cached_user(validated_token)
+            if user is None:
+                user = await self.aget_database_user(validated_token)
+                user_cache.set(str(user.pk), user)
+            return user
+        return await self.aget_database_user(validated_token)
+
+    async def aget_database_user(self, validated_token):
+        # simplejwt's JWTAuthentication.get_user, with an async lookup.
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+        return user
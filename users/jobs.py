@@ -0,0 +1,17 @@
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from core.jobs import handler
+from .models import User
+
+
+@handler('users.last_login')
+def record_logins(payloads):
+    # Queued per login and deduplicated per user. A job that ran late never
+    # overwrites a newer last_login.
+    latest = {}
+    for payload in payloads:
+        at = parse_datetime(payload['at'])
+        if payload['user_id'] not in latest or at > latest[payload['user_id']]:
+            latest[payload['user_id']] = at
+    for user_id, at in sorted(latest.items()):
+        User.objects.filter(Q(last_login__isnull=True) | Q(last_login__lt=at), pk=user_id).update(last_login=at)
@@ -1,4 +1,9 @@
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from core.jobs import enqueue
+from .authentication import PRINCIPAL_CLAIMS
 from .models import User
 
 class UserSerializer(serializers.ModelSerializer):
@@ -36,3 +41,31 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
             password=validated_data['password']
         )
         return user
+
+class LoginSerializer(TokenObtainPairSerializer):
+    """
+    Serializer for obtaining JWT tokens.
+    Authenticates once (one user lookup, one password hash check), then records
+    last_login with a single UPDATE. With BACKGROUND_JOBS, last_login is
+    queued instead, coalesced per user, so a burst of logins writes the user
+    row once. Tokens carry the claims that users.authentication.UserPrincipal
+    is built from.
+    """
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim in PRINCIPAL_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        self.user.last_login = timezone.now()
+        if settings.BACKGROUND_JOBS:
+            enqueue(
+                'users.last_login', {'user_id': str(self.user.pk), 'at': self.user.last_login.isoformat()},
+                dedup_key=f'last_login:{self.user.pk}',
+            )
+        else:
+            User.objects.filter(pk=self.user.pk).update(last_login=self.user.last_login)
+        return data
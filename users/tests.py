@@ -1,8 +1,21 @@
-from django.test import TestCase
+import os
+import time
+import unittest
+from unittest import mock
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.dateparse import parse_datetime
 from rest_framework import status
 from rest_framework.test import APIClient
 from users.models import User
+from users.authentication import UserCache, user_cache
+from content.models import MediaContent
+from ratings.models import Rating
+from core.jobs import run_pending
+from core.models import Job
 
 class UserAuthTests(TestCase):
     def setUp(self):
@@ -89,4 +102,177 @@ class UserAuthTests(TestCase):
         }
         response = self.client.post(self.login_url, login_data, format='json')
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
-        self.assertIn('detail', response.data)
\ No newline at end of file
+        self.assertIn('detail', response.data)
+
+
+def count_password_checks():
+    """
+    Patch the default hasher so every password verification is counted.
+    """
+    return mock.patch.object(PBKDF2PasswordHasher, 'verify', autospec=True, side_effect=PBKDF2PasswordHasher.verify)
+
+
+class LoginPipelineTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.login_url = reverse('token_obtain_pair')
+        self.user = User.objects.create_user(email='pipeline@example.com', username='pipeline', password='password123')
+
+    def test_login_checks_password_once_and_records_last_login(self):
+        """
+        Ensure a login runs the hasher once, looks the user up once and stores last_login with one UPDATE.
+        """
+        with count_password_checks() as verify, self.assertNumQueries(2):
+            response = self.client.post(self.login_url, {'email': 'pipeline@example.com', 'password': 'password123'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(verify.call_count, 1)
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+
+    @override_settings(BACKGROUND_JOBS=True)
+    def test_background_jobs_coalesce_last_login(self):
+        """
+        Ensure that with BACKGROUND_JOBS, repeated logins queue one last_login job that records the latest login.
+        """
+        for _ in range(3):
+            response = self.client.post(self.login_url, {'email': 'pipeline@example.com', 'password': 'password123'}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_login)
+        job = Job.objects.get(name='users.last_login')
+
+        run_pending()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_login, parse_datetime(job.payload['at']))
+        self.assertFalse(Job.objects.exists())
+
+    def test_failed_login_does_not_record_last_login(self):
+        """
+        Ensure a wrong password is rejected without touching last_login.
+        """
+        with count_password_checks() as verify:
+            response = self.client.post(self.login_url, {'email': 'pipeline@example.com', 'password': 'wrong'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(verify.call_count, 1)
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_login)
+
+
+@unittest.skipUnless(os.getenv('PIXELCORE_BENCHMARKS'), 'Set PIXELCORE_BENCHMARKS=1 to run benchmarks.')
+class LoginThroughputBenchmark(TestCase):
+    """
+    Measures sequential login throughput with the production password hasher.
+    Number of logins: PIXELCORE_LOGIN_BENCHMARK_LOGINS (default 50).
+    """
+    def test_login_throughput(self):
+        logins = int(os.getenv('PIXELCORE_LOGIN_BENCHMARK_LOGINS', '50'))
+        User.objects.create_user(email='bench@example.com', username='bench', password='password123')
+        client = APIClient()
+        credentials = {'email': 'bench@example.com', 'password': 'password123'}
+        with count_password_checks() as verify:
+            start = time.perf_counter()
+            for _ in range(logins):
+                response = client.post(reverse('token_obtain_pair'), credentials, format='json')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+            elapsed = time.perf_counter() - start
+        print(f'\n{logins} logins in {elapsed:.2f} s: {logins / elapsed:.1f} logins/s, {elapsed / logins * 1000:.1f} ms each')
+        self.assertEqual(verify.call_count, logins)
+
+
+class PrincipalAuthenticationTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='principal@example.com', username='principal', password='password123')
+        self.other = User.objects.create_user(email='other@example.com', username='other', password='password123')
+        self.media = MediaContent.objects.create(title='Game', description='Desc', category='game', content_url='http://example.com/game.zip')
+        self.other_rating = Rating.objects.create(user=self.other, media_content=self.media, value=2)
+        self.login(self.user)
+
+    def login(self, user):
+        response = self.client.post(reverse('token_obtain_pair'), {'email': user.email, 'password': 'password123'}, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + response.data['access'])
+
+    def user_queries(self, *args, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(*args, **kwargs)
+        return response, [query['sql'] for query in queries if 'FROM "users_user"' in query['sql']]
+
+    @override_settings(JWT_PRINCIPAL='cache')
+    def test_cached_principal_is_reused_and_evicted_on_save(self):
+        """
+        Ensure the user row is loaded once, reused, and evicted when the user is saved.
+        """
+        url = reverse('mediacontent-list')
+        self.assertEqual(len(self.user_queries(url)[1]), 1)
+        response, queries = self.user_queries(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, [])
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('rating-list')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(JWT_PRINCIPAL='claims')
+    def test_claims_principal_supports_rating_workflow(self):
+        """
+        Ensure the stateless principal can create, update and delete its own ratings without user lookups.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('rating-list'), {'media_content': str(self.media.pk), 'value': 4}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(response.data['user'], 'principal@example.com')
+            rating_url = reverse('rating-detail', args=[response.data['rating_id']])
+            response = self.client.patch(rating_url, {'value': 5}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = self.client.patch(reverse('rating-detail', args=[self.other_rating.pk]), {'value': 5}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+            response = self.client.delete(rating_url)
+            self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(any(query['sql'].startswith('SELECT') and 'FROM "users_user"' in query['sql'] for query in queries))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.rating_count, 0)
+
+    def test_user_cache_is_bounded_and_expires(self):
+        """
+        Ensure the LRU drops the least recently used entry and expired entries.
+        """
+        cache = UserCache(max_size=2, timeout=60)
+        cache.set('a', self.user)
+        cache.set('b', self.other)
+        cache.get('a')
+        cache.set('c', self.user)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a').email, 'principal@example.com')
+        self.assertIsNot(cache.get('a'), cache.get('a'))
+
+        expired = UserCache(max_size=2, timeout=0)
+        expired.set('a', self.user)
+        self.assertIsNone(expired.get('a'))
+
+
+@unittest.skipUnless(os.getenv('PIXELCORE_BENCHMARKS'), 'Set PIXELCORE_BENCHMARKS=1 to run benchmarks.')
+class AuthenticatedRequestBenchmark(TestCase):
+    """
+    Compares authenticated request latency for each JWT_PRINCIPAL mode.
+    Requests per mode: PIXELCORE_AUTH_BENCHMARK_REQUESTS (default 500).
+    """
+    def test_principal_modes(self):
+        requests = int(os.getenv('PIXELCORE_AUTH_BENCHMARK_REQUESTS', '500'))
+        User.objects.create_user(email='bench@example.com', username='bench', password='password123')
+        media = MediaContent.objects.create(title='Game', description='Desc', category='game', content_url='http://example.com/game.zip')
+        client = APIClient()
+        response = client.post(reverse('token_obtain_pair'), {'email': 'bench@example.com', 'password': 'password123'}, format='json')
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + response.data['access'])
+        url = reverse('mediacontent-detail', args=[media.pk])
+
+        timings = {}
+        for mode in ('database', 'cache', 'claims'):
+            user_cache.clear()
+            with self.settings(JWT_PRINCIPAL=mode):
+                client.get(url)
+                start = time.perf_counter()
+                for _ in range(requests):
+                    self.assertEqual(client.get(url).status_code, status.HTTP_200_OK)
+                timings[mode] = (time.perf_counter() - start) / requests
+        print('\nauthenticated GET latency: ' + ', '.join(f'{mode} {seconds * 1000:.3f} ms' for mode, seconds in timings.items()))
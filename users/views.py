@@ -1,9 +1,13 @@
+import time
 from rest_framework import generics, status
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
-from .serializers import UserRegistrationSerializer, UserSerializer
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from .serializers import LoginSerializer, UserRegistrationSerializer, UserSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
+from core.metrics import LOGIN_SECONDS
+from ratings.recommendations import recommended_contents
+from ratings.serializers import RecommendedContentSerializer
 
 class UserRegistrationView(generics.CreateAPIView):
     """
@@ -42,6 +46,8 @@ class CustomTokenObtainPairView(TokenObtainPairView):
     Customized API endpoint for obtaining JWT tokens.
     Returns access and refresh tokens upon successful authentication.
     """
+    serializer_class = LoginSerializer
+
     @extend_schema(
         summary="Obtain JWT tokens",
         request=OpenApiExample(
@@ -65,11 +71,26 @@ class CustomTokenObtainPairView(TokenObtainPairView):
         },
     )
     def post(self, request, *args, **kwargs):
-        response = super().post(request, *args, **kwargs)
-        if response.status_code == 200:
-            from django.contrib.auth import update_last_login
-            serializer = self.get_serializer(data=request.data)
-            serializer.is_valid()
-            user = serializer.user
-            update_last_login(None, user)
-        return response
\ No newline at end of file
+        start = time.perf_counter()
+        outcome = 'failure'
+        try:
+            response = super().post(request, *args, **kwargs)
+            outcome = 'success'
+            return response
+        finally:
+            LOGIN_SECONDS.labels(outcome).observe(time.perf_counter() - start)
+
+class RecommendationView(generics.ListAPIView):
+    """
+    API endpoint listing content recommended for the authenticated user,
+    ranked from the precomputed neighbours of the content they rated most
+    recently.
+    """
+    serializer_class = RecommendedContentSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = None
+
+    @extend_schema(summary="Recommended content for the current user")
+    def get(self, request, *args, **kwargs):
+        contents = recommended_contents(request.user.pk)
+        return Response(self.get_serializer(contents, many=True).data)